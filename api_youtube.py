@@ -1,14 +1,14 @@
 import datetime
-import time
 import unicodedata
-from typing import List, Optional, cast
+from typing import Iterable, List, Optional, cast
 
 import googleapiclient.discovery
 import googleapiclient.errors
 import google.generativeai as genai
 
-from database import get_clientes_activos
-from storage_manager import StorageManager
+from database import get_user_ids_con_assets
+from rate_limiter import get_rate_limiter
+from storage_manager import ElementoSubida, storage_manager
 from config import (
     YOUTUBE_API_KEY,
     GEMINI_API_KEY,
@@ -161,7 +161,7 @@ def buscar_video_reciente_en_canal(api_key: str, channel_id: str, query: str, ma
             type="video",
             maxResults=max(1, min(max_results, 50)),
         )
-        response = request.execute()
+        response = get_rate_limiter("youtube").ejecutar(request.execute)
 
         if "error" in response:
             error_details = response["error"]["errors"][0]
@@ -224,7 +224,8 @@ def analizar_video_con_gemini(gemini_api_key: str, video_url: str, prompt: str)
         print("Esto puede tomar algunos minutos...")
 
         model = genai.GenerativeModel(GEMINI_MODEL)  # type: ignore[attr-defined]
-        response = model.generate_content([video_url, prompt])
+        # El limitador de Gemini espacia los análisis (por defecto uno cada 30 s)
+        response = get_rate_limiter("gemini").ejecutar(model.generate_content, [video_url, prompt])
         return response.text
 
     except Exception as e:
@@ -235,54 +236,31 @@ def analizar_video_con_gemini(gemini_api_key: str, video_url: str, prompt: str)
         return None
 
 
-def esperar_intervalo(segundos: int, ultimo_intento: Optional[float]) -> None:
-    """Bloquea la ejecución hasta cumplir el intervalo deseado entre peticiones."""
-    if ultimo_intento is None:
-        return
-
-    restante = segundos - (time.time() - ultimo_intento)
-    if restante > 0:
-        print(f"Esperando {int(restante)} segundos antes del siguiente análisis...")
-        time.sleep(restante)
+def subir_informe_para_clientes(user_ids: Iterable[str], contenido: str, nombre_archivo: str) -> None:
+    """Sube el contenido dado al storage de Supabase en la carpeta de cada cliente (en paralelo)."""
+    print(f"\n📊 Subiendo '{nombre_archivo}' para los clientes activos...\n")
 
+    lote = storage_manager.subir_lote(
+        ElementoSubida(user_id, nombre_archivo, contenido, content_type="text/markdown; charset=utf-8")
+        for user_id in user_ids
+    )
 
-def subir_informe_para_clientes(clientes, contenido: str, nombre_archivo: str) -> None:
-    """Sube el contenido dado al storage de Supabase para cada cliente activo."""
-    if not clientes:
-        print("⚠️  No se encontraron clientes activos en la base de datos. Se omite la subida.")
+    if not lote.resultados:
+        print("⚠️  No se encontraron clientes con assets en la base de datos. Se omite la subida.")
         return
 
-    storage = StorageManager()
-    print(f"\n📊 Subiendo '{nombre_archivo}' para {len(clientes)} clientes activos...\n")
-
-    exitosos = 0
-    fallidos = 0
-
-    for idx, cliente in enumerate(clientes, 1):
-        print(f"[{idx}/{len(clientes)}] Subiendo para cliente: {cliente.nombre_completo} ({cliente.user_id})...")
-        try:
-            exito = storage.subir_texto(
-                contenido_texto=contenido,
-                nombre_archivo=nombre_archivo,
-                cliente_id=cliente.user_id,
-                content_type="text/markdown; charset=utf-8",
-            )
-        except Exception as err:
-            exito = False
-            print(f"    ❌ Error inesperado: {err}")
-
-        if exito:
-            exitosos += 1
-            print(f"    ✅ Subido exitosamente a carpeta: {cliente.user_id}/")
-        else:
-            fallidos += 1
-            print(f"    ❌ Error al subir para cliente {cliente.user_id}")
+    for fallo in lote.fallidos:
+        print(f"    ❌ Error al subir para cliente {fallo.cliente_id} ({fallo.intentos} intentos): {fallo.error}")
 
     print("\n" + "=" * 60)
     print("RESUMEN DE SUBIDA")
     print("=" * 60)
-    print(f"✅ Exitosos: {exitosos}")
-    print(f"❌ Fallidos: {fallidos}")
+    print(f"✅ Exitosos: {lote.exitosos}")
+    print(f"⏭️  Sin cambios (no se volvieron a subir): {lote.omitidos}")
+    if lote.reutilizados:
+        print(f"♻️  Blob compartido reutilizado (no se volvió a subir): {lote.reutilizados}")
+    print(f"❌ Fallidos: {len(lote.fallidos)}")
+    print(f"⏱️  {lote.segundos:.1f}s ({lote.archivos_por_segundo:.1f} clientes/s)")
     print("=" * 60)
 
 
@@ -319,9 +297,6 @@ def main():
         print("❌ Error: Configuración incompleta. Verifica tu archivo .env")
         raise SystemExit(1)
 
-    clientes = get_clientes_activos()
-    ultimo_intento: Optional[float] = None
-
     if YOUTUBE_API_KEY is None or CHANNEL_ID_XTB is None or GEMINI_API_KEY is None:
         print("❌ Error: claves críticas no disponibles tras la validación.")
         raise SystemExit(1)
@@ -348,13 +323,12 @@ def main():
         analisis_premercado = analizar_video_con_gemini(
             gemini_key, url_premercado, PROMPT_PREMERCADO
         )
-        ultimo_intento = time.time()
 
         if analisis_premercado:
             print("\n" + "=" * 60)
             print("ANÁLISIS FINANCIERO PRE-MERCADO COMPLETADO")
             print("=" * 60)
-            subir_informe_para_clientes(clientes, analisis_premercado, ARCHIVO_PREMERCADO)
+            subir_informe_para_clientes(get_user_ids_con_assets(), analisis_premercado, ARCHIVO_PREMERCADO)
         else:
             print("\nNo se pudo completar el análisis de pre-mercado con Gemini.")
     else:
@@ -393,9 +367,7 @@ def main():
 
     resultados: List[dict] = []
 
-    for indice, configuracion in enumerate(configuraciones_semana):
-        esperar_intervalo(30, ultimo_intento)
-
+    for configuracion in configuraciones_semana:
         titulo = configuracion["titulo"]
         print(f"\nBuscando el video '{titulo}'...")
 
@@ -411,7 +383,6 @@ def main():
         analisis = analizar_video_con_gemini(
             gemini_key, url_video, configuracion["prompt"]
         )
-        ultimo_intento = time.time()
 
         if analisis:
             resultados.append(
@@ -425,7 +396,7 @@ def main():
         return
 
     informe_vision = crear_informe_vision_mercado(resultados)
-    subir_informe_para_clientes(clientes, informe_vision, ARCHIVO_VISION_MERCADO)
+    subir_informe_para_clientes(get_user_ids_con_assets(), informe_vision, ARCHIVO_VISION_MERCADO)
 
 
 if __name__ == "__main__":
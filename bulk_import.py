@@ -0,0 +1,224 @@
+"""
+Importación masiva de posiciones desde CSV o JSON.
+Lee las posiciones de un cliente (p. ej. una exportación del bróker), crea en
+bloque los portfolios que falten y da de alta los assets con las escrituras
+masivas de `database`, en peticiones de varias filas en lugar de una por fila.
+
+Uso:
+    python bulk_import.py <archivo.csv|archivo.json> <user_id> [--portfolio NOMBRE] [--upsert]
+"""
+
+import csv
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from database import FalloFila, db_manager
+
+logger = logging.getLogger(__name__)
+
+# Portfolio al que van las filas que no indican ninguno
+PORTFOLIO_POR_DEFECTO = "Importado"
+
+# Nombres de columna aceptados para cada campo (sin distinguir mayúsculas)
+ALIAS_COLUMNAS: Dict[str, tuple] = {
+    'ticker': ('ticker', 'asset_symbol', 'symbol', 'simbolo', 'símbolo'),
+    'cantidad': ('cantidad', 'quantity', 'qty', 'unidades'),
+    'precio_compra': ('precio_compra', 'acquisition_price', 'price', 'precio'),
+    'fecha_adquisicion': ('fecha_adquisicion', 'acquisition_date', 'date', 'fecha'),
+    'portfolio_id': ('portfolio_id',),
+    'portfolio': ('portfolio', 'portfolio_name', 'cartera'),
+    'asset_id': ('asset_id',),
+}
+
+
+@dataclass
+class ResultadoImportacion:
+    """Resumen de una importación masiva."""
+    filas: int = 0
+    portfolios_creados: List[int] = field(default_factory=list)
+    asset_ids: List[Optional[int]] = field(default_factory=list)
+    fallos: List[FalloFila] = field(default_factory=list)
+
+    @property
+    def importados(self) -> int:
+        return sum(1 for asset_id in self.asset_ids if asset_id is not None)
+
+
+def _numero(valor: Any) -> Optional[float]:
+    """Convierte a float aceptando vacíos y coma decimal ("1,5")."""
+    if valor is None:
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor).strip()
+    if not texto:
+        return None
+    if ',' in texto and '.' not in texto:
+        texto = texto.replace(',', '.')
+    return float(texto)
+
+
+def _normalizar_fila(fila: Dict[str, Any]) -> Dict[str, Any]:
+    """Mapea las columnas de la fila a los nombres del modelo."""
+    por_nombre = {str(k).strip().lower(): v for k, v in fila.items() if k is not None}
+    normalizada: Dict[str, Any] = {}
+    for campo, alias in ALIAS_COLUMNAS.items():
+        for nombre in alias:
+            valor = por_nombre.get(nombre)
+            if valor not in (None, ''):
+                normalizada[campo] = valor.strip() if isinstance(valor, str) else valor
+                break
+    return normalizada
+
+
+def leer_posiciones(ruta: str) -> List[Dict[str, Any]]:
+    """
+    Lee las posiciones de un archivo CSV (con cabecera) o JSON (lista de objetos
+    o {"posiciones": [...]}) con los nombres de columna de ALIAS_COLUMNAS.
+
+    Returns:
+        Lista de filas con claves ticker, cantidad, precio_compra,
+        fecha_adquisicion y opcionalmente portfolio / portfolio_id / asset_id
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    with open(ruta, "r", encoding="utf-8-sig", newline="") as f:
+        if extension == ".json":
+            datos = json.load(f)
+            if isinstance(datos, dict):
+                datos = datos.get("posiciones", [])
+        else:
+            muestra = f.read(4096)
+            f.seek(0)
+            try:
+                dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+            except csv.Error:
+                dialecto = csv.excel
+            datos = list(csv.DictReader(f, dialect=dialecto))
+    return [_normalizar_fila(fila) for fila in datos]
+
+
+def importar_posiciones(
+    user_id: str,
+    posiciones: List[Dict[str, Any]],
+    portfolio_por_defecto: str = PORTFOLIO_POR_DEFECTO,
+    upsert: bool = False,
+) -> ResultadoImportacion:
+    """
+    Importa posiciones en los portfolios de un cliente.
+
+    Los portfolios se indican por `portfolio_id` o por nombre (`portfolio`); los
+    nombres que el cliente aún no tiene se crean en una sola escritura masiva.
+
+    Args:
+        user_id: Cliente propietario de los portfolios
+        posiciones: Filas devueltas por `leer_posiciones`
+        portfolio_por_defecto: Portfolio de las filas que no indican ninguno
+        upsert: Si True, las filas con asset_id actualizan el asset existente
+
+    Returns:
+        ResultadoImportacion con el asset_id de cada fila y los fallos por fila
+    """
+    resultado = ResultadoImportacion(filas=len(posiciones), asset_ids=[None] * len(posiciones))
+
+    # Resolver los nombres de portfolio y crear en bloque los que falten
+    existentes = {p.nombre: p.portfolio_id for p in db_manager.get_portfolios_cliente(user_id)}
+    nombres_nuevos = list(dict.fromkeys(
+        fila.get('portfolio') or portfolio_por_defecto
+        for fila in posiciones
+        if 'portfolio_id' not in fila and (fila.get('portfolio') or portfolio_por_defecto) not in existentes
+    ))
+    if nombres_nuevos:
+        creados = db_manager.crear_portfolios(
+            [{'user_id': user_id, 'nombre': nombre} for nombre in nombres_nuevos]
+        )
+        for nombre, portfolio_id in zip(nombres_nuevos, creados.ids):
+            if portfolio_id is not None:
+                existentes[nombre] = portfolio_id
+                resultado.portfolios_creados.append(portfolio_id)
+        for fallo in creados.fallos:
+            logger.error(f"No se pudo crear el portfolio '{nombres_nuevos[fallo.indice]}': {fallo.error}")
+
+    inserciones: List[tuple] = []
+    actualizaciones: List[tuple] = []
+    for i, fila in enumerate(posiciones):
+        try:
+            if not fila.get('ticker'):
+                raise ValueError("ticker requerido")
+            portfolio_id = fila.get('portfolio_id')
+            if portfolio_id is None:
+                nombre = fila.get('portfolio') or portfolio_por_defecto
+                if nombre not in existentes:
+                    raise ValueError(f"portfolio '{nombre}' no disponible")
+                portfolio_id = existentes[nombre]
+            asset = {
+                'portfolio_id': int(portfolio_id),
+                'ticker': str(fila['ticker']).upper(),
+                'cantidad': _numero(fila.get('cantidad')),
+                'precio_compra': _numero(fila.get('precio_compra')),
+                'fecha_adquisicion': fila.get('fecha_adquisicion'),
+            }
+        except (ValueError, TypeError) as e:
+            resultado.fallos.append(FalloFila(i, fila, str(e)))
+            continue
+        if upsert and fila.get('asset_id') is not None:
+            asset['asset_id'] = int(fila['asset_id'])
+            actualizaciones.append((i, asset))
+        else:
+            inserciones.append((i, asset))
+
+    for grupo, escribir in (
+        (inserciones, db_manager.insertar_assets),
+        (actualizaciones, db_manager.upsert_assets),
+    ):
+        if not grupo:
+            continue
+        escrito = escribir([asset for _, asset in grupo])
+        for (i, _), asset_id in zip(grupo, escrito.ids):
+            resultado.asset_ids[i] = asset_id
+        for fallo in escrito.fallos:
+            i = grupo[fallo.indice][0]
+            resultado.fallos.append(FalloFila(i, posiciones[i], fallo.error))
+
+    resultado.fallos.sort(key=lambda f: f.indice)
+    return resultado
+
+
+def main(ruta: str, user_id: str, portfolio_por_defecto: str = PORTFOLIO_POR_DEFECTO, upsert: bool = False) -> None:
+    """Importa un archivo de posiciones e imprime el resumen."""
+    print(f"\n📥 Importando posiciones de '{ruta}' para el cliente {user_id}...")
+    posiciones = leer_posiciones(ruta)
+    resultado = importar_posiciones(user_id, posiciones, portfolio_por_defecto, upsert)
+
+    print("\n" + "=" * 60)
+    print("RESUMEN DE IMPORTACIÓN")
+    print("=" * 60)
+    print(f"📄 Filas leídas: {resultado.filas}")
+    print(f"📂 Portfolios creados: {len(resultado.portfolios_creados)}")
+    print(f"✅ Assets importados: {resultado.importados}")
+    print(f"❌ Filas con error: {len(resultado.fallos)}")
+    for fallo in resultado.fallos:
+        print(f"   Fila {fallo.indice + 1}: {fallo.error}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Importación masiva de posiciones desde CSV o JSON.")
+    parser.add_argument("ruta", help="Archivo .csv o .json con las posiciones")
+    parser.add_argument("user_id", help="Cliente al que se importan las posiciones")
+    parser.add_argument(
+        "--portfolio",
+        default=PORTFOLIO_POR_DEFECTO,
+        metavar="NOMBRE",
+        help=f"Portfolio para las filas que no indican ninguno (por defecto: {PORTFOLIO_POR_DEFECTO})",
+    )
+    parser.add_argument("--upsert", action="store_true", help="Las filas con asset_id actualizan el asset existente")
+    args = parser.parse_args()
+
+    main(args.ruta, args.user_id, args.portfolio, upsert=args.upsert)
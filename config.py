@@ -48,6 +48,25 @@ SUPABASE_BASE_PREFIX = get_env_var('SUPABASE_BASE_PREFIX', 'Informes')
 ENABLE_SUPABASE_UPLOAD = (get_env_var('ENABLE_SUPABASE_UPLOAD', 'true') or 'true').lower() == 'true'
 SUPABASE_CLEANUP_AFTER_TESTS = (get_env_var('SUPABASE_CLEANUP_AFTER_TESTS', 'false') or 'false').lower() == 'true'
 
+# Consultas masivas a Supabase (filas por página y valores por filtro IN)
+SUPABASE_TAMANO_PAGINA = int(get_env_var('SUPABASE_TAMANO_PAGINA', '1000', required=False) or '1000')
+SUPABASE_TAMANO_LOTE_IN = int(get_env_var('SUPABASE_TAMANO_LOTE_IN', '200', required=False) or '200')
+SUPABASE_TAMANO_LOTE_ESCRITURA = int(get_env_var('SUPABASE_TAMANO_LOTE_ESCRITURA', '500', required=False) or '500')
+
+# Pool HTTP compartido por todos los clientes Supabase del proceso (keep-alive)
+SUPABASE_POOL_CONEXIONES = int(get_env_var('SUPABASE_POOL_CONEXIONES', '20', required=False) or '20')
+SUPABASE_POOL_KEEPALIVE = int(get_env_var('SUPABASE_POOL_KEEPALIVE', '10', required=False) or '10')
+SUPABASE_POOL_KEEPALIVE_SEGUNDOS = float(get_env_var('SUPABASE_POOL_KEEPALIVE_SEGUNDOS', '30', required=False) or '30')
+SUPABASE_TIMEOUT_SEGUNDOS = float(get_env_var('SUPABASE_TIMEOUT_SEGUNDOS', '60', required=False) or '60')
+
+# Subidas a Storage (por defecto se omiten los archivos cuyo hash no ha cambiado)
+STORAGE_FORZAR_SUBIDAS = (get_env_var('STORAGE_FORZAR_SUBIDAS', 'false', required=False) or 'false').lower() == 'true'
+# Almacenamiento por contenido: cada contenido distinto se guarda una vez en shared/blobs/{sha256}
+STORAGE_CONTENIDO_COMPARTIDO = (get_env_var('STORAGE_CONTENIDO_COMPARTIDO', 'false', required=False) or 'false').lower() == 'true'
+# Subidas en lote: hilos compartidos (no más que SUPABASE_POOL_CONEXIONES) y reintentos por archivo
+STORAGE_LOTE_HILOS = int(get_env_var('STORAGE_LOTE_HILOS', '8', required=False) or '8')
+STORAGE_LOTE_REINTENTOS = int(get_env_var('STORAGE_LOTE_REINTENTOS', '2', required=False) or '2')
+
 # API Keys para financial_api.py (si están en .env, sino usar valores por defecto)
 ALPHA_VANTAGE_API_KEY = get_env_var('ALPHA_VANTAGE_API_KEY', '9DY7SR44AGOL9QB4', required=False)
 FMP_API_KEY = get_env_var('FMP_API_KEY', '9gdeFvLVrQqKUZj5NGWxL0sRJxpzo2ex', required=False)
@@ -58,6 +77,54 @@ DEFAULT_TICKER = get_env_var('DEFAULT_TICKER', 'AAPL', required=False)
 DIAS_HISTORICOS = int(get_env_var('DIAS_HISTORICOS', '1', required=False) or '1')
 CHANNEL_ID_XTB = get_env_var('CHANNEL_ID_XTB', 'UC-mfgGnt3tXtkDnFpl02f2Q', required=False)  
 CONSULTA_BUSQUEDA = get_env_var('CONSULTA_BUSQUEDA', 'PRE MERCADO |', required=False)
+YF_TAMANO_LOTE = int(get_env_var('YF_TAMANO_LOTE', '100', required=False) or '100')
+
+# Almacén local de precios (incremental)
+PRICE_STORE_DIR = get_env_var('PRICE_STORE_DIR', '.cache/precios', required=False) or '.cache/precios'
+PRICE_STORE_RETENCION_INTRADIA_DIAS = int(get_env_var('PRICE_STORE_RETENCION_INTRADIA_DIAS', '60', required=False) or '60')
+
+# Caché de fundamentales (TTL por tipo de dato)
+FUNDAMENTALS_CACHE_DIR = get_env_var('FUNDAMENTALS_CACHE_DIR', '.cache/fundamentales', required=False) or '.cache/fundamentales'
+FUNDAMENTALS_TTL_PERFIL_HORAS = float(get_env_var('FUNDAMENTALS_TTL_PERFIL_HORAS', '24', required=False) or '24')
+FUNDAMENTALS_TTL_ESTADOS_HORAS = float(get_env_var('FUNDAMENTALS_TTL_ESTADOS_HORAS', '168', required=False) or '168')
+
+# Almacén incremental de noticias
+NEWS_STORE_PATH = get_env_var('NEWS_STORE_PATH', '.cache/noticias.json', required=False) or '.cache/noticias.json'
+NEWS_REFRESCO_MINUTOS = float(get_env_var('NEWS_REFRESCO_MINUTOS', '60', required=False) or '60')
+
+# Snapshot local del grafo clientes/portfolios/assets (se recarga si la sonda detecta cambios o vence el TTL).
+# Desactivado por defecto: sin la función huella_portfolios (ver database.SQL_FUNCIONES_RPC) la sonda
+# solo detecta altas y bajas, no ediciones de filas existentes
+PORTFOLIO_SNAPSHOT_ACTIVO = (get_env_var('PORTFOLIO_SNAPSHOT_ACTIVO', 'false', required=False) or 'false').lower() == 'true'
+PORTFOLIO_SNAPSHOT_PATH = get_env_var('PORTFOLIO_SNAPSHOT_PATH', '.cache/portfolios.jsonl.gz', required=False) or '.cache/portfolios.jsonl.gz'
+PORTFOLIO_SNAPSHOT_TTL_MINUTOS = float(get_env_var('PORTFOLIO_SNAPSHOT_TTL_MINUTOS', '1440', required=False) or '1440')
+
+# Registro de informes generados (para regenerar solo los clientes con cambios)
+INFORMES_REGISTRO_PATH = get_env_var('INFORMES_REGISTRO_PATH', '.cache/informes_generados.json', required=False) or '.cache/informes_generados.json'
+
+# Límites de tasa por proveedor (peticiones por segundo)
+RATE_LIMITS = {
+    'yfinance': float(get_env_var('RATE_LIMIT_YFINANCE', '2', required=False) or '2'),
+    'pandas_datareader': float(get_env_var('RATE_LIMIT_PANDAS_DATAREADER', '1', required=False) or '1'),
+    'supabase': float(get_env_var('RATE_LIMIT_SUPABASE', '20', required=False) or '20'),
+    'youtube': float(get_env_var('RATE_LIMIT_YOUTUBE', '5', required=False) or '5'),
+    'gemini': float(get_env_var('RATE_LIMIT_GEMINI', '0.0333', required=False) or '0.0333'),
+}
+RATE_LIMIT_REINTENTOS = int(get_env_var('RATE_LIMIT_REINTENTOS', '3', required=False) or '3')
+
+# Descargas concurrentes (tope global, tope por proveedor y timeout por llamada)
+FETCH_MAX_CONCURRENCIA = int(get_env_var('FETCH_MAX_CONCURRENCIA', '8', required=False) or '8')
+FETCH_CONCURRENCIA_PROVEEDOR = {
+    'yfinance': int(get_env_var('FETCH_CONCURRENCIA_YFINANCE', '4', required=False) or '4'),
+    'pandas_datareader': int(get_env_var('FETCH_CONCURRENCIA_PANDAS_DATAREADER', '2', required=False) or '2'),
+}
+FETCH_TIMEOUT_SEGUNDOS = float(get_env_var('FETCH_TIMEOUT_SEGUNDOS', '60', required=False) or '60')
+
+# Pipeline por etapas (hilos por etapa y capacidad de las colas entre etapas)
+PIPELINE_HILOS_DESCARGA = int(get_env_var('PIPELINE_HILOS_DESCARGA', '2', required=False) or '2')
+PIPELINE_HILOS_RENDER = int(get_env_var('PIPELINE_HILOS_RENDER', '2', required=False) or '2')
+PIPELINE_HILOS_SUBIDA = int(get_env_var('PIPELINE_HILOS_SUBIDA', '4', required=False) or '4')
+PIPELINE_CAPACIDAD_COLA = int(get_env_var('PIPELINE_CAPACIDAD_COLA', '2', required=False) or '2')
 
 def validate_configuration():
     """
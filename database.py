@@ -3,16 +3,123 @@ Módulo de gestión de base de datos para clientes y portfolios.
 Gestiona la conexión con Supabase y operaciones CRUD para clientes y sus assets.
 """
 
-from typing import List, Dict, Optional, Any
-from dataclasses import dataclass
-from supabase import create_client, Client
-from config import SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE
+import datetime
+import functools
+import math
+import sys
+from array import array
+from typing import Callable, List, Dict, FrozenSet, Optional, Any, Iterable, Iterator
+from dataclasses import MISSING, dataclass, field, fields
+from supabase import Client
+from config import (
+    SUPABASE_TAMANO_PAGINA,
+    SUPABASE_TAMANO_LOTE_IN,
+    SUPABASE_TAMANO_LOTE_ESCRITURA,
+    PORTFOLIO_SNAPSHOT_ACTIVO,
+)
+from portfolio_snapshot import portfolio_snapshot
+from rate_limiter import get_rate_limiter
+from supabase_pool import get_supabase_client
+from ticker_index import ConstructorIndiceTickers, IndiceTickers
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Proyecciones de columnas por tipo de consulta: solo se piden las columnas que
+# se usan (nunca password_hash, birth_date ni gender)
+COLUMNAS_USUARIO = "user_id,first_name,last_name,email"
+COLUMNAS_PORTFOLIO = "portfolio_id,user_id,portfolio_name,description"
+COLUMNAS_ASSET = "asset_id,portfolio_id,asset_symbol,quantity,acquisition_price,acquisition_date"
+COLUMNAS_ID_USUARIO = "user_id"
+COLUMNAS_ID_PORTFOLIO = "portfolio_id"
+COLUMNAS_TICKER = "asset_symbol"
+COLUMNAS_PORTFOLIO_USUARIO = "portfolio_id,user_id"
+COLUMNAS_POSICION = "asset_id,portfolio_id,asset_symbol,quantity,acquisition_price"
 
-@dataclass
+# Columna de alta de cada tabla, usada por la sonda de cambios del snapshot
+COLUMNA_ALTA = {'users': 'created_at', 'portfolios': 'created_at', 'assets': 'added_at'}
+# Columnas guardadas en el snapshot local por tabla
+COLUMNAS_SNAPSHOT = {
+    'users': COLUMNAS_USUARIO.split(','),
+    'portfolios': COLUMNAS_PORTFOLIO.split(','),
+    'assets': COLUMNAS_ASSET.split(','),
+}
+
+# Funciones SQL para las consultas ligeras (filtran y deduplican en el servidor).
+# Se crean una vez desde el editor SQL de Supabase; si no existen, los métodos
+# que las usan recurren a una consulta equivalente deduplicando en el cliente.
+SQL_FUNCIONES_RPC = """
+create or replace function user_ids_con_assets()
+returns table (user_id uuid) language sql stable as $$
+    select distinct p.user_id
+    from portfolios p
+    join assets a on a.portfolio_id = p.portfolio_id
+$$;
+
+create or replace function tickers_cliente(p_user_id uuid)
+returns table (asset_symbol varchar) language sql stable as $$
+    select distinct a.asset_symbol
+    from assets a
+    join portfolios p on p.portfolio_id = a.portfolio_id
+    where p.user_id = p_user_id
+$$;
+
+create or replace function tickers_universo()
+returns table (asset_symbol varchar) language sql stable as $$
+    select distinct asset_symbol from assets
+$$;
+
+-- Huella (md5) del contenido de cada tabla para la sonda del snapshot local:
+-- a diferencia del recuento y el último alta, detecta ediciones in situ
+create or replace function huella_portfolios()
+returns table (tabla text, huella text) language sql stable as $$
+    select 'users', md5(coalesce(string_agg(u::text, ',' order by u.user_id), ''))
+    from (select user_id, first_name, last_name, email from users) u
+    union all
+    select 'portfolios', md5(coalesce(string_agg(p::text, ',' order by p.portfolio_id), ''))
+    from (select portfolio_id, user_id, portfolio_name, description from portfolios) p
+    union all
+    select 'assets', md5(coalesce(string_agg(a::text, ',' order by a.asset_id), ''))
+    from (select asset_id, portfolio_id, asset_symbol, quantity, acquisition_price, acquisition_date from assets) a
+$$;
+"""
+
+
+def _dataclass_con_slots(cls: type) -> type:
+    """
+    Dataclass con __slots__: sin __dict__ por instancia, lo que reduce la memoria
+    y acelera el acceso a atributos en carteras grandes. En Python 3.9, donde
+    dataclass no admite slots=True, la clase se recrea con __slots__ igual que
+    hace dataclass en 3.10+: los valores por defecto se quitan de la clase para
+    no chocar con los slots (el __init__ generado ya los tiene) y los de los
+    campos init=False, que 3.9 lee del atributo de clase, los asigna __init__.
+    """
+    if sys.version_info >= (3, 10):
+        return dataclass(slots=True)(cls)
+    cls = dataclass(cls)
+    campos = tuple(f.name for f in fields(cls))
+    atributos = {
+        nombre: valor for nombre, valor in cls.__dict__.items()
+        if nombre not in campos and nombre not in ('__dict__', '__weakref__')
+    }
+    atributos['__slots__'] = campos
+    sin_init = {f.name: f.default for f in fields(cls) if not f.init and f.default is not MISSING}
+    if sin_init:
+        init_generado = cls.__init__
+
+        @functools.wraps(init_generado)
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            for nombre, valor in sin_init.items():
+                object.__setattr__(self, nombre, valor)
+            init_generado(self, *args, **kwargs)
+
+        atributos['__init__'] = __init__
+    nueva = type(cls)(cls.__name__, cls.__bases__, atributos)
+    nueva.__qualname__ = cls.__qualname__
+    return nueva
+
+
+@_dataclass_con_slots
 class Asset:
     """Representa un activo financiero en el portfolio de un cliente."""
     asset_id: int
@@ -23,7 +130,7 @@ class Asset:
     fecha_adquisicion: Optional[str] = None  # acquisition_date
 
 
-@dataclass
+@_dataclass_con_slots
 class Portfolio:
     """Representa un portfolio de un usuario."""
     portfolio_id: int
@@ -37,14 +144,24 @@ class Portfolio:
             self.assets = []
 
 
-@dataclass
+@_dataclass_con_slots
 class Cliente:
-    """Representa un cliente/usuario con sus portfolios."""
+    """
+    Representa un cliente/usuario con sus portfolios.
+    
+    La lista de assets y el conjunto de tickers se calculan una vez y se
+    reutilizan mientras no cambien los portfolios (se detecta al añadir o
+    quitar portfolios o assets, o al reemplazar sus listas). Si se modifica
+    un asset existente, llamar a `invalidar_cache()`.
+    """
     user_id: str
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     email: Optional[str] = None
     portfolios: List[Portfolio] = None
+    _firma: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    _assets: Optional[List[Asset]] = field(default=None, init=False, repr=False, compare=False)
+    _tickers: Optional[FrozenSet[str]] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         if self.portfolios is None:
@@ -56,20 +173,202 @@ class Cliente:
         parts = [p for p in [self.first_name, self.last_name] if p]
         return " ".join(parts) if parts else f"Usuario {self.user_id}"
     
+    def invalidar_cache(self) -> None:
+        """Descarta la lista de assets y el conjunto de tickers precalculados."""
+        self._firma = None
+        self._assets = None
+        self._tickers = None
+    
+    def _actualizar_cache(self) -> None:
+        firma = (id(self.portfolios),) + tuple(
+            (id(p.assets), len(p.assets)) for p in self.portfolios
+        )
+        if firma != self._firma:
+            self._assets = [asset for portfolio in self.portfolios for asset in portfolio.assets]
+            self._tickers = frozenset(asset.ticker for asset in self._assets)
+            self._firma = firma
+    
+    @property
+    def tickers(self) -> FrozenSet[str]:
+        """Conjunto precalculado de tickers de todos los portfolios."""
+        self._actualizar_cache()
+        return self._tickers
+    
     def get_todos_los_assets(self) -> List[Asset]:
         """Retorna todos los assets de todos los portfolios del cliente."""
-        all_assets = []
-        for portfolio in self.portfolios:
-            all_assets.extend(portfolio.assets)
-        return all_assets
+        self._actualizar_cache()
+        return list(self._assets)
     
     def get_todos_los_tickers(self) -> List[str]:
         """Retorna una lista única de todos los tickers en todos los portfolios."""
-        tickers = set()
-        for portfolio in self.portfolios:
-            for asset in portfolio.assets:
-                tickers.add(asset.ticker)
-        return list(tickers)
+        return list(self.tickers)
+    
+    def tabla_assets(self) -> "AssetTable":
+        """Retorna los assets del cliente en formato columnar."""
+        return AssetTable.desde_assets(self.get_todos_los_assets())
+
+
+class AssetTable:
+    """
+    Representación columnar y compacta de un conjunto de assets.
+    
+    Cada columna es un array tipado (`array`): los tickers se guardan como
+    códigos enteros sobre `simbolos`, los importes como float64 (NaN si no hay
+    valor) y las fechas como ordinal del día (0 si no hay fecha). Para carteras
+    grandes ocupa una fracción de la memoria de los objetos Asset y se recorre
+    sin crear objetos; iterar la tabla produce Asset para los usos existentes.
+    """
+
+    __slots__ = ('asset_ids', 'portfolio_ids', 'codigos', 'cantidades', 'precios', 'fechas', 'simbolos', '_codigo_simbolo')
+
+    def __init__(self):
+        self.asset_ids = array('q')
+        self.portfolio_ids = array('q')
+        self.codigos = array('l')
+        self.cantidades = array('d')
+        self.precios = array('d')
+        self.fechas = array('l')
+        self.simbolos: List[str] = []
+        self._codigo_simbolo: Dict[str, int] = {}
+
+    @classmethod
+    def desde_assets(cls, assets: Iterable[Asset]) -> "AssetTable":
+        """Crea la tabla a partir de objetos Asset."""
+        tabla = cls()
+        for asset in assets:
+            tabla.agregar(
+                asset.asset_id, asset.portfolio_id, asset.ticker,
+                asset.cantidad, asset.precio_compra, asset.fecha_adquisicion,
+            )
+        return tabla
+
+    def agregar(
+        self,
+        asset_id: int,
+        portfolio_id: int,
+        ticker: str,
+        cantidad: Optional[float] = None,
+        precio_compra: Optional[float] = None,
+        fecha_adquisicion: Optional[str] = None,
+    ) -> None:
+        """Añade un asset a la tabla."""
+        codigo = self._codigo_simbolo.get(ticker)
+        if codigo is None:
+            codigo = self._codigo_simbolo[ticker] = len(self.simbolos)
+            self.simbolos.append(ticker)
+        self.asset_ids.append(asset_id)
+        self.portfolio_ids.append(portfolio_id)
+        self.codigos.append(codigo)
+        self.cantidades.append(math.nan if cantidad is None else float(cantidad))
+        self.precios.append(math.nan if precio_compra is None else float(precio_compra))
+        self.fechas.append(
+            datetime.date.fromisoformat(fecha_adquisicion[:10]).toordinal() if fecha_adquisicion else 0
+        )
+
+    def __len__(self) -> int:
+        return len(self.asset_ids)
+
+    def ticker(self, i: int) -> str:
+        """Retorna el ticker de la fila `i`."""
+        return self.simbolos[self.codigos[i]]
+
+    def fila(self, i: int) -> Asset:
+        """Materializa la fila `i` como Asset."""
+        cantidad = self.cantidades[i]
+        precio = self.precios[i]
+        fecha = self.fechas[i]
+        return Asset(
+            asset_id=self.asset_ids[i],
+            portfolio_id=self.portfolio_ids[i],
+            ticker=self.simbolos[self.codigos[i]],
+            cantidad=None if math.isnan(cantidad) else cantidad,
+            precio_compra=None if math.isnan(precio) else precio,
+            fecha_adquisicion=datetime.date.fromordinal(fecha).isoformat() if fecha else None,
+        )
+
+    def __iter__(self) -> Iterator[Asset]:
+        for i in range(len(self.asset_ids)):
+            yield self.fila(i)
+
+    def tickers(self) -> FrozenSet[str]:
+        """Conjunto de tickers presentes en la tabla."""
+        return frozenset(self.simbolos)
+
+    def filas_de_ticker(self, ticker: str) -> List[int]:
+        """Retorna los índices de fila del ticker."""
+        codigo = self._codigo_simbolo.get(ticker)
+        if codigo is None:
+            return []
+        return [i for i, c in enumerate(self.codigos) if c == codigo]
+
+
+@dataclass
+class FalloFila:
+    """Fila de una escritura masiva que no se pudo aplicar."""
+    indice: int  # Posición de la fila en la entrada
+    fila: Any
+    error: str
+
+
+@dataclass
+class ResultadoLote:
+    """
+    Resultado de una escritura masiva.
+    
+    `ids` está alineado con la entrada: el id creado/actualizado/eliminado de
+    cada fila, o None si esa fila falló (ver `fallos`).
+    """
+    ids: List[Any] = field(default_factory=list)
+    fallos: List[FalloFila] = field(default_factory=list)
+    peticiones: int = 0
+
+    @property
+    def exitosos(self) -> int:
+        """Número de filas aplicadas."""
+        return sum(1 for id_fila in self.ids if id_fila is not None)
+
+
+@dataclass
+class CambiosPortfolios:
+    """
+    Cambios en portfolios y assets desde un watermark.
+    
+    - Altas: filas con created_at/added_at posterior al watermark.
+    - Bajas (tombstones): ids presentes en el snapshot anterior que ya no existen.
+    - `sin_referencia` indica que no había watermark ni snapshot con el que
+      comparar, así que hay que tratar a todos los clientes como cambiados;
+      `watermark` trae entonces el último alta actual del servidor, para que
+      la siguiente ejecución ya tenga referencia.
+    
+    Las modificaciones en el sitio (p. ej. cambiar la cantidad de un asset)
+    no alteran created_at/added_at y no se detectan, y sin snapshot local
+    tampoco las bajas: el modo solo_cambios de financial_api las detecta por
+    cliente con la huella de posiciones del registro de informes.
+    """
+    watermark: Optional[str]  # Nuevo watermark: último timestamp de alta visto
+    portfolios_nuevos: List[Portfolio] = field(default_factory=list)
+    assets_nuevos: List[Asset] = field(default_factory=list)
+    portfolios_eliminados: List[int] = field(default_factory=list)
+    assets_eliminados: List[int] = field(default_factory=list)
+    clientes_afectados: List[str] = field(default_factory=list)
+    sin_referencia: bool = False
+
+    @property
+    def hay_cambios(self) -> bool:
+        """Indica si hubo altas o bajas."""
+        return bool(
+            self.portfolios_nuevos or self.assets_nuevos
+            or self.portfolios_eliminados or self.assets_eliminados
+        )
+
+
+def _es_funcion_inexistente(error: Exception) -> bool:
+    """Indica si el error de PostgREST es porque la función RPC no existe (PGRST202 / 404)."""
+    codigo = str(getattr(error, "code", "") or "")
+    if codigo in ("PGRST202", "42883", "404"):
+        return True
+    texto = str(error)
+    return "PGRST202" in texto or "Could not find the function" in texto
 
 
 class DatabaseManager:
@@ -108,15 +407,491 @@ class DatabaseManager:
     def __init__(self):
         """Inicializa el gestor de base de datos con conexión a Supabase."""
         self._client: Optional[Client] = None
+        self._limitador = get_rate_limiter("supabase")
+        self._rpc_no_disponibles: set = set()
+        self.indice_tickers: Optional[IndiceTickers] = None
 
     @property
     def client(self) -> Client:
-        """Lazy initialization del cliente Supabase."""
+        """Cliente Supabase compartido del proceso (pool HTTP con keep-alive)."""
         if self._client is None:
-            key = SUPABASE_SERVICE_ROLE or SUPABASE_ANON_KEY
-            self._client = create_client(SUPABASE_URL, key)
+            self._client = get_supabase_client()
         return self._client
 
+    def _ejecutar(self, consulta: Any) -> Any:
+        """Ejecuta una consulta respetando el límite de tasa compartido de Supabase."""
+        return self._limitador.ejecutar(consulta.execute)
+
+    # --- Carga masiva del grafo Cliente → Portfolio → Asset ---
+
+    @staticmethod
+    def _cliente_desde_fila(row: Dict[str, Any]) -> Cliente:
+        return Cliente(
+            user_id=row['user_id'],
+            first_name=row.get('first_name'),
+            last_name=row.get('last_name'),
+            email=row.get('email')
+        )
+
+    @staticmethod
+    def _portfolio_desde_fila(row: Dict[str, Any]) -> Portfolio:
+        return Portfolio(
+            portfolio_id=row['portfolio_id'],
+            user_id=row['user_id'],
+            nombre=row.get('portfolio_name'),
+            descripcion=row.get('description')
+        )
+
+    @staticmethod
+    def _asset_desde_fila(row: Dict[str, Any]) -> Asset:
+        return Asset(
+            asset_id=row['asset_id'],
+            portfolio_id=row['portfolio_id'],
+            ticker=row['asset_symbol'],  # Mapear asset_symbol a ticker
+            cantidad=row.get('quantity'),
+            precio_compra=row.get('acquisition_price'),
+            fecha_adquisicion=row.get('acquisition_date')
+        )
+
+    def _consultar_paginado(self, construir: Callable[[], Any], orden: str) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre todas las filas de una consulta en páginas de SUPABASE_TAMANO_PAGINA,
+        ordenadas por `orden` para que la paginación sea estable.
+        
+        Args:
+            construir: Función que crea la consulta (select + filtros) sin ejecutar
+            orden: Columna única por la que ordenar (la clave primaria)
+        """
+        inicio = 0
+        while True:
+            consulta = construir().order(orden).range(inicio, inicio + SUPABASE_TAMANO_PAGINA - 1)
+            filas = self._ejecutar(consulta).data or []
+            yield from filas
+            if len(filas) < SUPABASE_TAMANO_PAGINA:
+                return
+            inicio += SUPABASE_TAMANO_PAGINA
+
+    def _consultar_rpc(
+        self,
+        funcion: str,
+        params: Dict[str, Any],
+        orden: str,
+        respaldo: Callable[[], Iterable[Dict[str, Any]]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Ejecuta una función SQL (ver SQL_FUNCIONES_RPC) paginando su resultado.
+        Si la función no existe en la base de datos, usa `respaldo` y no vuelve
+        a intentarlo durante la vida del gestor. Cualquier otro error (timeout,
+        5xx, red) se propaga: los de cuota ya los reintenta el limitador.
+        """
+        if funcion not in self._rpc_no_disponibles:
+            try:
+                return list(self._consultar_paginado(lambda: self.client.rpc(funcion, params), orden))
+            except Exception as e:
+                if not _es_funcion_inexistente(e):
+                    raise
+                logger.warning(f"Función RPC '{funcion}' no disponible ({e}); se usa la consulta de respaldo")
+                self._rpc_no_disponibles.add(funcion)
+        return list(respaldo())
+
+    def _consultar_en_lotes(
+        self, tabla: str, columnas: str, columna: str, valores: Iterable[Any], orden: str
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Selecciona `columnas` de `tabla` filtrando por `columna IN valores`,
+        troceando la lista en lotes de SUPABASE_TAMANO_LOTE_IN para no exceder
+        la longitud de la URL.
+        """
+        valores = list(dict.fromkeys(valores))
+        for i in range(0, len(valores), SUPABASE_TAMANO_LOTE_IN):
+            lote = valores[i:i + SUPABASE_TAMANO_LOTE_IN]
+            yield from self._consultar_paginado(
+                lambda: self.client.table(tabla).select(columnas).in_(columna, lote), orden
+            )
+
+    def _cargar_portfolios(self, user_ids: List[str]) -> List[Portfolio]:
+        """
+        Carga los portfolios de varios usuarios con sus assets en dos consultas
+        masivas (portfolios y assets) unidas en memoria por portfolio_id.
+        """
+        portfolios = [
+            self._portfolio_desde_fila(row)
+            for row in self._consultar_en_lotes('portfolios', COLUMNAS_PORTFOLIO, 'user_id', user_ids, 'portfolio_id')
+        ]
+        por_id = {portfolio.portfolio_id: portfolio for portfolio in portfolios}
+        
+        for row in self._consultar_en_lotes('assets', COLUMNAS_ASSET, 'portfolio_id', por_id, 'asset_id'):
+            portfolio = por_id.get(row['portfolio_id'])
+            if portfolio is not None:
+                portfolio.assets.append(self._asset_desde_fila(row))
+        return portfolios
+
+    def _adjuntar_portfolios(self, clientes: List[Cliente]) -> None:
+        """Carga en bloque los portfolios y assets de los clientes y los asigna por user_id."""
+        por_id = {cliente.user_id: cliente for cliente in clientes}
+        for portfolio in self._cargar_portfolios(list(por_id)):
+            cliente = por_id.get(portfolio.user_id)
+            if cliente is not None:
+                cliente.portfolios.append(portfolio)
+
+    def iter_clientes(
+        self,
+        tamano_pagina: int = SUPABASE_TAMANO_PAGINA,
+        cargar_portfolios: bool = True,
+        indice: Optional[ConstructorIndiceTickers] = None,
+    ) -> Iterator[Cliente]:
+        """
+        Recorre todos los clientes página a página con paginación por clave
+        (user_id > último visto), cargando los portfolios y assets de cada página
+        antes de entregarla. Quien consume puede empezar a procesar la primera
+        página mientras las siguientes aún no se han pedido.
+        
+        Args:
+            tamano_pagina: Usuarios por página (no debe superar el max-rows de PostgREST)
+            cargar_portfolios: Si False, solo se leen los datos del usuario
+                (sin portfolios ni assets)
+            indice: Constructor al que se añaden las posiciones de cada página
+                (para construir el índice ticker → titulares durante la carga)
+            
+        Yields:
+            Cliente en orden de user_id
+        """
+        ultimo_id = None
+        while True:
+            consulta = self.client.table('users').select(COLUMNAS_USUARIO)
+            if ultimo_id is not None:
+                consulta = consulta.gt('user_id', ultimo_id)
+            filas = self._ejecutar(consulta.order('user_id').limit(tamano_pagina)).data or []
+            if not filas:
+                return
+            
+            clientes = [self._cliente_desde_fila(row) for row in filas]
+            if cargar_portfolios:
+                self._adjuntar_portfolios(clientes)
+                if indice is not None:
+                    for cliente in clientes:
+                        indice.agregar_cliente(cliente)
+            logger.debug(f"Página de {len(clientes)} clientes cargada (desde user_id > {ultimo_id})")
+            yield from clientes
+            
+            if len(filas) < tamano_pagina:
+                return
+            ultimo_id = filas[-1]['user_id']
+
+    # --- Snapshot local del grafo ---
+
+    def _huellas_tablas(self) -> Optional[Dict[str, str]]:
+        """
+        Huella del contenido de cada tabla (función `huella_portfolios`, ver
+        SQL_FUNCIONES_RPC) o None si la función no existe en la base de datos.
+        """
+        funcion = 'huella_portfolios'
+        if funcion in self._rpc_no_disponibles:
+            return None
+        try:
+            filas = self._ejecutar(self.client.rpc(funcion, {})).data or []
+        except Exception as e:
+            if not _es_funcion_inexistente(e):
+                raise
+            logger.warning(
+                f"Función RPC '{funcion}' no disponible ({e}); la sonda del snapshot "
+                f"no detectará ediciones de filas existentes"
+            )
+            self._rpc_no_disponibles.add(funcion)
+            return None
+        return {fila['tabla']: fila['huella'] for fila in filas}
+
+    def sondear_cambios(self) -> Dict[str, List[Any]]:
+        """
+        Sonda barata de cambios: por tabla, número de filas y último timestamp
+        de alta (una consulta por tabla que devuelve una sola fila) y, si existe
+        la función `huella_portfolios`, la huella del contenido de la tabla.
+        
+        Sin la huella, la sonda solo ve altas y bajas: una edición in situ
+        (cambiar la cantidad o el ticker de un asset) no cambia el recuento ni
+        el último alta, y el snapshot seguiría vigente hasta que venza el TTL.
+        
+        Returns:
+            Dict tabla -> [filas, max created_at/added_at(, huella)]
+        """
+        sonda: Dict[str, List[Any]] = {}
+        for tabla, columna in COLUMNA_ALTA.items():
+            response = self._ejecutar(
+                self.client.table(tabla)
+                .select(columna, count='exact')
+                .order(columna, desc=True, nullsfirst=False)
+                .limit(1)
+            )
+            ultimo = response.data[0][columna] if response.data else None
+            sonda[tabla] = [response.count, ultimo]
+        huellas = self._huellas_tablas()
+        if huellas is not None:
+            for tabla in sonda:
+                sonda[tabla].append(huellas.get(tabla))
+        return sonda
+
+    @staticmethod
+    def _fila_snapshot(cliente: Cliente) -> List[Any]:
+        """Fila anidada del snapshot (en el orden de COLUMNAS_SNAPSHOT) de un cliente."""
+        return [
+            [cliente.user_id, cliente.first_name, cliente.last_name, cliente.email],
+            [
+                [
+                    [portfolio.portfolio_id, portfolio.user_id, portfolio.nombre, portfolio.descripcion],
+                    [
+                        [
+                            asset.asset_id, asset.portfolio_id, asset.ticker,
+                            asset.cantidad, asset.precio_compra, asset.fecha_adquisicion,
+                        ]
+                        for asset in portfolio.assets
+                    ],
+                ]
+                for portfolio in cliente.portfolios
+            ],
+        ]
+
+    def _cliente_desde_snapshot(self, fila: List[Any], columnas: Dict[str, List[str]]) -> Cliente:
+        """Reconstruye un cliente con sus portfolios y assets a partir de su fila del snapshot."""
+        fila_usuario, filas_portfolios = fila
+        cliente = self._cliente_desde_fila(dict(zip(columnas['users'], fila_usuario)))
+        for fila_portfolio, filas_assets in filas_portfolios:
+            portfolio = self._portfolio_desde_fila(dict(zip(columnas['portfolios'], fila_portfolio)))
+            portfolio.assets.extend(
+                self._asset_desde_fila(dict(zip(columnas['assets'], fila_asset))) for fila_asset in filas_assets
+            )
+            cliente.portfolios.append(portfolio)
+        return cliente
+
+    def iter_clientes_snapshot(
+        self,
+        indice: Optional[ConstructorIndiceTickers] = None,
+        forzar_recarga: bool = False,
+    ) -> Iterator[Cliente]:
+        """
+        Recorre todos los clientes con sus portfolios usando el snapshot local
+        si la sonda de cambios coincide y no ha vencido el TTL. Si no, los lee
+        de Supabase por páginas (como `iter_clientes`) y los va escribiendo en
+        un snapshot nuevo con la sonda tomada antes de leer, que se publica al
+        terminar el recorrido (si se interrumpe, se descarta).
+        
+        En ambos casos los clientes se leen y se escriben de uno en uno, así que
+        la memoria no crece con el número de clientes.
+        
+        Args:
+            indice: Constructor del índice ticker → titulares (opcional)
+            forzar_recarga: Ignora el snapshot existente
+            
+        Yields:
+            Cliente con sus portfolios y assets, en orden de user_id
+        """
+        sonda = self.sondear_cambios()
+        entrada = None if forzar_recarga else portfolio_snapshot.cargar(sonda)
+        if entrada is not None:
+            for fila in portfolio_snapshot.iter_clientes():
+                cliente = self._cliente_desde_snapshot(fila, entrada['columnas'])
+                if indice is not None:
+                    indice.agregar_cliente(cliente)
+                yield cliente
+            return
+        
+        escritura = portfolio_snapshot.escritura(sonda, COLUMNAS_SNAPSHOT)
+        try:
+            for cliente in self.iter_clientes(indice=indice):
+                escritura.agregar(self._fila_snapshot(cliente))
+                yield cliente
+            escritura.confirmar()
+        finally:
+            escritura.descartar()
+
+    # --- Cambios incrementales (delta) ---
+
+    @staticmethod
+    def _watermark_sonda(sonda: Dict[str, List[Any]]) -> Optional[str]:
+        """Último timestamp de alta de portfolios/assets registrado en una sonda de cambios."""
+        marcas = [sonda[tabla][1] for tabla in ('portfolios', 'assets') if tabla in sonda]
+        marcas = [marca for marca in marcas if marca]
+        return max(marcas) if marcas else None
+
+    def get_cambios_desde(self, watermark: Optional[str] = None) -> CambiosPortfolios:
+        """
+        Obtiene los portfolios y assets dados de alta o de baja desde un watermark.
+        
+        Las altas se consultan en el servidor (created_at/added_at > watermark).
+        Las bajas se detectan comparando los ids actuales (solo la columna de id)
+        con los del último snapshot local de portfolios, por lo que esta función
+        debe llamarse antes de recargar el snapshot en la ejecución actual.
+        
+        Args:
+            watermark: Timestamp ISO desde el que buscar altas. Si es None, se usa
+                el último timestamp registrado en el snapshot anterior y, si
+                tampoco hay snapshot, se toma el último alta actual del servidor
+                como watermark inicial (sin_referencia=True)
+                
+        Returns:
+            CambiosPortfolios con las altas, las bajas, los clientes afectados y
+            el nuevo watermark a guardar para la siguiente ejecución
+        """
+        try:
+            previo = portfolio_snapshot.ultimo()
+            if watermark is None and previo is not None:
+                watermark = self._watermark_sonda(previo['sonda'])
+            if watermark is None:
+                inicial = self._watermark_sonda(self.sondear_cambios())
+                logger.warning(
+                    f"Sin watermark ni snapshot previo: no se pueden calcular cambios incrementales "
+                    f"(watermark inicial {inicial})"
+                )
+                return CambiosPortfolios(watermark=inicial, sin_referencia=True)
+            
+            cambios = CambiosPortfolios(watermark=watermark)
+            afectados: Dict[str, None] = {}
+            propietarios: Dict[int, str] = {}
+            portfolio_de_asset: Dict[int, int] = {}
+            if previo is not None:
+                columnas = previo['columnas']['portfolios']
+                i_pid, i_uid = columnas.index('portfolio_id'), columnas.index('user_id')
+                columnas = previo['columnas']['assets']
+                i_aid, i_apid = columnas.index('asset_id'), columnas.index('portfolio_id')
+                for _, filas_portfolios in portfolio_snapshot.iter_clientes():
+                    for fila_portfolio, filas_assets in filas_portfolios:
+                        propietarios[fila_portfolio[i_pid]] = fila_portfolio[i_uid]
+                        for fila_asset in filas_assets:
+                            portfolio_de_asset[fila_asset[i_aid]] = fila_asset[i_apid]
+            
+            # Altas
+            for row in self._consultar_paginado(
+                lambda: self.client.table('portfolios')
+                .select(f"{COLUMNAS_PORTFOLIO},{COLUMNA_ALTA['portfolios']}")
+                .gt(COLUMNA_ALTA['portfolios'], watermark),
+                'portfolio_id',
+            ):
+                portfolio = self._portfolio_desde_fila(row)
+                cambios.portfolios_nuevos.append(portfolio)
+                propietarios[portfolio.portfolio_id] = portfolio.user_id
+                afectados[portfolio.user_id] = None
+                cambios.watermark = max(cambios.watermark, row[COLUMNA_ALTA['portfolios']] or '')
+            
+            for row in self._consultar_paginado(
+                lambda: self.client.table('assets')
+                .select(f"{COLUMNAS_ASSET},{COLUMNA_ALTA['assets']}")
+                .gt(COLUMNA_ALTA['assets'], watermark),
+                'asset_id',
+            ):
+                cambios.assets_nuevos.append(self._asset_desde_fila(row))
+                cambios.watermark = max(cambios.watermark, row[COLUMNA_ALTA['assets']] or '')
+            
+            desconocidos = {a.portfolio_id for a in cambios.assets_nuevos} - set(propietarios)
+            for row in self._consultar_en_lotes(
+                'portfolios', COLUMNAS_PORTFOLIO_USUARIO, 'portfolio_id', desconocidos, 'portfolio_id'
+            ):
+                propietarios[row['portfolio_id']] = row['user_id']
+            for asset in cambios.assets_nuevos:
+                if asset.portfolio_id in propietarios:
+                    afectados[propietarios[asset.portfolio_id]] = None
+            
+            # Bajas: ids del snapshot anterior que ya no existen
+            if previo is not None:
+                portfolios_actuales = {
+                    row['portfolio_id']
+                    for row in self._consultar_paginado(
+                        lambda: self.client.table('portfolios').select(COLUMNAS_ID_PORTFOLIO), 'portfolio_id'
+                    )
+                }
+                assets_actuales = {
+                    row['asset_id']
+                    for row in self._consultar_paginado(
+                        lambda: self.client.table('assets').select('asset_id'), 'asset_id'
+                    )
+                }
+                cambios.portfolios_eliminados = sorted(set(propietarios) - portfolios_actuales)
+                cambios.assets_eliminados = sorted(set(portfolio_de_asset) - assets_actuales)
+                for portfolio_id in cambios.portfolios_eliminados:
+                    afectados[propietarios[portfolio_id]] = None
+                for asset_id in cambios.assets_eliminados:
+                    user_id = propietarios.get(portfolio_de_asset[asset_id])
+                    if user_id is not None:
+                        afectados[user_id] = None
+            
+            cambios.clientes_afectados = list(afectados)
+            logger.info(
+                f"✅ Cambios desde {watermark}: {len(cambios.portfolios_nuevos)} portfolios y "
+                f"{len(cambios.assets_nuevos)} assets nuevos, {len(cambios.portfolios_eliminados)} "
+                f"portfolios y {len(cambios.assets_eliminados)} assets eliminados "
+                f"({len(cambios.clientes_afectados)} clientes afectados)"
+            )
+            return cambios
+            
+        except Exception as e:
+            logger.error(f"Error al obtener los cambios desde {watermark}: {e}")
+            raise
+
+    def cargar_clientes(self, user_ids: Optional[List[str]] = None) -> List[Cliente]:
+        """
+        Carga clientes con sus portfolios y assets en un número constante de consultas:
+        usuarios, portfolios (IN user_id) y assets (IN portfolio_id), en lugar de una
+        consulta por usuario y otra por portfolio. El grafo se arma en memoria con
+        diccionarios por clave.
+        
+        Args:
+            user_ids: Usuarios a cargar. Si es None, se cargan todos
+            
+        Returns:
+            List[Cliente]: Clientes con sus portfolios y assets, ordenados por user_id
+        """
+        if user_ids is None:
+            constructor = ConstructorIndiceTickers()
+            if PORTFOLIO_SNAPSHOT_ACTIVO:
+                clientes = list(self.iter_clientes_snapshot(indice=constructor))
+            else:
+                clientes = list(self.iter_clientes(indice=constructor))
+            self.indice_tickers = constructor.construir()
+            return clientes
+        
+        clientes = [
+            self._cliente_desde_fila(row)
+            for row in self._consultar_en_lotes('users', COLUMNAS_USUARIO, 'user_id', user_ids, 'user_id')
+        ]
+        self._adjuntar_portfolios(clientes)
+        return clientes
+
+    def construir_indice_tickers(self) -> IndiceTickers:
+        """
+        Construye el índice ticker → titulares de todos los clientes leyendo solo
+        las columnas de posición (portfolio → user_id y assets), sin cargar los
+        datos de los usuarios. El índice queda disponible en `indice_tickers`.
+        
+        Returns:
+            IndiceTickers: Índice con los titulares de cada ticker normalizado
+        """
+        try:
+            propietarios = {
+                row['portfolio_id']: row['user_id']
+                for row in self._consultar_paginado(
+                    lambda: self.client.table('portfolios').select(COLUMNAS_PORTFOLIO_USUARIO), 'portfolio_id'
+                )
+            }
+            constructor = ConstructorIndiceTickers()
+            for row in self._consultar_paginado(
+                lambda: self.client.table('assets').select(COLUMNAS_POSICION), 'asset_id'
+            ):
+                user_id = propietarios.get(row['portfolio_id'])
+                if user_id is not None:
+                    constructor.agregar(
+                        row['asset_symbol'], user_id, row['portfolio_id'],
+                        row.get('quantity'), row.get('acquisition_price'),
+                    )
+            self.indice_tickers = constructor.construir()
+            return self.indice_tickers
+        except Exception as e:
+            logger.error(f"Error al construir el índice de tickers: {e}")
+            raise
+
+    def get_indice_tickers(self, refrescar: bool = False) -> IndiceTickers:
+        """Retorna el último índice ticker → titulares, construyéndolo si no existe."""
+        if self.indice_tickers is None or refrescar:
+            return self.construir_indice_tickers()
+        return self.indice_tickers
+
     def get_clientes_activos(self) -> List[Cliente]:
         """
         Obtiene todos los clientes/usuarios de la base de datos con sus portfolios.
@@ -125,27 +900,14 @@ class DatabaseManager:
             List[Cliente]: Lista de clientes con sus portfolios y assets cargados
         """
         try:
-            # Obtener todos los usuarios
-            response = self.client.table('users').select('*').execute()
+            clientes = self.cargar_clientes()
             
-            if not response.data:
+            if not clientes:
                 logger.warning("No se encontraron usuarios en la base de datos")
                 return []
             
-            clientes = []
-            for row in response.data:
-                cliente = Cliente(
-                    user_id=row['user_id'],
-                    first_name=row.get('first_name'),
-                    last_name=row.get('last_name'),
-                    email=row.get('email')
-                )
-                
-                # Cargar portfolios del cliente
-                cliente.portfolios = self.get_portfolios_cliente(cliente.user_id)
-                clientes.append(cliente)
-            
-            logger.info(f"✅ Se cargaron {len(clientes)} clientes")
+            total_portfolios = sum(len(c.portfolios) for c in clientes)
+            logger.info(f"✅ Se cargaron {len(clientes)} clientes con {total_portfolios} portfolios")
             return clientes
             
         except Exception as e:
@@ -163,23 +925,13 @@ class DatabaseManager:
             Cliente o None si no se encuentra
         """
         try:
-            response = self.client.table('users').select('*').eq('user_id', user_id).execute()
+            clientes = self.cargar_clientes([user_id])
             
-            if not response.data:
+            if not clientes:
                 logger.warning(f"No se encontró el usuario con ID: {user_id}")
                 return None
             
-            row = response.data[0]
-            cliente = Cliente(
-                user_id=row['user_id'],
-                first_name=row.get('first_name'),
-                last_name=row.get('last_name'),
-                email=row.get('email')
-            )
-            
-            # Cargar portfolios del cliente
-            cliente.portfolios = self.get_portfolios_cliente(cliente.user_id)
-            
+            cliente = clientes[0]
             total_assets = sum(len(p.assets) for p in cliente.portfolios)
             logger.info(f"✅ Cliente {user_id} cargado con {len(cliente.portfolios)} portfolios y {total_assets} assets")
             return cliente
@@ -199,25 +951,12 @@ class DatabaseManager:
             List[Portfolio]: Lista de portfolios del cliente con sus assets
         """
         try:
-            response = self.client.table('portfolios').select('*').eq('user_id', user_id).execute()
+            portfolios = self._cargar_portfolios([user_id])
             
-            if not response.data:
+            if not portfolios:
                 logger.warning(f"No se encontraron portfolios para el usuario: {user_id}")
                 return []
             
-            portfolios = []
-            for row in response.data:
-                portfolio = Portfolio(
-                    portfolio_id=row['portfolio_id'],
-                    user_id=row['user_id'],
-                    nombre=row.get('portfolio_name'),
-                    descripcion=row.get('description')
-                )
-                
-                # Cargar assets del portfolio
-                portfolio.assets = self.get_assets_portfolio(portfolio.portfolio_id)
-                portfolios.append(portfolio)
-            
             logger.info(f"✅ Se cargaron {len(portfolios)} portfolios para usuario {user_id}")
             return portfolios
             
@@ -236,23 +975,13 @@ class DatabaseManager:
             List[Asset]: Lista de assets del portfolio
         """
         try:
-            response = self.client.table('assets').select('*').eq('portfolio_id', portfolio_id).execute()
+            response = self._ejecutar(self.client.table('assets').select(COLUMNAS_ASSET).eq('portfolio_id', portfolio_id))
             
             if not response.data:
                 logger.debug(f"No se encontraron assets para el portfolio: {portfolio_id}")
                 return []
             
-            assets = []
-            for row in response.data:
-                asset = Asset(
-                    asset_id=row['asset_id'],
-                    portfolio_id=row['portfolio_id'],
-                    ticker=row['asset_symbol'],  # Mapear asset_symbol a ticker
-                    cantidad=row.get('quantity'),
-                    precio_compra=row.get('acquisition_price'),
-                    fecha_adquisicion=row.get('acquisition_date')
-                )
-                assets.append(asset)
+            assets = [self._asset_desde_fila(row) for row in response.data]
             
             logger.debug(f"✅ Se cargaron {len(assets)} assets para portfolio {portfolio_id}")
             return assets
@@ -261,6 +990,43 @@ class DatabaseManager:
             logger.error(f"Error al obtener assets del portfolio {portfolio_id}: {e}")
             raise
 
+    def get_tabla_assets(self, user_id: Optional[str] = None) -> AssetTable:
+        """
+        Carga los assets directamente en formato columnar, sin crear objetos
+        Asset (pensado para carteras con decenas de miles de posiciones).
+        
+        Args:
+            user_id: Cliente cuyos assets cargar. Si es None, los de todos
+            
+        Returns:
+            AssetTable: Assets ordenados por asset_id
+        """
+        try:
+            if user_id is None:
+                filas = self._consultar_paginado(
+                    lambda: self.client.table('assets').select(COLUMNAS_ASSET), 'asset_id'
+                )
+            else:
+                portfolio_ids = [
+                    row['portfolio_id']
+                    for row in self._consultar_en_lotes(
+                        'portfolios', COLUMNAS_ID_PORTFOLIO, 'user_id', [user_id], 'portfolio_id'
+                    )
+                ]
+                filas = self._consultar_en_lotes('assets', COLUMNAS_ASSET, 'portfolio_id', portfolio_ids, 'asset_id')
+            
+            tabla = AssetTable()
+            for row in filas:
+                tabla.agregar(
+                    row['asset_id'], row['portfolio_id'], row['asset_symbol'],
+                    row.get('quantity'), row.get('acquisition_price'), row.get('acquisition_date'),
+                )
+            logger.info(f"✅ Tabla de {len(tabla)} assets cargada")
+            return tabla
+        except Exception as e:
+            logger.error(f"Error al cargar la tabla de assets: {e}")
+            raise
+
     def get_tickers_cliente(self, user_id: str) -> List[str]:
         """
         Obtiene solo los tickers únicos de todos los portfolios de un cliente.
@@ -273,16 +1039,71 @@ class DatabaseManager:
             List[str]: Lista de tickers únicos
         """
         try:
-            portfolios = self.get_portfolios_cliente(user_id)
-            tickers = set()
-            for portfolio in portfolios:
-                for asset in portfolio.assets:
-                    tickers.add(asset.ticker)
-            return list(tickers)
+            filas = self._consultar_rpc(
+                'tickers_cliente',
+                {'p_user_id': user_id},
+                'asset_symbol',
+                lambda: self._consultar_paginado(
+                    lambda: self.client.table('assets')
+                    .select(f"{COLUMNAS_TICKER},portfolios!inner(user_id)")
+                    .eq('portfolios.user_id', user_id),
+                    'asset_id',
+                ),
+            )
+            return list(dict.fromkeys(row['asset_symbol'] for row in filas))
         except Exception as e:
             logger.error(f"Error al obtener tickers del cliente {user_id}: {e}")
             raise
 
+    def get_tickers_universo(self) -> List[str]:
+        """
+        Obtiene los tickers únicos de los portfolios de todos los clientes.
+        
+        Returns:
+            List[str]: Lista de tickers únicos
+        """
+        try:
+            filas = self._consultar_rpc(
+                'tickers_universo',
+                {},
+                'asset_symbol',
+                lambda: self._consultar_paginado(
+                    lambda: self.client.table('assets').select(COLUMNAS_TICKER), 'asset_id'
+                ),
+            )
+            tickers = list(dict.fromkeys(row['asset_symbol'] for row in filas))
+            logger.info(f"✅ Se encontraron {len(tickers)} tickers distintos entre todos los clientes")
+            return tickers
+        except Exception as e:
+            logger.error(f"Error al obtener los tickers de todos los clientes: {e}")
+            raise
+
+    def get_user_ids_con_assets(self) -> List[str]:
+        """
+        Obtiene los user_id de los clientes con al menos un asset en algún
+        portfolio, sin cargar sus portfolios ni assets.
+        
+        Returns:
+            List[str]: user_id ordenados
+        """
+        try:
+            filas = self._consultar_rpc(
+                'user_ids_con_assets',
+                {},
+                'user_id',
+                lambda: self._consultar_paginado(
+                    lambda: self.client.table('users')
+                    .select(f"{COLUMNAS_ID_USUARIO},portfolios!inner(assets!inner(asset_id))"),
+                    'user_id',
+                ),
+            )
+            user_ids = list(dict.fromkeys(row['user_id'] for row in filas))
+            logger.info(f"✅ Se encontraron {len(user_ids)} clientes con assets")
+            return user_ids
+        except Exception as e:
+            logger.error(f"Error al obtener los clientes con assets: {e}")
+            raise
+
     def agregar_asset_portfolio(self, portfolio_id: int, ticker: str, cantidad: float = None, 
                                 precio_compra: float = None, fecha_adquisicion: str = None) -> bool:
         """
@@ -307,7 +1128,8 @@ class DatabaseManager:
                 'acquisition_date': fecha_adquisicion
             }
             
-            self.client.table('assets').insert(data).execute()
+            self._ejecutar(self.client.table('assets').insert(data))
+            portfolio_snapshot.invalidar()
             logger.info(f"✅ Asset {ticker} agregado al portfolio {portfolio_id}")
             return True
             
@@ -326,7 +1148,8 @@ class DatabaseManager:
             bool: True si se eliminó exitosamente
         """
         try:
-            self.client.table('assets').delete().eq('asset_id', asset_id).execute()
+            self._ejecutar(self.client.table('assets').delete().eq('asset_id', asset_id))
+            portfolio_snapshot.invalidar()
             logger.info(f"✅ Asset {asset_id} eliminado exitosamente")
             return True
             
@@ -353,7 +1176,8 @@ class DatabaseManager:
                 'description': descripcion
             }
             
-            response = self.client.table('portfolios').insert(data).execute()
+            response = self._ejecutar(self.client.table('portfolios').insert(data))
+            portfolio_snapshot.invalidar()
             portfolio_id = response.data[0]['portfolio_id'] if response.data else None
             logger.info(f"✅ Portfolio '{nombre}' creado para usuario {user_id} con ID {portfolio_id}")
             return portfolio_id
@@ -363,6 +1187,230 @@ class DatabaseManager:
             raise
 
 
+    # --- Escritura masiva ---
+
+    @staticmethod
+    def _fila_asset(datos: Any) -> Dict[str, Any]:
+        """Convierte un Asset o un dict con nombres del modelo a una fila de la tabla assets."""
+        if isinstance(datos, Asset):
+            datos = {
+                'asset_id': datos.asset_id, 'portfolio_id': datos.portfolio_id, 'ticker': datos.ticker,
+                'cantidad': datos.cantidad, 'precio_compra': datos.precio_compra,
+                'fecha_adquisicion': datos.fecha_adquisicion,
+            }
+        fila = {
+            'portfolio_id': datos['portfolio_id'],
+            'asset_symbol': datos['ticker'],
+            'quantity': datos.get('cantidad'),
+            'acquisition_price': datos.get('precio_compra'),
+            'acquisition_date': datos.get('fecha_adquisicion'),
+        }
+        if datos.get('asset_id') is not None:
+            fila['asset_id'] = datos['asset_id']
+        return fila
+
+    @staticmethod
+    def _fila_portfolio(datos: Any) -> Dict[str, Any]:
+        """Convierte un Portfolio o un dict con nombres del modelo a una fila de la tabla portfolios."""
+        if isinstance(datos, Portfolio):
+            datos = {
+                'portfolio_id': datos.portfolio_id, 'user_id': datos.user_id,
+                'nombre': datos.nombre, 'descripcion': datos.descripcion,
+            }
+        fila = {
+            'user_id': datos['user_id'],
+            'portfolio_name': datos['nombre'],
+            'description': datos.get('descripcion'),
+        }
+        if datos.get('portfolio_id') is not None:
+            fila['portfolio_id'] = datos['portfolio_id']
+        return fila
+
+    def _escribir_en_lotes(
+        self,
+        filas: List[Any],
+        ejecutar_lote: Callable[[List[Any]], Any],
+        clave_id: str,
+        tamano_lote: int = SUPABASE_TAMANO_LOTE_ESCRITURA,
+    ) -> ResultadoLote:
+        """
+        Aplica una escritura en peticiones de hasta `tamano_lote` filas.
+        
+        Si un lote falla (p. ej. por una fila con datos inválidos), se reintenta
+        fila a fila para aplicar las válidas y registrar el error de cada una.
+        
+        Args:
+            filas: Filas (o ids, en los borrados) en el orden de la entrada
+            ejecutar_lote: Construye la consulta de un lote sin ejecutarla
+            clave_id: Columna id que devuelve la representación de cada fila
+            tamano_lote: Filas por petición
+        """
+        resultado = ResultadoLote(ids=[None] * len(filas))
+        for inicio in range(0, len(filas), max(1, tamano_lote)):
+            lote = filas[inicio:inicio + tamano_lote]
+            try:
+                resultado.peticiones += 1
+                datos = self._ejecutar(ejecutar_lote(lote)).data or []
+                if len(datos) == len(lote):
+                    for k, row in enumerate(datos):
+                        resultado.ids[inicio + k] = row.get(clave_id)
+                    continue
+                if len(lote) == 1:
+                    resultado.fallos.append(FalloFila(inicio, lote[0], "Ninguna fila afectada"))
+                    continue
+            except Exception as e:
+                if len(lote) == 1:
+                    resultado.fallos.append(FalloFila(inicio, lote[0], str(e)))
+                    continue
+                logger.warning(f"Lote de {len(lote)} filas rechazado ({e}); se reintenta fila a fila")
+            
+            # Lote fallido o con filas sin aplicar: fila a fila para aislar los errores
+            for k, fila in enumerate(lote):
+                try:
+                    resultado.peticiones += 1
+                    datos = self._ejecutar(ejecutar_lote([fila])).data or []
+                    if datos:
+                        resultado.ids[inicio + k] = datos[0].get(clave_id)
+                    else:
+                        resultado.fallos.append(FalloFila(inicio + k, fila, "Ninguna fila afectada"))
+                except Exception as e:
+                    resultado.fallos.append(FalloFila(inicio + k, fila, str(e)))
+        return resultado
+
+    def _registrar_lote(self, operacion: str, resultado: ResultadoLote) -> ResultadoLote:
+        if resultado.exitosos:
+            portfolio_snapshot.invalidar()
+        total = len(resultado.ids)
+        if resultado.fallos:
+            logger.warning(
+                f"⚠️  {operacion}: {resultado.exitosos}/{total} filas en {resultado.peticiones} peticiones, "
+                f"{len(resultado.fallos)} fallidas"
+            )
+        else:
+            logger.info(f"✅ {operacion}: {total} filas en {resultado.peticiones} peticiones")
+        return resultado
+
+    def insertar_assets(self, assets: Iterable[Any]) -> ResultadoLote:
+        """
+        Inserta assets en peticiones de varias filas.
+        
+        Args:
+            assets: Objetos Asset o dicts con portfolio_id, ticker y opcionalmente
+                cantidad, precio_compra y fecha_adquisicion
+                
+        Returns:
+            ResultadoLote con el asset_id creado de cada fila y los fallos por fila
+        """
+        filas = [self._fila_asset(a) for a in assets]
+        for fila in filas:
+            fila.pop('asset_id', None)
+        resultado = self._escribir_en_lotes(
+            filas, lambda lote: self.client.table('assets').insert(lote), 'asset_id'
+        )
+        return self._registrar_lote("Inserción de assets", resultado)
+
+    def upsert_assets(self, assets: Iterable[Any]) -> ResultadoLote:
+        """
+        Inserta o actualiza assets por asset_id en peticiones de varias filas.
+        Las filas sin asset_id se registran como fallidas (usar `insertar_assets`).
+        
+        Returns:
+            ResultadoLote con el asset_id de cada fila y los fallos por fila
+        """
+        filas = [self._fila_asset(a) for a in assets]
+        return self._upsert('assets', filas, 'asset_id', "Upsert de assets")
+
+    def eliminar_assets(self, asset_ids: Iterable[int]) -> ResultadoLote:
+        """
+        Elimina assets por id en peticiones de varios ids (IN).
+        
+        Returns:
+            ResultadoLote con el id de cada asset eliminado; los ids inexistentes
+            se registran como fallidos
+        """
+        return self._eliminar('assets', list(asset_ids), 'asset_id', "Borrado de assets")
+
+    def crear_portfolios(self, portfolios: Iterable[Any]) -> ResultadoLote:
+        """
+        Crea portfolios en peticiones de varias filas.
+        
+        Args:
+            portfolios: Objetos Portfolio o dicts con user_id, nombre y
+                opcionalmente descripcion
+                
+        Returns:
+            ResultadoLote con el portfolio_id creado de cada fila y los fallos por fila
+        """
+        filas = [self._fila_portfolio(p) for p in portfolios]
+        for fila in filas:
+            fila.pop('portfolio_id', None)
+        resultado = self._escribir_en_lotes(
+            filas, lambda lote: self.client.table('portfolios').insert(lote), 'portfolio_id'
+        )
+        return self._registrar_lote("Creación de portfolios", resultado)
+
+    def upsert_portfolios(self, portfolios: Iterable[Any]) -> ResultadoLote:
+        """Inserta o actualiza portfolios por portfolio_id en peticiones de varias filas."""
+        filas = [self._fila_portfolio(p) for p in portfolios]
+        return self._upsert('portfolios', filas, 'portfolio_id', "Upsert de portfolios")
+
+    def eliminar_portfolios(self, portfolio_ids: Iterable[int]) -> ResultadoLote:
+        """Elimina portfolios por id en peticiones de varios ids (IN)."""
+        return self._eliminar('portfolios', list(portfolio_ids), 'portfolio_id', "Borrado de portfolios")
+
+    def _upsert(self, tabla: str, filas: List[Dict[str, Any]], clave_id: str, operacion: str) -> ResultadoLote:
+        validas = [(i, fila) for i, fila in enumerate(filas) if fila.get(clave_id) is not None]
+        parcial = self._escribir_en_lotes(
+            [fila for _, fila in validas],
+            lambda lote: self.client.table(tabla).upsert(lote, on_conflict=clave_id),
+            clave_id,
+        )
+        # Reubicar los resultados en las posiciones de la entrada original
+        resultado = ResultadoLote(ids=[None] * len(filas), peticiones=parcial.peticiones)
+        for (i, _), id_fila in zip(validas, parcial.ids):
+            resultado.ids[i] = id_fila
+        resultado.fallos = [
+            FalloFila(i, fila, f"{clave_id} requerido")
+            for i, fila in enumerate(filas) if fila.get(clave_id) is None
+        ] + [FalloFila(validas[f.indice][0], f.fila, f.error) for f in parcial.fallos]
+        resultado.fallos.sort(key=lambda f: f.indice)
+        return self._registrar_lote(operacion, resultado)
+
+    def _eliminar(self, tabla: str, ids: List[Any], clave_id: str, operacion: str) -> ResultadoLote:
+        resultado = ResultadoLote(ids=[None] * len(ids))
+        unicos = list(dict.fromkeys(ids))
+        eliminados = set()
+        errores: Dict[Any, str] = {}
+        for inicio in range(0, len(unicos), max(1, SUPABASE_TAMANO_LOTE_ESCRITURA)):
+            lote = unicos[inicio:inicio + SUPABASE_TAMANO_LOTE_ESCRITURA]
+            try:
+                resultado.peticiones += 1
+                datos = self._ejecutar(self.client.table(tabla).delete().in_(clave_id, lote)).data or []
+                eliminados.update(row[clave_id] for row in datos)
+                continue
+            except Exception as e:
+                if len(lote) == 1:
+                    errores[lote[0]] = str(e)
+                    continue
+                logger.warning(f"Lote de {len(lote)} ids rechazado ({e}); se reintenta id a id")
+            
+            for id_fila in lote:
+                try:
+                    resultado.peticiones += 1
+                    datos = self._ejecutar(self.client.table(tabla).delete().eq(clave_id, id_fila)).data or []
+                    eliminados.update(row[clave_id] for row in datos)
+                except Exception as e:
+                    errores[id_fila] = str(e)
+        
+        # El borrado por IN solo devuelve las filas que existían
+        for i, id_fila in enumerate(ids):
+            if id_fila in eliminados:
+                resultado.ids[i] = id_fila
+            else:
+                resultado.fallos.append(FalloFila(i, id_fila, errores.get(id_fila, "No encontrado")))
+        return self._registrar_lote(operacion, resultado)
+
+
 # Instancia global del gestor de base de datos
 db_manager = DatabaseManager()
 
@@ -373,6 +1421,16 @@ def get_clientes_activos() -> List[Cliente]:
     return db_manager.get_clientes_activos()
 
 
+def iter_clientes(cargar_portfolios: bool = True) -> Iterator[Cliente]:
+    """
+    Recorre todos los clientes, con sus portfolios y assets si se piden
+    (desde el snapshot local si está activo y vigente).
+    """
+    if cargar_portfolios and PORTFOLIO_SNAPSHOT_ACTIVO:
+        return db_manager.iter_clientes_snapshot()
+    return db_manager.iter_clientes(cargar_portfolios=cargar_portfolios)
+
+
 def get_cliente_por_id(user_id: str) -> Optional[Cliente]:
     """Obtiene un cliente específico por user_id."""
     return db_manager.get_cliente_por_id(user_id)
@@ -383,6 +1441,26 @@ def get_tickers_cliente(user_id: str) -> List[str]:
     return db_manager.get_tickers_cliente(user_id)
 
 
+def get_tickers_universo() -> List[str]:
+    """Obtiene los tickers únicos de todos los clientes."""
+    return db_manager.get_tickers_universo()
+
+
+def get_user_ids_con_assets() -> List[str]:
+    """Obtiene los user_id de los clientes con al menos un asset."""
+    return db_manager.get_user_ids_con_assets()
+
+
+def get_cambios_desde(watermark: Optional[str] = None) -> CambiosPortfolios:
+    """Obtiene los portfolios y assets dados de alta o de baja desde un watermark."""
+    return db_manager.get_cambios_desde(watermark)
+
+
+def get_indice_tickers(refrescar: bool = False) -> IndiceTickers:
+    """Obtiene el índice ticker → titulares de todos los clientes."""
+    return db_manager.get_indice_tickers(refrescar)
+
+
 def get_portfolios_cliente(user_id: str) -> List[Portfolio]:
     """Obtiene todos los portfolios de un cliente."""
     return db_manager.get_portfolios_cliente(user_id)
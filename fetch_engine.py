@@ -0,0 +1,141 @@
+"""
+Módulo de descargas concurrentes con límites de concurrencia.
+Ejecuta las llamadas de red en pools de hilos por proveedor, con un tope global
+de llamadas simultáneas y un timeout por llamada.
+"""
+
+import logging
+import contextlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Any, Callable, ContextManager, Dict, Optional
+
+from config import FETCH_MAX_CONCURRENCIA, FETCH_CONCURRENCIA_PROVEEDOR, FETCH_TIMEOUT_SEGUNDOS
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de sondeo mientras una tarea espera turno (su timeout aún no corre)
+INTERVALO_SONDEO = 0.5
+
+
+class TareaDescarga:
+    """Llamada enviada al motor: su future y el instante en que empezó a ejecutarse."""
+
+    def __init__(self, descripcion: str, timeout: float):
+        self.descripcion = descripcion
+        self.timeout = timeout
+        self.inicio: Optional[float] = None
+        self.futuro: Optional[Future] = None
+
+
+class MotorDescargas:
+    """
+    Motor de descargas concurrentes.
+
+    - Cada proveedor tiene su propio pool con `limites_proveedor[proveedor]` hilos.
+    - Un semáforo global limita las llamadas en curso a `max_concurrencia`.
+    - El timeout de cada llamada se cuenta desde que empieza a ejecutarse, no
+      desde que se encola ni mientras espera el lock de exclusión que se le
+      indique (p. ej. el de yf.download). Al expirar se devuelve el valor por defecto; el hilo
+      termina la llamada en segundo plano porque no puede interrumpirse.
+    """
+
+    def __init__(
+        self,
+        max_concurrencia: int = FETCH_MAX_CONCURRENCIA,
+        limites_proveedor: Optional[Dict[str, int]] = None,
+        timeout: float = FETCH_TIMEOUT_SEGUNDOS,
+    ):
+        self.max_concurrencia = max(1, max_concurrencia)
+        self.limites_proveedor = limites_proveedor or FETCH_CONCURRENCIA_PROVEEDOR
+        self.timeout = timeout
+        self._semaforo = threading.BoundedSemaphore(self.max_concurrencia)
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, proveedor: str) -> ThreadPoolExecutor:
+        with self._lock:
+            if proveedor not in self._pools:
+                hilos = max(1, min(self.limites_proveedor.get(proveedor, 2), self.max_concurrencia))
+                self._pools[proveedor] = ThreadPoolExecutor(
+                    max_workers=hilos, thread_name_prefix=f"descarga-{proveedor}"
+                )
+            return self._pools[proveedor]
+
+    def enviar(
+        self,
+        proveedor: str,
+        funcion: Callable[..., Any],
+        *args: Any,
+        descripcion: str = "",
+        timeout: Optional[float] = None,
+        exclusion: Optional[ContextManager[Any]] = None,
+        **kwargs: Any,
+    ) -> TareaDescarga:
+        """
+        Encola una llamada de red en el pool del proveedor.
+
+        Args:
+            proveedor: Nombre del proveedor (determina el pool y su límite)
+            funcion: Función que realiza la llamada
+            descripcion: Texto para los logs
+            timeout: Segundos máximos de ejecución (por defecto, el del motor)
+            exclusion: Lock que la llamada necesita en exclusiva; se adquiere
+                antes del semáforo global y antes de empezar a contar el timeout
+
+        Returns:
+            TareaDescarga para recoger el resultado con `resultado()`
+        """
+        tarea = TareaDescarga(descripcion or getattr(funcion, "__name__", "llamada"), timeout or self.timeout)
+
+        def ejecutar() -> Any:
+            with exclusion or contextlib.nullcontext(), self._semaforo:
+                tarea.inicio = time.monotonic()
+                return funcion(*args, **kwargs)
+
+        tarea.futuro = self._pool(proveedor).submit(ejecutar)
+        return tarea
+
+    def resultado(self, tarea: TareaDescarga, por_defecto: Any = None) -> Any:
+        """
+        Espera el resultado de una tarea respetando su timeout.
+
+        Args:
+            tarea: Tarea devuelta por `enviar`
+            por_defecto: Valor a devolver si la llamada falla o expira
+
+        Returns:
+            El resultado de la llamada o `por_defecto`
+        """
+        futuro = tarea.futuro
+        assert futuro is not None
+        while True:
+            inicio = tarea.inicio
+            if inicio is None:
+                espera = INTERVALO_SONDEO
+            else:
+                espera = max(0.0, inicio + tarea.timeout - time.monotonic())
+            try:
+                return futuro.result(timeout=espera)
+            except FuturesTimeoutError:
+                # Si seguía en cola al empezar la espera, su timeout aún no corría
+                if inicio is None:
+                    continue
+                futuro.cancel()
+                logger.warning(f"⌛ Timeout de {tarea.timeout:g}s en {tarea.descripcion}")
+                return por_defecto
+            except Exception as err:
+                logger.error(f"Error en {tarea.descripcion}: {err}")
+                return por_defecto
+
+    def cerrar(self) -> None:
+        """Detiene los pools sin esperar a las llamadas que hayan expirado."""
+        with self._lock:
+            for pool in self._pools.values():
+                pool.shutdown(wait=False, cancel_futures=True)
+            self._pools.clear()
+
+
+# Instancia global del motor de descargas
+motor_descargas = MotorDescargas()
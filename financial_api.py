@@ -7,10 +7,17 @@ Obtiene los assets de cada cliente desde Supabase y genera informes personalizad
 """
 
 import datetime
+import hashlib
+import json
 import logging
+import math
+import os
 import re
-import time
-from typing import Any, Dict, List, Optional
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 import pandas as pd
 import yfinance as yf
@@ -24,9 +31,26 @@ except Exception as err:  # noqa: BLE001 - queremos capturar cualquier problema
     PDR_AVAILABLE = False
     PDR_IMPORT_ERROR = err
 
-from database import Cliente, get_cliente_por_id, get_clientes_activos
-from storage_manager import crear_carpeta_cliente, subir_informe_cliente
-from config import DIAS_HISTORICOS
+from database import Cliente, get_cambios_desde, get_cliente_por_id, iter_clientes
+from fetch_engine import TareaDescarga, motor_descargas
+from fundamentals_cache import fundamentals_cache
+from news_store import news_store
+from rate_limiter import es_error_limite, get_rate_limiter
+from pipeline import Etapa, Pipeline
+from price_store import price_store
+from report_registry import registro_informes
+from report_writer import EscritorInforme, escritor_archivo, escritor_memoria
+from storage_manager import ElementoSubida, crear_carpeta_cliente, guardar_manifest_cliente, storage_manager
+from tickers import normalizar_ticker
+from config import (
+    DIAS_HISTORICOS,
+    YF_TAMANO_LOTE,
+    PIPELINE_HILOS_DESCARGA,
+    PIPELINE_HILOS_RENDER,
+    PIPELINE_HILOS_SUBIDA,
+    PIPELINE_CAPACIDAD_COLA,
+    RATE_LIMIT_REINTENTOS,
+)
 
 if PDR_AVAILABLE:
     yf.pdr_override()  # type: ignore[attr-defined]
@@ -38,6 +62,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Limitadores de tasa compartidos por proveedor
+limitador_yf = get_rate_limiter("yfinance")
+limitador_pdr = get_rate_limiter("pandas_datareader")
+
+# yf.download (también usado por pandas-datareader vía pdr_override) guarda su
+# estado en variables globales de yfinance, así que no admite llamadas simultáneas.
+# Las tareas del motor que lo usan lo reciben como `exclusion`, para que su
+# timeout no corra mientras esperan turno; es reentrante porque las funciones
+# de descarga lo vuelven a tomar al llamarse fuera del motor.
+_yf_download_lock = threading.RLock()
+
 
 # --- Configuración Global ---
 print("✅ Dependencias financieras inicializadas (yfinance + pandas-datareader)")
@@ -45,118 +80,54 @@ print("✅ Dependencias financieras inicializadas (yfinance + pandas-datareader)
 # Rango de fechas para datos históricos
 FECHA_FIN = datetime.date.today()
 FECHA_INICIO = FECHA_FIN - datetime.timedelta(days=DIAS_HISTORICOS)
-
-
-# --- Normalización de Tickers ---
-
-def normalizar_ticker(ticker: str) -> str:
-    """
-    Normaliza el formato de los tickers para asegurar compatibilidad con las APIs.
-    
-    Reglas de normalización:
-    1. Criptomonedas: BTCUSD -> BTC-USD, ETHUSD -> ETH-USD, etc.
-    2. Metales preciosos: PAXGUSD -> PAXG-USD, GOLDUSD -> GOLD-USD, etc.
-    3. Sufijos de mercado: NVD.F -> NVDA, AAPL.DE -> AAPL, etc.
-    4. Espacios y caracteres especiales se limpian
-    
-    Args:
-        ticker: Ticker original desde la base de datos
-        
-    Returns:
-        str: Ticker normalizado para las APIs
-    """
-    if not ticker:
-        return ticker
-    
-    ticker_original = ticker
-    ticker = ticker.strip().upper()
-    
-    # 1. Mapeo de criptomonedas comunes (formato XXX-USD)
-    crypto_map = {
-        'BTCUSD': 'BTC-USD',
-        'ETHUSD': 'ETH-USD',
-        'ADAUSD': 'ADA-USD',
-        'SOLUSD': 'SOL-USD',
-        'DOTUSD': 'DOT-USD',
-        'DOGEUSD': 'DOGE-USD',
-        'MATICUSD': 'MATIC-USD',
-        'XRPUSD': 'XRP-USD',
-        'LINKUSD': 'LINK-USD',
-        'LTCUSD': 'LTC-USD',
-        'UNIUSD': 'UNI-USD',
-        'XLMUSD': 'XLM-USD',
-    }
-    
-    # 2. Mapeo de metales preciosos y commodities
-    commodity_map = {
-        'PAXGUSD': 'PAXG-USD',  # Paxos Gold
-        'GOLDUSD': 'GOLD-USD',
-        'SILVERUSD': 'SILVER-USD',
-        'XAUUSD': 'GLD',  # Gold ETF
-        'XAGUSD': 'SLV',  # Silver ETF
-    }
-    
-    # 3. Mapeo de sufijos de mercados internacionales
-    market_suffixes = {
-        '.F': '',      # Frankfurt (ej: NVD.F -> NVDA)
-        '.DE': '',     # Deutsche Börse
-        '.L': '',      # London Stock Exchange
-        '.PA': '',     # Euronext Paris
-        '.AS': '',     # Amsterdam
-        '.MI': '',     # Milan
-        '.MC': '',     # Madrid
-        '.SW': '',     # Swiss Exchange
-        '.TO': '',     # Toronto
-        '.AX': '',     # Australian Stock Exchange
-        '.HK': '',     # Hong Kong
-        '.T': '',      # Tokyo
-    }
-    
-    # 4. Mapeo específico de tickers conocidos que requieren corrección
-    specific_map = {
-        'NVD.F': 'NVDA',
-        'NVDA.F': 'NVDA',
-        'GOOGL.F': 'GOOGL',
-        'GOOG.F': 'GOOGL',
-        'AAPL.F': 'AAPL',
-        'MSFT.F': 'MSFT',
-        'AMZN.F': 'AMZN',
-        'TSLA.F': 'TSLA',
-        'META.F': 'META',
-        'NFLX.F': 'NFLX',
-        '^SPX': '^GSPC',
-    }
-    
-    # Aplicar normalización en orden de prioridad
-    
-    # 1º - Mapeo específico (máxima prioridad)
-    if ticker in specific_map:
-        ticker_normalizado = specific_map[ticker]
-        logger.info(f"🔄 Ticker normalizado (específico): {ticker_original} -> {ticker_normalizado}")
-        return ticker_normalizado
-    
-    # 2º - Mapeo de criptomonedas
-    if ticker in crypto_map:
-        ticker_normalizado = crypto_map[ticker]
-        logger.info(f"🔄 Ticker normalizado (crypto): {ticker_original} -> {ticker_normalizado}")
-        return ticker_normalizado
-    
-    # 3º - Mapeo de commodities
-    if ticker in commodity_map:
-        ticker_normalizado = commodity_map[ticker]
-        logger.info(f"🔄 Ticker normalizado (commodity): {ticker_original} -> {ticker_normalizado}")
-        return ticker_normalizado
-    
-    # 4º - Remover sufijos de mercados internacionales
-    for suffix, replacement in market_suffixes.items():
-        if ticker.endswith(suffix):
-            ticker_normalizado = ticker.replace(suffix, replacement)
-            logger.info(f"🔄 Ticker normalizado (sufijo): {ticker_original} -> {ticker_normalizado}")
-            return ticker_normalizado
-    
-    # 5º - Si no hay cambios, retornar el ticker limpio
-    logger.debug(f"✓ Ticker sin cambios: {ticker_original}")
-    return ticker
+# Ventana intradía servida desde el almacén local (≈ 5 sesiones de mercado)
+FECHA_INICIO_INTRADIA = FECHA_FIN - datetime.timedelta(days=7)
+
+# Campos del perfil y filas de cada estado financiero que usa el informe
+CAMPOS_PERFIL = [
+    "longName",
+    "shortName",
+    "symbol",
+    "sector",
+    "industry",
+    "marketCap",
+    "currency",
+    "currentPrice",
+    "previousClose",
+    "longBusinessSummary",
+]
+FILAS_ESTADOS: Dict[str, List[str]] = {
+    "income": [
+        "Total Revenue",
+        "Cost Of Revenue",
+        "Gross Profit",
+        "Operating Income",
+        "Net Income",
+        "Diluted EPS",
+    ],
+    "balance": [
+        "Cash And Cash Equivalents",
+        "Total Current Assets",
+        "Total Assets",
+        "Total Current Liabilities",
+        "Total Liab",
+        "Total Stockholder Equity",
+    ],
+    "cashflow": [
+        "Net Income",
+        "Depreciation",
+        "Change In Working Capital",
+        "Total Cash From Operating Activities",
+        "Capital Expenditures",
+        "Total Cash From Financing Activities",
+    ],
+}
+# Accesores de yfinance (propiedad, método) de cada estado financiero
+ACCESORES_ESTADOS: Dict[str, Tuple[str, str]] = {
+    "income": ("income_stmt", "get_income_stmt"),
+    "balance": ("balance_sheet", "get_balance_sheet"),
+    "cashflow": ("cashflow", "get_cashflow"),
+}
 
 
 # --- Utilidades de datos (yfinance / pandas-datareader) ---
@@ -178,7 +149,7 @@ def get_yf_ticker(ticker: str) -> Optional[yf.Ticker]:
 
 def get_yf_profile(ticker_obj: yf.Ticker) -> Optional[Dict[str, Any]]:
     try:
-        info = ticker_obj.get_info()
+        info = limitador_yf.ejecutar(ticker_obj.get_info)
         if info:
             return info
     except Exception as err:
@@ -186,13 +157,16 @@ def get_yf_profile(ticker_obj: yf.Ticker) -> Optional[Dict[str, Any]]:
     return None
 
 
+def _leer_accesor(ticker_obj: yf.Ticker, accessor: str) -> Any:
+    # Las propiedades de yfinance hacen la petición al accederse, no solo al llamarse
+    valor = getattr(ticker_obj, accessor, None)
+    return valor() if callable(valor) else valor
+
+
 def _obtener_estado_financiero(ticker_obj: yf.Ticker, attr: str, metodo: str) -> Optional[pd.DataFrame]:
     for accessor in (attr, metodo):
         try:
-            valor = getattr(ticker_obj, accessor, None)
-            if valor is None:
-                continue
-            data = valor() if callable(valor) else valor
+            data = limitador_yf.ejecutar(_leer_accesor, ticker_obj, accessor)
             if isinstance(data, pd.DataFrame) and not data.empty:
                 return data
         except Exception as err:
@@ -208,28 +182,212 @@ def get_yf_financial_statements(ticker_obj: yf.Ticker) -> Dict[str, Optional[pd.
     }
 
 
+def _recortar_perfil(profile: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Conserva solo los campos del perfil que aparecen en el informe."""
+    if not profile:
+        return None
+    recortado = {campo: profile.get(campo) for campo in CAMPOS_PERFIL if profile.get(campo) is not None}
+    if recortado.get("longBusinessSummary"):
+        recortado["longBusinessSummary"] = recortado["longBusinessSummary"][:500]
+    return recortado
+
+
+def _recortar_estado(df: Optional[pd.DataFrame], filas: List[str]) -> Optional[pd.DataFrame]:
+    """Conserva solo las filas del estado financiero que aparecen en el informe."""
+    if df is None or df.empty:
+        return None
+    disponibles = [fila for fila in filas if fila in df.index]
+    return df.loc[disponibles] if disponibles else df.iloc[: min(6, df.shape[0])]
+
+
+def get_yf_perfil_cacheado(ticker_obj: yf.Ticker) -> Optional[Dict[str, Any]]:
+    """Obtiene el perfil recortado pasando por la caché de fundamentales."""
+    return fundamentals_cache.obtener(
+        "perfil", ticker_obj.ticker, lambda: _recortar_perfil(get_yf_profile(ticker_obj))
+    )
+
+
+def get_yf_estado_cacheado(ticker_obj: yf.Ticker, clave: str) -> Optional[pd.DataFrame]:
+    """Obtiene un estado financiero ("income", "balance", "cashflow") pasando por la caché."""
+    attr, metodo = ACCESORES_ESTADOS[clave]
+    return fundamentals_cache.obtener(
+        clave,
+        ticker_obj.ticker,
+        lambda: _recortar_estado(_obtener_estado_financiero(ticker_obj, attr, metodo), FILAS_ESTADOS[clave]),
+    )
+
+
+def get_yf_fundamentales(ticker_obj: yf.Ticker) -> Tuple[Optional[Dict[str, Any]], Dict[str, Optional[pd.DataFrame]]]:
+    """
+    Obtiene perfil y estados financieros pasando por la caché de fundamentales.
+    
+    Args:
+        ticker_obj: Objeto yfinance del ticker
+        
+    Returns:
+        Tupla (perfil, estados financieros) recortados a los campos del informe
+    """
+    profile = get_yf_perfil_cacheado(ticker_obj)
+    estados = {clave: get_yf_estado_cacheado(ticker_obj, clave) for clave in ACCESORES_ESTADOS}
+    return profile, estados
+
+
+@dataclass
+class ResultadoDescargaLote:
+    """Resultado de una descarga multi-ticker: un DataFrame por ticker y los símbolos vacíos."""
+    datos: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    vacios: List[str] = field(default_factory=list)
+
+
+def _dividir_descarga_lote(data: Optional[pd.DataFrame], tickers: List[str]) -> Dict[str, pd.DataFrame]:
+    """Separa el DataFrame con columnas MultiIndex (ticker, campo) de yf.download en un frame por ticker."""
+    frames: Dict[str, pd.DataFrame] = {}
+    if data is None or data.empty:
+        return frames
+
+    if not isinstance(data.columns, pd.MultiIndex):
+        # Versiones antiguas de yfinance devuelven columnas planas para un único símbolo
+        if len(tickers) == 1:
+            frames[tickers[0]] = data.dropna(how="all")
+        return frames
+
+    disponibles = set(data.columns.get_level_values(0))
+    for ticker in tickers:
+        if ticker not in disponibles:
+            continue
+        df = data[ticker].dropna(how="all")
+        if not df.empty:
+            frames[ticker] = df
+    return frames
+
+
+def _descarga_limitada(lote: List[str], frames: Dict[str, pd.DataFrame]) -> bool:
+    """
+    Indica si una descarga de yf.download parece limitada por el proveedor:
+    yf.download captura los 429 internamente y devuelve frames vacíos, así que
+    el limitador no ve la excepción. Se considera limitada si no vino ningún
+    ticker y yfinance registró un error de cuota, o si el lote tenía varios
+    tickers (que todos estén vacíos a la vez no es un resultado normal).
+    """
+    if frames:
+        return False
+    errores = getattr(getattr(yf, "shared", None), "_ERRORS", None) or {}
+    if any(es_error_limite(Exception(str(errores[t]))) for t in lote if t in errores):
+        return True
+    return len(lote) > 1
+
+
+def _descargar_precios_lote(
+    tickers: List[str],
+    descripcion: str,
+    tamano_lote: int,
+    **download_kwargs: Any,
+) -> ResultadoDescargaLote:
+    """Descarga precios de varios tickers con una llamada threaded a yf.download por lote."""
+    resultado = ResultadoDescargaLote()
+    unicos = list(dict.fromkeys(t for t in tickers if t))
+    tamano_lote = max(1, tamano_lote)
+
+    for inicio in range(0, len(unicos), tamano_lote):
+        lote = unicos[inicio:inicio + tamano_lote]
+        logger.debug(f"Descargando {descripcion} (yfinance) para {len(lote)} tickers: {', '.join(lote)}")
+        intento = 0
+        while True:
+            try:
+                with _yf_download_lock:
+                    data = limitador_yf.ejecutar(
+                        yf.download,
+                        lote,
+                        group_by="ticker",
+                        threads=True,
+                        progress=False,
+                        **download_kwargs,
+                    )
+                frames = _dividir_descarga_lote(data, lote)
+            except Exception as err:
+                logger.error(f"Error al obtener {descripcion} en yfinance para el lote {', '.join(lote)}: {err}")
+                break
+            if intento < RATE_LIMIT_REINTENTOS and _descarga_limitada(lote, frames):
+                intento += 1
+                logger.warning(
+                    f"yfinance devolvió vacío todo el lote de {descripcion} ({len(lote)} tickers); "
+                    f"se trata como límite de tasa (reintento {intento}/{RATE_LIMIT_REINTENTOS})"
+                )
+                limitador_yf.reportar_limite()
+                continue
+            resultado.datos.update(frames)
+            break
+
+    resultado.vacios = [t for t in unicos if t not in resultado.datos]
+    if resultado.vacios:
+        logger.warning(f"No se encontraron {descripcion} en yfinance para: {', '.join(resultado.vacios)}")
+    return resultado
+
+
+def get_yf_daily_prices_lote(
+    tickers: List[str],
+    start_date: datetime.date,
+    end_date: datetime.date,
+    tamano_lote: int = YF_TAMANO_LOTE,
+) -> ResultadoDescargaLote:
+    """
+    Descarga el histórico diario de varios tickers en lotes.
+    
+    Args:
+        tickers: Símbolos normalizados
+        start_date: Fecha inicial (inclusive)
+        end_date: Fecha final (inclusive)
+        tamano_lote: Máximo de símbolos por llamada a yf.download
+        
+    Returns:
+        ResultadoDescargaLote con un DataFrame por ticker y los símbolos sin datos
+    """
+    return _descargar_precios_lote(
+        tickers,
+        "datos diarios",
+        tamano_lote,
+        start=start_date,
+        end=end_date + datetime.timedelta(days=1),
+    )
+
+
+def get_yf_intraday_prices_lote(
+    tickers: List[str],
+    period: str = "5d",
+    interval: str = "1h",
+    tamano_lote: int = YF_TAMANO_LOTE,
+    start_date: Optional[datetime.date] = None,
+) -> ResultadoDescargaLote:
+    """
+    Descarga precios intradía de varios tickers en lotes.
+    
+    Args:
+        tickers: Símbolos normalizados
+        period: Ventana a descargar (formato yfinance, ej: "5d")
+        interval: Intervalo de las barras (formato yfinance, ej: "1h")
+        tamano_lote: Máximo de símbolos por llamada a yf.download
+        start_date: Si se indica, descarga desde esa fecha en lugar de usar `period`
+        
+    Returns:
+        ResultadoDescargaLote con un DataFrame por ticker y los símbolos sin datos
+    """
+    ventana: Dict[str, Any] = {"start": start_date} if start_date is not None else {"period": period}
+    return _descargar_precios_lote(
+        tickers,
+        "datos intradía",
+        tamano_lote,
+        interval=interval,
+        auto_adjust=False,
+        **ventana,
+    )
+
+
 def get_yf_daily_prices(ticker: str, start_date: datetime.date, end_date: datetime.date) -> Optional[pd.DataFrame]:
-    logger.debug(f"Descargando histórico diario (yfinance) para {ticker}")
-    try:
-        data = yf.download(ticker, start=start_date, end=end_date + datetime.timedelta(days=1), progress=False)
-        if data is not None and not data.empty:
-            return data
-        logger.warning(f"No se encontraron datos diarios en yfinance para {ticker}")
-    except Exception as err:
-        logger.error(f"Error al obtener datos diarios en yfinance para {ticker}: {err}")
-    return None
+    return get_yf_daily_prices_lote([ticker], start_date, end_date).datos.get(ticker)
 
 
 def get_yf_intraday_prices(ticker: str, period: str = "5d", interval: str = "1h") -> Optional[pd.DataFrame]:
-    logger.debug(f"Descargando datos intradía (yfinance) para {ticker}")
-    try:
-        data = yf.download(ticker, period=period, interval=interval, auto_adjust=False, progress=False)
-        if data is not None and not data.empty:
-            return data
-        logger.warning(f"No se encontraron datos intradía en yfinance para {ticker}")
-    except Exception as err:
-        logger.error(f"Error al obtener datos intradía para {ticker}: {err}")
-    return None
+    return get_yf_intraday_prices_lote([ticker], period=period, interval=interval).datos.get(ticker)
 
 
 def get_pdr_daily_prices(ticker: str, start_date: datetime.date, end_date: datetime.date) -> Optional[pd.DataFrame]:
@@ -244,7 +402,10 @@ def get_pdr_daily_prices(ticker: str, start_date: datetime.date, end_date: datet
         return None
 
     try:
-        df = pdr.get_data_yahoo(ticker, start=start_date, end=end_date + datetime.timedelta(days=1))
+        with _yf_download_lock:
+            df = limitador_pdr.ejecutar(
+                pdr.get_data_yahoo, ticker, start=start_date, end=end_date + datetime.timedelta(days=1)
+            )
         if df is not None:
             if isinstance(df, pd.Series):
                 df = df.to_frame(name="value")
@@ -257,13 +418,16 @@ def get_pdr_daily_prices(ticker: str, start_date: datetime.date, end_date: datet
     return None
 
 
-def get_yf_news(ticker_obj: yf.Ticker) -> Optional[pd.DataFrame]:
+def get_yf_news_items(ticker_obj: yf.Ticker) -> List[Dict[str, Any]]:
     try:
-        news_items = ticker_obj.news
+        return list(limitador_yf.ejecutar(lambda: ticker_obj.news) or [])
     except Exception as err:
         logger.warning(f"No se pudieron obtener noticias para {ticker_obj.ticker}: {err}")
-        return None
+        return []
 
+
+def get_yf_news(ticker_obj: yf.Ticker) -> Optional[pd.DataFrame]:
+    news_items = get_yf_news_items(ticker_obj)
     if not news_items:
         logger.info(f"Sin noticias recientes para {ticker_obj.ticker}")
         return None
@@ -275,6 +439,15 @@ def get_yf_news(ticker_obj: yf.Ticker) -> Optional[pd.DataFrame]:
     return df
 
 
+def get_yf_news_almacenadas(ticker_obj: yf.Ticker) -> Optional[pd.DataFrame]:
+    """Incorpora al almacén solo las noticias nuevas del ticker y devuelve las más recientes."""
+    news_store.actualizar(ticker_obj.ticker, lambda: get_yf_news_items(ticker_obj))
+    news_df = news_store.noticias(ticker_obj.ticker)
+    if news_df is None:
+        logger.info(f"Sin noticias recientes para {ticker_obj.ticker}")
+    return news_df
+
+
 # --- Verificación Previa de APIs ---
 
 def check_api_status(test_ticker: str = "AAPL") -> bool:
@@ -331,7 +504,15 @@ def _preparar_estado(df: Optional[pd.DataFrame], columnas: List[str]) -> Optiona
     return preparado.iloc[:, : min(6, preparado.shape[1])]
 
 
-def generate_markdown_report(
+def fecha_ultima_barra(precios: Optional[pd.DataFrame]) -> Optional[str]:
+    """Retorna la fecha (YYYY-MM-DD) de la última barra de precios, o None si no hay."""
+    if precios is None or precios.empty:
+        return None
+    return pd.Timestamp(precios.index.max()).strftime('%Y-%m-%d')
+
+
+def escribir_informe_markdown(
+    escritor: EscritorInforme,
     ticker: str,
     profile: Optional[Dict[str, Any]],
     income_statement: Optional[pd.DataFrame],
@@ -341,125 +522,437 @@ def generate_markdown_report(
     daily_prices_pdr: Optional[pd.DataFrame],
     intraday_prices_yf: Optional[pd.DataFrame],
     news_df: Optional[pd.DataFrame],
-) -> str:
-    """Genera un informe en formato Markdown con los datos recopilados."""
-    report = f"# Análisis Financiero de {ticker}\n\n"
-    report += f"Generado el: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-    report += "---\n\n"
+    fecha_por_defecto: Optional[str] = None,
+) -> None:
+    """
+    Escribe sección a sección el informe Markdown de un ticker en el escritor indicado.
+    
+    La cabecera lleva la fecha de la última barra diaria (o `fecha_por_defecto`,
+    o la fecha de hoy, si no hay precios) en lugar de la hora de generación, de
+    modo que los mismos datos producen siempre el mismo informe byte a byte.
+    """
+    fecha_datos = fecha_ultima_barra(daily_prices_yf) or fecha_por_defecto or datetime.date.today().isoformat()
+    escritor.escribir(f"# Análisis Financiero de {ticker}\n\n")
+    escritor.escribir(f"Datos al: {fecha_datos}\n\n")
+    escritor.escribir("---\n\n")
 
     # 1. Perfil y Datos Generales
-    report += "## 1. Perfil y Datos Generales (yfinance)\n"
+    escritor.escribir("## 1. Perfil y Datos Generales (yfinance)\n")
     if profile:
-        report += f"* **Nombre de la Empresa:** {profile.get('longName') or profile.get('shortName') or 'N/A'}\n"
-        report += f"* **Símbolo:** {profile.get('symbol') or ticker}\n"
-        report += f"* **Sector:** {profile.get('sector', 'N/A')}\n"
-        report += f"* **Industria:** {profile.get('industry', 'N/A')}\n"
-        report += f"* **Capitalización de Mercado:** {_formatear_moneda(profile.get('marketCap'))}\n"
-        report += f"* **Moneda:** {profile.get('currency', 'N/A')}\n"
+        escritor.escribir(f"* **Nombre de la Empresa:** {profile.get('longName') or profile.get('shortName') or 'N/A'}\n")
+        escritor.escribir(f"* **Símbolo:** {profile.get('symbol') or ticker}\n")
+        escritor.escribir(f"* **Sector:** {profile.get('sector', 'N/A')}\n")
+        escritor.escribir(f"* **Industria:** {profile.get('industry', 'N/A')}\n")
+        escritor.escribir(f"* **Capitalización de Mercado:** {_formatear_moneda(profile.get('marketCap'))}\n")
+        escritor.escribir(f"* **Moneda:** {profile.get('currency', 'N/A')}\n")
         precio_cierre = profile.get('currentPrice') or profile.get('previousClose')
-        report += f"* **Último Precio de Cierre (yfinance):** {_formatear_moneda(precio_cierre)}\n"
+        escritor.escribir(f"* **Último Precio de Cierre (yfinance):** {_formatear_moneda(precio_cierre)}\n")
         descripcion = profile.get('longBusinessSummary')
         if descripcion:
-            report += f"* **Descripción:** {descripcion[:500]}...\n"
+            escritor.escribir(f"* **Descripción:** {descripcion[:500]}...\n")
     else:
-        report += "No se pudo obtener el perfil de la empresa desde yfinance.\n"
-    report += "\n"
+        escritor.escribir("No se pudo obtener el perfil de la empresa desde yfinance.\n")
+    escritor.escribir("\n")
 
     # 2. Datos Fundamentales Clave
-    report += "## 2. Datos Fundamentales Clave (yfinance)\n"
+    escritor.escribir("## 2. Datos Fundamentales Clave (yfinance)\n")
 
-    estado_resultados = _preparar_estado(income_statement, [
-        "Total Revenue",
-        "Cost Of Revenue",
-        "Gross Profit",
-        "Operating Income",
-        "Net Income",
-        "Diluted EPS",
-    ])
+    estado_resultados = _preparar_estado(income_statement, FILAS_ESTADOS["income"])
     if estado_resultados is not None:
-        report += "### 2.1. Estado de Resultados (Income Statement)\n"
-        report += estado_resultados.to_markdown() + "\n\n"
+        escritor.escribir("### 2.1. Estado de Resultados (Income Statement)\n")
+        escritor.tabla(estado_resultados)
     else:
-        report += "No se pudo obtener el Estado de Resultados.\n"
+        escritor.escribir("No se pudo obtener el Estado de Resultados.\n")
 
-    balance_general = _preparar_estado(balance_sheet, [
-        "Cash And Cash Equivalents",
-        "Total Current Assets",
-        "Total Assets",
-        "Total Current Liabilities",
-        "Total Liab",
-        "Total Stockholder Equity",
-    ])
+    balance_general = _preparar_estado(balance_sheet, FILAS_ESTADOS["balance"])
     if balance_general is not None:
-        report += "### 2.2. Balance General (Balance Sheet)\n"
-        report += balance_general.to_markdown() + "\n\n"
+        escritor.escribir("### 2.2. Balance General (Balance Sheet)\n")
+        escritor.tabla(balance_general)
     else:
-        report += "No se pudo obtener el Balance General.\n"
+        escritor.escribir("No se pudo obtener el Balance General.\n")
 
-    flujo_caja = _preparar_estado(cash_flow, [
-        "Net Income",
-        "Depreciation",
-        "Change In Working Capital",
-        "Total Cash From Operating Activities",
-        "Capital Expenditures",
-        "Total Cash From Financing Activities",
-    ])
+    flujo_caja = _preparar_estado(cash_flow, FILAS_ESTADOS["cashflow"])
     if flujo_caja is not None:
-        report += "### 2.3. Flujo de Caja (Cash Flow Statement)\n"
-        report += flujo_caja.to_markdown() + "\n\n"
+        escritor.escribir("### 2.3. Flujo de Caja (Cash Flow Statement)\n")
+        escritor.tabla(flujo_caja)
     else:
-        report += "No se pudo obtener el Flujo de Caja.\n"
+        escritor.escribir("No se pudo obtener el Flujo de Caja.\n")
 
     # 3. Datos Históricos de Precios
-    report += "## 3. Datos Históricos de Precios e Indicadores\n"
+    escritor.escribir("## 3. Datos Históricos de Precios e Indicadores\n")
 
     if daily_prices_yf is not None:
-        report += f"### 3.1. Precios Diarios (yfinance - Últimos {min(len(daily_prices_yf), DIAS_HISTORICOS)} datos)\n"
-        report += daily_prices_yf.tail(DIAS_HISTORICOS).to_markdown() + "\n\n"
+        escritor.escribir(f"### 3.1. Precios Diarios (yfinance - Últimos {min(len(daily_prices_yf), DIAS_HISTORICOS)} datos)\n")
+        escritor.tabla(daily_prices_yf.tail(DIAS_HISTORICOS))
     else:
-        report += "No se pudieron obtener los precios diarios de yfinance.\n"
+        escritor.escribir("No se pudieron obtener los precios diarios de yfinance.\n")
 
     if daily_prices_pdr is not None:
-        report += f"### 3.2. Precios Diarios (pandas-datareader - Últimos {min(len(daily_prices_pdr), DIAS_HISTORICOS)} datos)\n"
-        report += daily_prices_pdr.tail(DIAS_HISTORICOS).to_markdown() + "\n\n"
+        escritor.escribir(f"### 3.2. Precios Diarios (pandas-datareader - Últimos {min(len(daily_prices_pdr), DIAS_HISTORICOS)} datos)\n")
+        escritor.tabla(daily_prices_pdr.tail(DIAS_HISTORICOS))
     else:
-        report += "No se pudieron obtener los precios diarios desde pandas-datareader.\n"
+        escritor.escribir("No se pudieron obtener los precios diarios desde pandas-datareader.\n")
 
     if intraday_prices_yf is not None:
-        report += "### 3.3. Precios Intradía (yfinance)\n"
-        report += "_Intervalo 1h durante los últimos 5 días._\n"
-        report += intraday_prices_yf.tail(100).to_markdown() + "\n\n"
+        escritor.escribir("### 3.3. Precios Intradía (yfinance)\n")
+        escritor.escribir("_Intervalo 1h durante los últimos 5 días._\n")
+        escritor.tabla(intraday_prices_yf.tail(100))
     else:
-        report += "No se pudieron obtener los precios intradía de yfinance.\n"
+        escritor.escribir("No se pudieron obtener los precios intradía de yfinance.\n")
 
     # 4. Noticias Recientes
-    report += "## 4. Noticias Recientes y Eventos (yfinance)\n"
+    escritor.escribir("## 4. Noticias Recientes y Eventos (yfinance)\n")
     if news_df is not None and not news_df.empty:
         columnas = [col for col in ["providerPublishTime", "title", "publisher", "link"] if col in news_df.columns]
         if columnas:
-            report += news_df[columnas].head(10).to_markdown(index=False) + "\n\n"
+            escritor.tabla(news_df[columnas].head(10), index=False)
         else:
-            report += news_df.head(10).to_markdown(index=False) + "\n\n"
+            escritor.tabla(news_df.head(10), index=False)
     else:
-        report += f"No se encontraron noticias recientes para {ticker}.\n"
+        escritor.escribir(f"No se encontraron noticias recientes para {ticker}.\n")
+
+    escritor.escribir("---\n\n")
+    escritor.escribir("_Análisis generado automáticamente. Los datos pueden variar según la disponibilidad de la API y los límites del plan._\n")
+
+
+def generate_markdown_report(
+    ticker: str,
+    profile: Optional[Dict[str, Any]],
+    income_statement: Optional[pd.DataFrame],
+    balance_sheet: Optional[pd.DataFrame],
+    cash_flow: Optional[pd.DataFrame],
+    daily_prices_yf: Optional[pd.DataFrame],
+    daily_prices_pdr: Optional[pd.DataFrame],
+    intraday_prices_yf: Optional[pd.DataFrame],
+    news_df: Optional[pd.DataFrame],
+) -> str:
+    """Genera un informe en formato Markdown con los datos recopilados."""
+    escritor = escritor_memoria()
+    escribir_informe_markdown(
+        escritor,
+        ticker,
+        profile,
+        income_statement,
+        balance_sheet,
+        cash_flow,
+        daily_prices_yf,
+        daily_prices_pdr,
+        intraday_prices_yf,
+        news_df,
+    )
+    return escritor.contenido()
+
+
+# --- Datos de Mercado Compartidos ---
+
+@dataclass
+class DatosMercado:
+    """Datos de mercado de un ticker normalizado, reutilizables por todos los clientes."""
+    ticker: str
+    profile: Optional[Dict[str, Any]] = None
+    estados_financieros: Dict[str, Optional[pd.DataFrame]] = field(default_factory=dict)
+    daily_prices_yf: Optional[pd.DataFrame] = None
+    daily_prices_pdr: Optional[pd.DataFrame] = None
+    intraday_prices_yf: Optional[pd.DataFrame] = None
+    news_df: Optional[pd.DataFrame] = None
+
+
+def obtener_datos_mercado_lote(
+    tickers: List[str],
+    incluir_precios_yf: bool = True,
+) -> Dict[str, Optional[DatosMercado]]:
+    """
+    Descarga en paralelo todos los datos de mercado de varios tickers normalizados.
+    
+    Todas las llamadas (perfil, tres estados, precios, pandas-datareader y noticias
+    de todos los tickers) se encolan a la vez en el motor de descargas, que aplica
+    los límites de concurrencia global y por proveedor y el timeout de cada llamada.
+    
+    Args:
+        tickers: Símbolos normalizados
+        incluir_precios_yf: Si False, omite los precios diarios/intradía de yfinance
+            (por ejemplo, cuando se sirven desde el almacén de precios)
+        
+    Returns:
+        Dict ticker -> DatosMercado con lo que se haya podido obtener, o None si falla
+    """
+    resultados: Dict[str, Optional[DatosMercado]] = {}
+    tareas: Dict[str, Dict[str, TareaDescarga]] = {}
+
+    for ticker in tickers:
+        ticker_obj = get_yf_ticker(ticker)
+        if ticker_obj is None:
+            logger.error(f"No se pudo inicializar yfinance para {ticker}")
+            resultados[ticker] = None
+            continue
+
+        tareas_ticker = {
+            "profile": motor_descargas.enviar(
+                "yfinance", get_yf_perfil_cacheado, ticker_obj, descripcion=f"perfil de {ticker}"
+            ),
+            "pdr": motor_descargas.enviar(
+                "pandas_datareader", get_pdr_daily_prices, ticker, FECHA_INICIO, FECHA_FIN,
+                descripcion=f"precios pandas-datareader de {ticker}", exclusion=_yf_download_lock,
+            ),
+            "news": motor_descargas.enviar(
+                "yfinance", get_yf_news_almacenadas, ticker_obj, descripcion=f"noticias de {ticker}"
+            ),
+        }
+        for clave in ACCESORES_ESTADOS:
+            tareas_ticker[clave] = motor_descargas.enviar(
+                "yfinance", get_yf_estado_cacheado, ticker_obj, clave, descripcion=f"{clave} de {ticker}"
+            )
+        if incluir_precios_yf:
+            tareas_ticker["daily"] = motor_descargas.enviar(
+                "yfinance", get_yf_daily_prices, ticker, FECHA_INICIO, FECHA_FIN,
+                descripcion=f"precios diarios de {ticker}", exclusion=_yf_download_lock,
+            )
+            tareas_ticker["intraday"] = motor_descargas.enviar(
+                "yfinance", get_yf_intraday_prices, ticker, descripcion=f"precios intradía de {ticker}",
+                exclusion=_yf_download_lock,
+            )
+        tareas[ticker] = tareas_ticker
+
+    for ticker, tareas_ticker in tareas.items():
+        valores = {clave: motor_descargas.resultado(tarea) for clave, tarea in tareas_ticker.items()}
+        resultados[ticker] = DatosMercado(
+            ticker=ticker,
+            profile=valores["profile"],
+            estados_financieros={clave: valores[clave] for clave in ACCESORES_ESTADOS},
+            daily_prices_yf=valores.get("daily"),
+            daily_prices_pdr=valores["pdr"],
+            intraday_prices_yf=valores.get("intraday"),
+            news_df=valores["news"],
+        )
+    return resultados
 
-    report += "---\n\n"
-    report += "_Análisis generado automáticamente. Los datos pueden variar según la disponibilidad de la API y los límites del plan._\n"
-    return report
+
+def obtener_datos_mercado(ticker: str, incluir_precios_yf: bool = True) -> Optional[DatosMercado]:
+    """
+    Descarga todos los datos de mercado de un ticker ya normalizado.
+    
+    Args:
+        ticker: Símbolo normalizado del activo
+        incluir_precios_yf: Si False, omite los precios diarios/intradía de yfinance
+        
+    Returns:
+        DatosMercado con lo que se haya podido obtener, o None si falla
+    """
+    return obtener_datos_mercado_lote([ticker], incluir_precios_yf).get(ticker)
+
+
+class SnapshotMercado:
+    """
+    Snapshot de datos de mercado de una ejecución.
+    
+    Cada ticker normalizado se descarga una única vez por ejecución y todos
+    los clientes que lo tienen en cartera leen del mismo snapshot, de modo que
+    las llamadas a Yahoo crecen con el número de símbolos distintos y no con
+    clientes × posiciones.
+    
+    El informe de cada ticker también se renderiza una sola vez por ejecución
+    (en un directorio temporal que se borra con `cerrar`) y todos sus
+    titulares suben el mismo archivo, así que el contenido es idéntico entre
+    clientes y el almacenamiento por contenido lo guarda una única vez.
+    """
+
+    def __init__(self):
+        self._datos: Dict[str, Optional[DatosMercado]] = {}
+        self._en_curso: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        # Fecha de la ejecución para los informes de tickers sin precios diarios
+        self.fecha_ejecucion = datetime.date.today().isoformat()
+        self._informes: Dict[str, Optional[str]] = {}
+        self._locks_informe: Dict[str, threading.Lock] = {}
+        self._directorio_informes: Optional[str] = None
+
+    def asegurar(self, tickers: Iterable[str]) -> None:
+        """
+        Descarga los tickers que todavía no están en el snapshot.
+        
+        Es seguro llamarlo desde varios hilos: si otro hilo ya está descargando
+        un ticker, se espera a que termine en lugar de descargarlo de nuevo.
+        
+        Args:
+            tickers: Tickers (originales o normalizados) que se van a necesitar
+        """
+        pendientes = []
+        en_espera = []
+        with self._lock:
+            for ticker in tickers:
+                normalizado = normalizar_ticker(ticker)
+                if not normalizado or normalizado in self._datos or normalizado in pendientes:
+                    continue
+                if normalizado in self._en_curso:
+                    en_espera.append(self._en_curso[normalizado])
+                else:
+                    self._en_curso[normalizado] = threading.Event()
+                    pendientes.append(normalizado)
+
+        try:
+            if pendientes:
+                self._descargar(pendientes)
+        finally:
+            with self._lock:
+                for ticker in pendientes:
+                    self._datos.setdefault(ticker, None)
+                    self._en_curso.pop(ticker).set()
+
+        for evento in en_espera:
+            evento.wait()
+
+    def _descargar(self, pendientes: List[str]) -> None:
+        """Descarga los datos de mercado de los tickers y los incorpora al snapshot."""
+
+        print(f"\n📥 Descargando datos de mercado de {len(pendientes)} tickers: {', '.join(pendientes)}")
+
+        # Precios de yfinance: servidos desde el almacén local, que solo descarga
+        # (en lote) las barras posteriores a la última almacenada. Se ejecutan en
+        # el motor en paralelo con el resto de llamadas de los tickers.
+        timeout_lotes = motor_descargas.timeout * max(1, math.ceil(len(pendientes) / YF_TAMANO_LOTE))
+        tarea_diarios = motor_descargas.enviar(
+            "yfinance",
+            price_store.actualizar,
+            pendientes,
+            "1d",
+            lambda lote, inicio: get_yf_daily_prices_lote(lote, inicio, FECHA_FIN).datos,
+            FECHA_INICIO,
+            descripcion="almacén de precios diarios",
+            timeout=timeout_lotes,
+            exclusion=_yf_download_lock,
+        )
+        tarea_intradia = motor_descargas.enviar(
+            "yfinance",
+            price_store.actualizar,
+            pendientes,
+            "1h",
+            lambda lote, inicio: get_yf_intraday_prices_lote(lote, interval="1h", start_date=inicio).datos,
+            FECHA_INICIO_INTRADIA,
+            descripcion="almacén de precios intradía",
+            timeout=timeout_lotes,
+            exclusion=_yf_download_lock,
+        )
+
+        datos_lote = obtener_datos_mercado_lote(pendientes, incluir_precios_yf=False)
+        diarios = motor_descargas.resultado(tarea_diarios, por_defecto={})
+        intradia = motor_descargas.resultado(tarea_intradia, por_defecto={})
+
+        with self._lock:
+            for ticker in pendientes:
+                datos = datos_lote.get(ticker)
+                if datos is not None:
+                    datos.daily_prices_yf = diarios.get(ticker)
+                    datos.intraday_prices_yf = intradia.get(ticker)
+                self._datos[ticker] = datos
+
+        news_store.guardar()
+
+    def obtener(self, ticker: str) -> Optional[DatosMercado]:
+        """Retorna los datos del ticker, descargándolos si aún no están en el snapshot."""
+        normalizado = normalizar_ticker(ticker)
+        if normalizado not in self._datos:
+            self.asegurar([normalizado])
+        return self._datos.get(normalizado)
+
+    def ruta_informe(self, ticker: str) -> Optional[str]:
+        """
+        Retorna la ruta del informe Markdown del ticker, renderizándolo la primera
+        vez que se pide en la ejecución (None si no hay datos o falla el render).
+        """
+        normalizado = normalizar_ticker(ticker)
+        with self._lock:
+            if normalizado in self._informes:
+                return self._informes[normalizado]
+            lock = self._locks_informe.setdefault(normalizado, threading.Lock())
+        
+        # Un lock por ticker: los demás hilos esperan al render en curso
+        with lock:
+            with self._lock:
+                if normalizado in self._informes:
+                    return self._informes[normalizado]
+            ruta = self._renderizar(normalizado)
+            with self._lock:
+                self._informes[normalizado] = ruta
+        return ruta
+
+    def _renderizar(self, ticker: str) -> Optional[str]:
+        """Escribe en disco el informe del ticker normalizado."""
+        datos = self.obtener(ticker)
+        if datos is None:
+            logger.error(f"No hay datos de mercado disponibles para {ticker}")
+            return None
+        with self._lock:
+            if self._directorio_informes is None:
+                self._directorio_informes = tempfile.mkdtemp(prefix="informes_tickers_")
+            directorio = self._directorio_informes
+        ruta = os.path.join(directorio, f"{sanitizar_nombre_archivo(ticker)}_analisis_financiero.md")
+        try:
+            with escritor_archivo(ruta) as escritor:
+                escribir_informe_ticker(datos, escritor, self.fecha_ejecucion)
+        except Exception as e:
+            logger.error(f"❌ Error al generar el informe de {ticker}: {e}")
+            if os.path.exists(ruta):
+                os.remove(ruta)
+            return None
+        logger.info(f"✅ Informe generado para {ticker}")
+        return ruta
+
+    def cerrar(self) -> None:
+        """Borra los informes de tickers renderizados en la ejecución."""
+        with self._lock:
+            directorio, self._directorio_informes = self._directorio_informes, None
+            self._informes.clear()
+        if directorio:
+            shutil.rmtree(directorio, ignore_errors=True)
 
 
 # --- Procesamiento por Ticker ---
 
-def procesar_ticker(ticker: str, cliente_id: str) -> Optional[str]:
+def escribir_informe_ticker(
+    datos: DatosMercado,
+    escritor: EscritorInforme,
+    fecha_por_defecto: Optional[str] = None,
+) -> None:
+    """Escribe el informe Markdown de un ticker a partir de sus datos de mercado."""
+    escribir_informe_markdown(
+        escritor,
+        datos.ticker,
+        datos.profile,
+        datos.estados_financieros.get("income"),
+        datos.estados_financieros.get("balance"),
+        datos.estados_financieros.get("cashflow"),
+        datos.daily_prices_yf,
+        datos.daily_prices_pdr,
+        datos.intraday_prices_yf,
+        datos.news_df,
+        fecha_por_defecto,
+    )
+
+
+def generar_informe_ticker(datos: DatosMercado) -> str:
+    """Genera el informe Markdown de un ticker a partir de sus datos de mercado."""
+    escritor = escritor_memoria()
+    escribir_informe_ticker(datos, escritor)
+    return escritor.contenido()
+
+
+def escribir_ticker(
+    ticker: str,
+    cliente_id: str,
+    escritor: EscritorInforme,
+    snapshot: Optional[SnapshotMercado] = None,
+) -> bool:
     """
-    Procesa un ticker individual y genera su informe.
+    Procesa un ticker individual y escribe su informe en el escritor indicado.
     
     Args:
         ticker: Símbolo del activo (será normalizado automáticamente)
         cliente_id: ID del cliente para logging
+        escritor: Destino del informe (memoria o archivo)
+        snapshot: Snapshot de mercado compartido. Si es None, se descargan los datos
         
     Returns:
-        str: Contenido del informe o None si falla
+        bool: True si el informe se escribió completo
     """
     # Normalizar el ticker antes de procesarlo
     ticker_original = ticker
@@ -470,125 +963,267 @@ def procesar_ticker(ticker: str, cliente_id: str) -> Optional[str]:
         logger.info(f"   Ticker original: {ticker_original} -> Normalizado: {ticker}")
     
     try:
-        ticker_obj = get_yf_ticker(ticker)
-        if ticker_obj is None:
-            logger.error(f"No se pudo inicializar yfinance para {ticker}")
-            return None
+        if snapshot is not None:
+            datos = snapshot.obtener(ticker)
+        else:
+            datos = obtener_datos_mercado(ticker)
+            news_store.guardar()
+        if datos is None:
+            logger.error(f"No hay datos de mercado disponibles para {ticker}")
+            return False
 
-        profile = get_yf_profile(ticker_obj)
-        estados_financieros = get_yf_financial_statements(ticker_obj)
-        daily_prices_yf = get_yf_daily_prices(ticker, FECHA_INICIO, FECHA_FIN)
-        daily_prices_pdr = get_pdr_daily_prices(ticker, FECHA_INICIO, FECHA_FIN)
-        intraday_prices_yf = get_yf_intraday_prices(ticker)
-        news_df = get_yf_news(ticker_obj)
-
-        report_content = generate_markdown_report(
-            ticker,
-            profile,
-            estados_financieros.get("income"),
-            estados_financieros.get("balance"),
-            estados_financieros.get("cashflow"),
-            daily_prices_yf,
-            daily_prices_pdr,
-            intraday_prices_yf,
-            news_df,
-        )
+        escribir_informe_ticker(datos, escritor, snapshot.fecha_ejecucion if snapshot is not None else None)
         
         logger.info(f"✅ Informe generado para {ticker}")
-        return report_content
+        return True
         
     except Exception as e:
         logger.error(f"❌ Error al procesar {ticker}: {e}")
+        return False
+
+
+def procesar_ticker(ticker: str, cliente_id: str, snapshot: Optional[SnapshotMercado] = None) -> Optional[str]:
+    """
+    Procesa un ticker individual y genera su informe.
+    
+    Args:
+        ticker: Símbolo del activo (será normalizado automáticamente)
+        cliente_id: ID del cliente para logging
+        snapshot: Snapshot de mercado compartido. Si es None, se descargan los datos
+        
+    Returns:
+        str: Contenido del informe o None si falla
+    """
+    escritor = escritor_memoria()
+    if not escribir_ticker(ticker, cliente_id, escritor, snapshot):
         return None
+    return escritor.contenido()
 
 
 # --- Procesamiento por Cliente ---
 
-def procesar_cliente(cliente: Cliente, generar_consolidado: bool = True) -> Dict[str, Any]:
+@dataclass
+class TrabajoCliente:
     """
-    Procesa todos los assets de un cliente y genera sus informes.
+    Estado de un cliente a su paso por las etapas descarga → render → subida.
+    Los informes se escriben en `directorio` (temporal) y se referencian por ruta.
+    """
+    cliente: Cliente
+    snapshot: SnapshotMercado
+    tickers: List[str] = field(default_factory=list)
+    informes: List[Dict[str, Optional[str]]] = field(default_factory=list)
+    errores: List[str] = field(default_factory=list)
+    directorio: Optional[str] = None
+    marcas: Dict[str, Optional[str]] = field(default_factory=dict)
+    posiciones: Optional[str] = None
+
+
+def preparar_datos_cliente(cliente: Cliente, snapshot: Optional[SnapshotMercado] = None) -> TrabajoCliente:
+    """
+    Etapa de descarga: asegura en el snapshot los datos de mercado del cliente.
     
     Args:
         cliente: Objeto Cliente con sus portfolios
-        generar_consolidado: Si True, genera un informe consolidado
+        snapshot: Snapshot de mercado compartido. Si es None, se crea uno propio
         
     Returns:
-        Dict con estadísticas del procesamiento
+        TrabajoCliente listo para renderizar
     """
-    # Obtener todos los assets de todos los portfolios
     todos_los_assets = cliente.get_todos_los_assets()
-    todos_los_tickers = cliente.get_todos_los_tickers()
+    tickers = cliente.get_todos_los_tickers()
     
     print("\n" + "="*80)
     print(f"🎯 PROCESANDO CLIENTE: {cliente.nombre_completo}")
     print(f"📧 Email: {cliente.email or 'N/A'}")
     print(f"📂 Total de Portfolios: {len(cliente.portfolios)}")
     print(f"📊 Total de Assets: {len(todos_los_assets)}")
-    print(f"🎯 Tickers únicos: {len(todos_los_tickers)}")
+    print(f"🎯 Tickers únicos: {len(tickers)}")
     print("="*80 + "\n")
     
-    # Asegurar que existe la carpeta del cliente
-    crear_carpeta_cliente(cliente.user_id)
-    
-    tickers = todos_los_tickers
     logger.info(f"Assets del cliente {cliente.user_id}: {', '.join(tickers)}")
     
-    informes_generados = []
-    errores = []
+    # Descargar solo los tickers que aún no están en el snapshot
+    if snapshot is None:
+        snapshot = SnapshotMercado()
+    snapshot.asegurar(tickers)
+    
+    trabajo = TrabajoCliente(cliente=cliente, snapshot=snapshot, tickers=tickers)
+    trabajo.marcas = marcas_datos_mercado(trabajo)
+    trabajo.posiciones = huella_posiciones(cliente)
+    return trabajo
+
+
+def marcas_datos_mercado(trabajo: TrabajoCliente) -> Dict[str, Optional[str]]:
+    """
+    Retorna la marca de datos de mercado de cada ticker del cliente: la fecha de
+    la última barra diaria disponible (None si no hay precios).
+    """
+    marcas: Dict[str, Optional[str]] = {}
+    for ticker in trabajo.tickers:
+        datos = trabajo.snapshot.obtener(ticker)
+        precios = datos.daily_prices_yf if datos is not None else None
+        marcas[ticker] = str(precios.index.max()) if precios is not None and not precios.empty else None
+    return marcas
+
+
+def huella_posiciones(cliente: Cliente) -> str:
+    """
+    Retorna una huella (SHA-1) de los portfolios y assets del cliente. Cambia con
+    cualquier alta, baja o edición de sus posiciones, sin depender del snapshot
+    local de portfolios.
+    """
+    posiciones = sorted(
+        (
+            portfolio.portfolio_id, asset.asset_id, asset.ticker,
+            asset.cantidad, asset.precio_compra, asset.fecha_adquisicion,
+        )
+        for portfolio in cliente.portfolios
+        for asset in portfolio.assets
+    )
+    return hashlib.sha1(json.dumps(posiciones, default=str).encode("utf-8")).hexdigest()
+
+
+def requiere_regenerar(trabajo: TrabajoCliente, clientes_cambiados: Optional[Set[str]]) -> bool:
+    """
+    Indica si hay que regenerar los informes del cliente: sus posiciones cambiaron
+    desde la última ejecución o alguno de sus tickers tiene datos de mercado
+    nuevos respecto a los registrados al generar sus últimos informes.
+    
+    Las posiciones se comparan con la huella registrada al generar sus últimos
+    informes, lo que detecta también las bajas y ediciones que no se ven en
+    `clientes_cambiados` y los clientes que fallaron en la ejecución anterior
+    (su huella no se registró).
+    
+    Args:
+        trabajo: Resultado de `preparar_datos_cliente`
+        clientes_cambiados: Clientes con altas o bajas de portfolios/assets
+            (None si no se conocen: se regeneran todos)
+    """
+    user_id = trabajo.cliente.user_id
+    if clientes_cambiados is None or user_id in clientes_cambiados:
+        return True
+    if registro_informes.posiciones(user_id) != trabajo.posiciones:
+        return True
+    return registro_informes.marcas(user_id) != trabajo.marcas
+
+
+def renderizar_informes_cliente(trabajo: TrabajoCliente, generar_consolidado: bool = True) -> TrabajoCliente:
+    """
+    Etapa de render: prepara los informes individuales y escribe el consolidado en disco.
+    
+    Los informes de ticker se renderizan una vez por ejecución en el snapshot y
+    se comparten entre clientes (ver `SnapshotMercado.ruta_informe`); solo el
+    consolidado se escribe en el directorio temporal del cliente, copiando esos
+    archivos por bloques, así que la memoria no depende del número de posiciones.
+    
+    Args:
+        trabajo: Resultado de `preparar_datos_cliente`
+        generar_consolidado: Si True, genera un informe consolidado
+        
+    Returns:
+        El mismo TrabajoCliente con las rutas de los informes generados
+    """
+    cliente = trabajo.cliente
+    tickers = trabajo.tickers
+    trabajo.directorio = tempfile.mkdtemp(prefix=f"informes_{sanitizar_nombre_archivo(cliente.user_id)}_")
+    individuales = []
     
     for idx, ticker in enumerate(tickers, 1):
         print(f"\n[{idx}/{len(tickers)}] Procesando {ticker}...")
         
-        # Procesar ticker
-        report_content = procesar_ticker(ticker, cliente.user_id)
+        nombre_archivo = f"{sanitizar_nombre_archivo(ticker)}_analisis_financiero.md"
+        ruta = trabajo.snapshot.ruta_informe(ticker)
         
-        if report_content:
-            # Guardar informe individual
-            nombre_archivo = f"{sanitizar_nombre_archivo(ticker)}_analisis_financiero.md"
-            success = subir_informe_cliente(report_content, nombre_archivo, cliente.user_id)
-            
-            if success:
-                informes_generados.append({
-                    'ticker': ticker,
-                    'archivo': nombre_archivo,
-                    'contenido': report_content
-                })
-                print(f"✅ Informe de {ticker} guardado exitosamente")
-            else:
-                errores.append(ticker)
-                print(f"❌ Error al guardar informe de {ticker}")
+        if ruta is not None:
+            individuales.append({
+                'ticker': ticker,
+                'archivo': nombre_archivo,
+                'ruta': ruta
+            })
         else:
-            errores.append(ticker)
+            trabajo.errores.append(ticker)
             print(f"❌ Error al procesar {ticker}")
-        
-        # Pausa estratégica entre tickers (excepto el último)
-        if idx < len(tickers):
-            print(f"⏸️  Pausando 15 segundos para respetar límites de API...")
-            time.sleep(15)
+    
+    trabajo.informes.extend(individuales)
     
     # Generar informe consolidado si se solicita
-    if generar_consolidado and informes_generados:
+    if generar_consolidado and individuales:
         print("\n📑 Generando informe consolidado...")
-        consolidated_title = f"# Análisis Financiero Consolidado - Cliente: {cliente.nombre_completo}\n"
-        consolidated_title += f"## User ID: {cliente.user_id}\n"
-        tickers_lista = ', '.join([info['ticker'] for info in informes_generados])
-        consolidated_title += f"## Portfolio: {tickers_lista}\n"
-        consolidated_title += f"## Generado el: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-
-        bloques = "\n\n<br><hr><br>\n\n".join([info['contenido'] for info in informes_generados])
-        final_report = consolidated_title + bloques
-
         nombre_consolidado = "informe_consolidado.md"
-        success = subir_informe_cliente(final_report, nombre_consolidado, cliente.user_id)
+        ruta_consolidado = os.path.join(trabajo.directorio, nombre_consolidado)
+        with escritor_archivo(ruta_consolidado) as escritor:
+            escritor.escribir(f"# Análisis Financiero Consolidado - Cliente: {cliente.nombre_completo}\n")
+            escritor.escribir(f"## User ID: {cliente.user_id}\n")
+            tickers_lista = ', '.join([info['ticker'] for info in individuales])
+            escritor.escribir(f"## Portfolio: {tickers_lista}\n")
+            # Fecha de los datos más recientes del portfolio (no la hora de render)
+            fechas = [m[:10] for m in (trabajo.marcas.get(info['ticker']) for info in individuales) if m]
+            escritor.escribir(f"## Datos al: {max(fechas, default=trabajo.snapshot.fecha_ejecucion)}\n\n")
+            
+            for idx, info in enumerate(individuales):
+                if idx:
+                    escritor.escribir("\n\n<br><hr><br>\n\n")
+                escritor.copiar_archivo(info['ruta'])
+        
+        trabajo.informes.append({
+            'ticker': None,
+            'archivo': nombre_consolidado,
+            'ruta': ruta_consolidado
+        })
+    
+    return trabajo
 
-        if success:
-            print("✅ Informe consolidado guardado exitosamente")
-        else:
-            print("❌ Error al guardar informe consolidado")
+
+def subir_informes_cliente(trabajo: TrabajoCliente) -> Dict[str, Any]:
+    """
+    Etapa de subida: guarda en Storage los informes renderizados del cliente.
+    
+    Args:
+        trabajo: Resultado de `renderizar_informes_cliente`
+        
+    Returns:
+        Dict con estadísticas del procesamiento
+    """
+    cliente = trabajo.cliente
+    errores = trabajo.errores
+    informes_generados = []
+    
+    try:
+        # Asegurar que existe la carpeta del cliente
+        crear_carpeta_cliente(cliente.user_id)
+        
+        # Todos los informes del cliente en un lote paralelo (en el orden de trabajo.informes)
+        lote = storage_manager.subir_lote(
+            ElementoSubida(cliente.user_id, informe['archivo'], ruta_local=informe['ruta'])
+            for informe in trabajo.informes
+        )
+        for informe, resultado in zip(trabajo.informes, lote.resultados):
+            success = resultado.exito
+            ticker = informe['ticker']
+            
+            if ticker is None:
+                if success:
+                    print("✅ Informe consolidado guardado exitosamente")
+                else:
+                    print("❌ Error al guardar informe consolidado")
+            elif success:
+                informes_generados.append(ticker)
+                print(f"✅ Informe de {ticker} guardado exitosamente")
+            else:
+                errores.append(ticker)
+                print(f"❌ Error al guardar informe de {ticker}")
+    finally:
+        # Una única escritura del manifiesto por cliente, tras todas sus subidas
+        guardar_manifest_cliente(cliente.user_id)
+        if trabajo.directorio:
+            shutil.rmtree(trabajo.directorio, ignore_errors=True)
+    
+    if not errores:
+        registro_informes.registrar(cliente.user_id, trabajo.marcas, trabajo.posiciones)
     
     # Resumen final
     print("\n" + "="*80)
-    print("📊 RESUMEN DEL PROCESAMIENTO")
+    print(f"📊 RESUMEN DEL PROCESAMIENTO - {cliente.nombre_completo}")
     print("="*80)
     print(f"✅ Informes generados exitosamente: {len(informes_generados)}")
     print(f"❌ Errores encontrados: {len(errores)}")
@@ -600,24 +1235,151 @@ def procesar_cliente(cliente: Cliente, generar_consolidado: bool = True) -> Dict
         'cliente_id': cliente.user_id,
         'cliente_nombre': cliente.nombre_completo,
         'total_portfolios': len(cliente.portfolios),
-        'total_assets': len(todos_los_assets),
-        'tickers_unicos': len(tickers),
+        'total_assets': len(cliente.get_todos_los_assets()),
+        'tickers_unicos': len(trabajo.tickers),
         'informes_generados': len(informes_generados),
         'errores': len(errores),
         'tickers_error': errores
     }
 
 
+def procesar_cliente(
+    cliente: Cliente,
+    generar_consolidado: bool = True,
+    snapshot: Optional[SnapshotMercado] = None,
+) -> Dict[str, Any]:
+    """
+    Procesa todos los assets de un cliente y genera sus informes.
+    
+    Args:
+        cliente: Objeto Cliente con sus portfolios
+        generar_consolidado: Si True, genera un informe consolidado
+        snapshot: Snapshot de mercado compartido entre clientes. Si es None,
+            se crea uno propio para este cliente
+        
+    Returns:
+        Dict con estadísticas del procesamiento
+    """
+    trabajo = preparar_datos_cliente(cliente, snapshot)
+    try:
+        renderizar_informes_cliente(trabajo, generar_consolidado)
+        return subir_informes_cliente(trabajo)
+    finally:
+        if snapshot is None:
+            trabajo.snapshot.cerrar()
+
+
+def procesar_clientes_pipeline(
+    clientes: Iterable[Cliente],
+    generar_consolidado: bool = True,
+    solo_cambios: bool = False,
+    clientes_cambiados: Optional[Set[str]] = None,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Procesa varios clientes en un pipeline descarga → render → subida.
+    
+    Cada etapa tiene su propio pool de hilos y las colas entre etapas están
+    acotadas, así que la subida de un cliente se solapa con la descarga del
+    siguiente sin acumular informes en memoria. Todos los clientes comparten
+    el mismo snapshot: cada símbolo se descarga una sola vez por ejecución.
+    
+    Args:
+        clientes: Clientes a procesar (deben tener assets); se consumen de forma perezosa
+        generar_consolidado: Si True, genera un informe consolidado por cliente
+        solo_cambios: Si True, tras la descarga se descartan los clientes que no
+            requieren regenerar sus informes (ver `requiere_regenerar`)
+        clientes_cambiados: Clientes con cambios en sus posiciones (modo solo_cambios)
+        
+    Returns:
+        (estadísticas de cada cliente procesado, user_ids omitidos por no tener cambios)
+    """
+    snapshot = SnapshotMercado()
+    sin_cambios: List[str] = []
+    
+    def descargar(cliente: Cliente) -> Optional[TrabajoCliente]:
+        trabajo = preparar_datos_cliente(cliente, snapshot)
+        if solo_cambios and not requiere_regenerar(trabajo, clientes_cambiados):
+            print(f"⏭️  Cliente {cliente.user_id} sin cambios en posiciones ni datos de mercado. Saltando...")
+            sin_cambios.append(cliente.user_id)
+            return None
+        return trabajo
+    
+    pipeline = Pipeline(
+        [
+            Etapa("descarga", descargar, PIPELINE_HILOS_DESCARGA),
+            Etapa("render", lambda trabajo: renderizar_informes_cliente(trabajo, generar_consolidado), PIPELINE_HILOS_RENDER),
+            Etapa("subida", subir_informes_cliente, PIPELINE_HILOS_SUBIDA),
+        ],
+        capacidad_cola=PIPELINE_CAPACIDAD_COLA,
+    )
+    try:
+        resultados = pipeline.ejecutar(clientes)
+    finally:
+        snapshot.cerrar()
+    
+    print("\n⏱️  Rendimiento por etapa:")
+    for nombre, est in pipeline.estadisticas().items():
+        print(
+            f"   {nombre}: {est['procesados']} clientes en {est['segundos']:.1f}s "
+            f"({est['por_segundo']:.2f}/s, ocupado {est['segundos_ocupados']:.1f}s, "
+            f"{est['errores']} errores)"
+        )
+    if solo_cambios:
+        print(f"   ⏭️  {len(sin_cambios)} clientes sin cambios omitidos")
+    return resultados, sin_cambios
+
+
+# --- Estadísticas de Caché ---
+
+def imprimir_estadisticas_cache() -> None:
+    """Muestra la tasa de aciertos y la antigüedad de la caché de fundamentales."""
+    print("\n📦 Caché de fundamentales:")
+    for tipo, est in fundamentals_cache.estadisticas().items():
+        consultas = est['aciertos'] + est['fallos']
+        print(
+            f"   {tipo}: {est['aciertos']}/{consultas} aciertos ({est['tasa_aciertos']:.0%}), "
+            f"{est['entradas']} entradas, edad media {est['edad_media_horas']:.1f} h "
+            f"(máx. {est['edad_max_horas']:.1f} h)"
+        )
+
+
+def imprimir_estadisticas_storage() -> None:
+    """Muestra cuántos informes se subieron, se omitieron por no cambiar o fallaron."""
+    est = storage_manager.estadisticas()
+    print("\n☁️  Subidas a Storage:")
+    print(
+        f"   {est['subidos']} subidos ({est['bytes_subidos'] / 1024:.1f} KiB), "
+        f"{est['omitidos']} sin cambios omitidos ({est['bytes_omitidos'] / 1024:.1f} KiB), "
+        f"{est['fallidos']} fallidos"
+    )
+    if est['blobs_reutilizados']:
+        print(
+            f"   {est['blobs_reutilizados']} informes reutilizaron un blob compartido ya existente "
+            f"({est['bytes_reutilizados'] / 1024:.1f} KiB no subidos)"
+        )
+
+
 # --- Función Principal ---
 
-def main(cliente_id: Optional[str] = None, modo_demo: bool = False):
+def main(
+    cliente_id: Optional[str] = None,
+    modo_demo: bool = False,
+    solo_cambios: bool = False,
+    forzar_subidas: bool = False,
+):
     """
     Función principal para ejecutar el análisis financiero.
     
     Args:
         cliente_id: Si se especifica, procesa solo ese cliente. Si es None, procesa todos los clientes activos.
         modo_demo: Si True, usa una lista hardcodeada de tickers para pruebas sin base de datos.
+        solo_cambios: Si True (todos los clientes), regenera solo los informes de los clientes
+            cuyas posiciones cambiaron o cuyos tickers tienen datos de mercado nuevos.
+        forzar_subidas: Si True, sube todos los informes aunque su contenido no haya cambiado.
     """
+    if forzar_subidas:
+        storage_manager.forzar_subidas = True
+
     print("\n" + "🚀"*40)
     print("API FINANCIERA MULTI-CLIENTE - SISTEMA ESCALABLE")
     print("🚀"*40 + "\n")
@@ -687,33 +1449,47 @@ def main(cliente_id: Optional[str] = None, modo_demo: bool = False):
         else:
             # Procesar todos los clientes activos
             print("\n🌐 Modo: Todos los Clientes Activos")
-            clientes = get_clientes_activos()
+            omitidos = []
+            
+            # Los cambios se calculan antes de recargar el snapshot de portfolios;
+            # las bajas y ediciones se detectan además por cliente con la huella
+            # de posiciones del registro (ver `requiere_regenerar`)
+            cambios = None
+            clientes_cambiados = None
+            if solo_cambios:
+                cambios = get_cambios_desde(registro_informes.watermark)
+                if not cambios.sin_referencia:
+                    clientes_cambiados = set(cambios.clientes_afectados)
+                    print(f"🔄 Modo incremental: {len(clientes_cambiados)} clientes con cambios en sus posiciones")
+            
+            def clientes_con_assets():
+                # Los clientes llegan por páginas: el pipeline empieza con la primera
+                # mientras las siguientes se consultan
+                for cliente in iter_clientes():
+                    if not cliente.get_todos_los_assets():
+                        print(f"⚠️  Cliente {cliente.user_id} no tiene assets en ningún portfolio. Saltando...")
+                        omitidos.append(cliente.user_id)
+                        continue
+                    yield cliente
             
-            if not clientes:
+            all_stats, sin_cambios = procesar_clientes_pipeline(
+                clientes_con_assets(),
+                generar_consolidado=True,
+                solo_cambios=solo_cambios,
+                clientes_cambiados=clientes_cambiados,
+            )
+            if cambios is not None:
+                registro_informes.actualizar_watermark(cambios.watermark)
+            
+            if not all_stats and not omitidos and not sin_cambios:
                 print("\n⚠️  No se encontraron clientes activos en la base de datos.")
                 return
             
-            print(f"\n📊 Total de clientes activos a procesar: {len(clientes)}")
-            
-            all_stats = []
-            for idx, cliente in enumerate(clientes, 1):
-                print(f"\n{'='*80}")
-                print(f"CLIENTE {idx}/{len(clientes)}")
-                print(f"{'='*80}")
-                
-                # Verificar si tiene assets
-                todos_los_assets = cliente.get_todos_los_assets()
-                if not todos_los_assets:
-                    print(f"⚠️  Cliente {cliente.user_id} no tiene assets en ningún portfolio. Saltando...")
-                    continue
-                
-                stats = procesar_cliente(cliente, generar_consolidado=True)
-                all_stats.append(stats)
-                
-                # Pausa entre clientes (excepto el último)
-                if idx < len(clientes):
-                    print(f"\n⏸️  Pausando 30 segundos antes del siguiente cliente...")
-                    time.sleep(30)
+            total = len(all_stats) + len(omitidos) + len(sin_cambios)
+            print(
+                f"\n📊 Total de clientes activos: {total} "
+                f"({len(omitidos)} sin assets, {len(sin_cambios)} sin cambios)"
+            )
             
             # Resumen global
             print("\n" + "🎉"*40)
@@ -726,6 +1502,9 @@ def main(cliente_id: Optional[str] = None, modo_demo: bool = False):
                 print(f"   ❌ Errores: {stat['errores']}")
             print("\n" + "="*80)
         
+        registro_informes.guardar()
+        imprimir_estadisticas_cache()
+        imprimir_estadisticas_storage()
         print("\n✅ Procesamiento completado exitosamente")
         
     except Exception as e:
@@ -737,16 +1516,27 @@ if __name__ == "__main__":
     import sys
     
     # Permitir pasar argumentos por línea de comandos
-    # Uso: python financial_api.py [cliente_id] [--demo]
+    # Uso: python financial_api.py [cliente_id] [--demo] [--solo-cambios] [--forzar-subidas]
     
     args = sys.argv[1:]
     cliente_id_arg = None
     modo_demo_arg = False
+    solo_cambios_arg = False
+    forzar_subidas_arg = False
     
     for arg in args:
         if arg == '--demo':
             modo_demo_arg = True
+        elif arg == '--solo-cambios':
+            solo_cambios_arg = True
+        elif arg == '--forzar-subidas':
+            forzar_subidas_arg = True
         elif not arg.startswith('--'):
             cliente_id_arg = arg
     
-    main(cliente_id=cliente_id_arg, modo_demo=modo_demo_arg)
+    main(
+        cliente_id=cliente_id_arg,
+        modo_demo=modo_demo_arg,
+        solo_cambios=solo_cambios_arg,
+        forzar_subidas=forzar_subidas_arg,
+    )
@@ -0,0 +1,211 @@
+"""
+Módulo de caché persistente para perfiles de empresa y estados financieros.
+Cada tipo de dato tiene su propia política de frescura (TTL) y solo se guardan
+los campos que usa el informe, no la respuesta completa de yfinance.
+"""
+
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from config import (
+    FUNDAMENTALS_CACHE_DIR,
+    FUNDAMENTALS_TTL_PERFIL_HORAS,
+    FUNDAMENTALS_TTL_ESTADOS_HORAS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Política de frescura por tipo de dato
+TTL_POR_TIPO: Dict[str, datetime.timedelta] = {
+    "perfil": datetime.timedelta(hours=FUNDAMENTALS_TTL_PERFIL_HORAS),
+    "income": datetime.timedelta(hours=FUNDAMENTALS_TTL_ESTADOS_HORAS),
+    "balance": datetime.timedelta(hours=FUNDAMENTALS_TTL_ESTADOS_HORAS),
+    "cashflow": datetime.timedelta(hours=FUNDAMENTALS_TTL_ESTADOS_HORAS),
+}
+
+
+def _a_json(valor: Any) -> Any:
+    """Convierte escalares de numpy/pandas a tipos serializables en JSON."""
+    if hasattr(valor, "item"):
+        return valor.item()
+    if isinstance(valor, (datetime.date, pd.Timestamp)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _serializar_df(df: pd.DataFrame) -> Dict[str, Any]:
+    columnas_fecha = isinstance(df.columns, pd.DatetimeIndex)
+    return {
+        "index": [str(i) for i in df.index],
+        "columns": [c.isoformat() if columnas_fecha else str(c) for c in df.columns],
+        "columnas_fecha": columnas_fecha,
+        "data": df.astype(object).where(df.notna(), None).values.tolist(),
+    }
+
+
+def _deserializar_df(datos: Dict[str, Any]) -> pd.DataFrame:
+    columnas = pd.to_datetime(datos["columns"]) if datos.get("columnas_fecha") else datos["columns"]
+    return pd.DataFrame(datos["data"], index=datos["index"], columns=columnas, dtype=float)
+
+
+class FundamentalsCache:
+    """
+    Caché en disco de datos fundamentales por tipo y ticker.
+
+    Estructura en disco:
+    {directorio}/
+    ├── perfil/AAPL.json
+    ├── income/AAPL.json
+    ├── balance/AAPL.json
+    └── cashflow/AAPL.json
+    """
+
+    def __init__(
+        self,
+        directorio: str = FUNDAMENTALS_CACHE_DIR,
+        ttl_por_tipo: Optional[Dict[str, datetime.timedelta]] = None,
+    ):
+        """Inicializa la caché en el directorio indicado (se crea al escribir)."""
+        self.directorio = directorio
+        self.ttl_por_tipo = ttl_por_tipo or TTL_POR_TIPO
+        self._aciertos: Dict[str, int] = {}
+        self._fallos: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _ruta(self, tipo: str, ticker: str) -> str:
+        seguro = re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+        return os.path.join(self.directorio, tipo, f"{seguro}.json")
+
+    def _leer_entrada(self, tipo: str, ticker: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._ruta(tipo, ticker), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Entrada de caché ilegible ({tipo}/{ticker}): {e}")
+            return None
+
+    def _contar(self, tipo: str, acierto: bool) -> None:
+        with self._lock:
+            contador = self._aciertos if acierto else self._fallos
+            contador[tipo] = contador.get(tipo, 0) + 1
+
+    def edad(self, tipo: str, ticker: str) -> Optional[datetime.timedelta]:
+        """Retorna la antigüedad de la entrada o None si no existe."""
+        entrada = self._leer_entrada(tipo, ticker)
+        if entrada is None:
+            return None
+        return datetime.datetime.now() - datetime.datetime.fromisoformat(entrada["guardado"])
+
+    def guardar(self, tipo: str, ticker: str, valor: Any) -> None:
+        """
+        Persiste un valor en la caché.
+
+        Args:
+            tipo: Tipo de dato ("perfil", "income", "balance", "cashflow")
+            ticker: Símbolo normalizado
+            valor: Diccionario o DataFrame ya recortado a los campos del informe
+        """
+        if isinstance(valor, pd.DataFrame):
+            entrada = {"formato": "dataframe", "datos": _serializar_df(valor)}
+        else:
+            entrada = {"formato": "json", "datos": valor}
+        entrada["guardado"] = datetime.datetime.now().isoformat()
+
+        ruta = self._ruta(tipo, ticker)
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            temporal = f"{ruta}.{threading.get_ident()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(entrada, f, ensure_ascii=False, default=_a_json)
+            os.replace(temporal, ruta)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar {tipo}/{ticker} en la caché: {e}")
+
+    def obtener(self, tipo: str, ticker: str, cargador: Callable[[], Any]) -> Any:
+        """
+        Retorna el valor en caché si está fresco; si no, lo carga y lo guarda.
+        Los valores vacíos (None) no se guardan para reintentar en la siguiente
+        ejecución; si la carga no devuelve nada y hay una entrada vencida, se
+        retorna esa entrada en lugar de None.
+
+        Args:
+            tipo: Tipo de dato, determina el TTL aplicado
+            ticker: Símbolo normalizado
+            cargador: Función que descarga y recorta el valor
+
+        Returns:
+            Diccionario o DataFrame, o None si no hay datos
+        """
+        entrada = self._leer_entrada(tipo, ticker)
+        ttl = self.ttl_por_tipo.get(tipo, datetime.timedelta(0))
+        if entrada is not None:
+            edad = datetime.datetime.now() - datetime.datetime.fromisoformat(entrada["guardado"])
+            if edad <= ttl:
+                self._contar(tipo, acierto=True)
+                return self._valor_entrada(entrada)
+
+        self._contar(tipo, acierto=False)
+        valor = cargador()
+        if valor is not None:
+            self.guardar(tipo, ticker, valor)
+            return valor
+        if entrada is not None:
+            logger.info(f"♻️  {tipo}/{ticker}: sin datos nuevos, se usa la entrada vencida de la caché")
+            return self._valor_entrada(entrada)
+        return None
+
+    @staticmethod
+    def _valor_entrada(entrada: Dict[str, Any]) -> Any:
+        if entrada["formato"] == "dataframe":
+            return _deserializar_df(entrada["datos"])
+        return entrada["datos"]
+
+    def estadisticas(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retorna aciertos, fallos, tasa de aciertos y antigüedad de las entradas por tipo.
+
+        Returns:
+            Dict tipo -> {aciertos, fallos, tasa_aciertos, entradas, edad_media_horas, edad_max_horas}
+        """
+        ahora = datetime.datetime.now()
+        resumen: Dict[str, Dict[str, Any]] = {}
+        for tipo in self.ttl_por_tipo:
+            edades = []
+            carpeta = os.path.join(self.directorio, tipo)
+            if os.path.isdir(carpeta):
+                for nombre in os.listdir(carpeta):
+                    if not nombre.endswith(".json"):
+                        continue
+                    try:
+                        with open(os.path.join(carpeta, nombre), "r", encoding="utf-8") as f:
+                            guardado = datetime.datetime.fromisoformat(json.load(f)["guardado"])
+                        edades.append((ahora - guardado).total_seconds() / 3600)
+                    except Exception:
+                        continue
+
+            with self._lock:
+                aciertos = self._aciertos.get(tipo, 0)
+                fallos = self._fallos.get(tipo, 0)
+            total = aciertos + fallos
+            resumen[tipo] = {
+                "aciertos": aciertos,
+                "fallos": fallos,
+                "tasa_aciertos": aciertos / total if total else 0.0,
+                "entradas": len(edades),
+                "edad_media_horas": sum(edades) / len(edades) if edades else 0.0,
+                "edad_max_horas": max(edades) if edades else 0.0,
+            }
+        return resumen
+
+
+# Instancia global de la caché de fundamentales
+fundamentals_cache = FundamentalsCache()
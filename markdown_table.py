@@ -0,0 +1,360 @@
+"""
+Módulo de renderizado de tablas Markdown.
+Genera exactamente la misma tabla "pipe" que `DataFrame.to_markdown()` (tabulate),
+pero formateando columna a columna a partir de los arrays del DataFrame en lugar
+de deducir el tipo y el formato celda a celda.
+"""
+
+import logging
+import math
+import re
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from wcwidth import wcswidth
+    WCWIDTH_AVAILABLE = True
+except ImportError:
+    WCWIDTH_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Espacio mínimo que se suma al ancho del encabezado (MIN_PADDING de tabulate)
+RELLENO_MINIMO = 2
+
+# Orden de generalidad de los tipos de columna: la columna toma el más general de sus celdas
+_GENERALIDAD = {type(None): 0, bool: 1, int: 2, float: 3, bytes: 4, str: 5}
+_TIPO_POR_GENERALIDAD = {nivel: tipo for tipo, nivel in _GENERALIDAD.items()}
+
+_NUMERO_CON_MILES = re.compile(r"^(([+-]?[0-9]{1,3})(?:,([0-9]{3}))*)?(?(1)\.[0-9]*|\.[0-9]+)?$")
+
+# Celdas multilínea o con códigos ANSI: tabulate las maqueta de otra forma
+_TEXTO_ESPECIAL = re.compile(r"[\r\n\x1b]")
+
+
+# --- Deducción de tipos y formato (mismas reglas que tabulate) ---
+
+def _convertible(conversion, valor: Any) -> bool:
+    try:
+        conversion(valor)
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+def _es_numero(valor: Any) -> bool:
+    if type(valor) in (float, int):
+        return True
+    try:
+        numero = float(valor)
+    except (ValueError, TypeError):
+        return False
+    if not isinstance(valor, (str, bytes)):
+        return True
+    return not (math.isinf(numero) or math.isnan(numero)) or valor.lower() in ("inf", "-inf", "nan")
+
+
+def _es_entero(valor: Any) -> bool:
+    return (
+        type(valor) is int
+        or str(type(valor)).startswith("<class 'numpy.int")
+        or (isinstance(valor, (bytes, str)) and _convertible(int, valor))
+    )
+
+
+def _tipo_celda(valor: Any) -> type:
+    """Tipo menos general de una celda: NoneType, bool, int, float, bytes o str."""
+    if valor is None or (isinstance(valor, (str, bytes)) and not valor):
+        return type(None)
+    if hasattr(valor, "isoformat"):
+        return str
+    if type(valor) is bool or (isinstance(valor, (bytes, str)) and valor in ("True", "False")):
+        return bool
+    con_miles = isinstance(valor, str) and _NUMERO_CON_MILES.match(valor) is not None
+    if _es_entero(valor) or (con_miles and "." not in valor):
+        return int
+    if _es_numero(valor) or con_miles:
+        return float
+    if isinstance(valor, bytes):
+        return bytes
+    return str
+
+
+def _tipo_columna(valores: List[Any]) -> type:
+    nivel = _GENERALIDAD[bool]
+    for valor in valores:
+        nivel = max(nivel, _GENERALIDAD[_tipo_celda(valor)])
+        if nivel == _GENERALIDAD[str]:
+            break
+    return _TIPO_POR_GENERALIDAD[nivel]
+
+
+def _formatear_celda(valor: Any, tipo: type) -> str:
+    if valor is None or (isinstance(valor, (bytes, str)) and not valor):
+        return ""
+    if tipo is int:
+        return format(valor, "")
+    if tipo is float:
+        if isinstance(valor, str) and "," in valor:
+            valor = valor.replace(",", "")
+        try:
+            return format(float(valor), "g")
+        except (ValueError, TypeError):
+            return f"{valor}"
+    if tipo is bytes:
+        try:
+            return str(valor, "ascii")
+        except (TypeError, UnicodeDecodeError):
+            return str(valor)
+    return f"{valor}"
+
+
+def _decimales(texto: str) -> int:
+    """Caracteres tras el punto decimal (o tras la 'e'), -1 si no hay."""
+    if not (_es_numero(texto) or _NUMERO_CON_MILES.match(texto)) or _es_entero(texto):
+        return -1
+    posicion = texto.rfind(".")
+    if posicion < 0:
+        posicion = texto.lower().rfind("e")
+    return len(texto) - posicion - 1 if posicion >= 0 else -1
+
+
+def _decimales_g(texto: str) -> int:
+    """Versión de `_decimales` para textos producidos por el formato 'g'."""
+    posicion = texto.rfind(".")
+    if posicion < 0:
+        posicion = texto.rfind("e")
+    return len(texto) - posicion - 1 if posicion >= 0 else -1
+
+
+def _ancho(texto: str) -> int:
+    if WCWIDTH_AVAILABLE and not texto.isascii():
+        return wcswidth(texto)
+    return len(texto)
+
+
+# --- Columnas ---
+
+class _Columna:
+    """Textos ya formateados de una columna y su alineación ('decimal' o 'left')."""
+
+    def __init__(self, textos: List[str], numerica: bool, textos_g: bool = False):
+        self.textos = textos
+        self.numerica = numerica
+        self.textos_g = textos_g
+
+    def alinear(self, ancho_minimo: int) -> Tuple[List[str], int]:
+        """Rellena los textos al ancho común y retorna (textos, ancho)."""
+        textos = self.textos
+        if self.numerica:
+            # Alineación decimal: completar por la derecha hasta el máximo de decimales
+            decimales = list(map(_decimales_g if self.textos_g else _decimales, textos))
+            maximo = max(decimales)
+            if maximo >= 0:
+                textos = [t + " " * (maximo - d) for t, d in zip(textos, decimales)]
+        else:
+            textos = [t.strip() for t in textos]
+
+        ancho = max(ancho_minimo, max(map(_ancho, textos)))
+        return [_rellenar(t, ancho, izquierda=not self.numerica) for t in textos], ancho
+
+
+def _rellenar(texto: str, ancho: int, izquierda: bool) -> str:
+    faltan = ancho - _ancho(texto)
+    if faltan <= 0:
+        return texto
+    return texto + " " * faltan if izquierda else " " * faltan + texto
+
+
+def _columna_numerica(valores: np.ndarray) -> _Columna:
+    """Formatea una columna de un array numérico homogéneo."""
+    if valores.dtype.kind == "i":
+        return _Columna([str(v) for v in valores.tolist()], numerica=True)
+    # Flotantes, enteros sin signo y booleanos de numpy se tratan como float
+    return _Columna(["%g" % v for v in valores.astype(float).tolist()], numerica=True, textos_g=True)
+
+
+def _columna_generica(valores: List[Any]) -> _Columna:
+    """Formatea una columna de objetos deduciendo su tipo como tabulate."""
+    tipo = _tipo_columna(valores)
+    return _Columna([_formatear_celda(v, tipo) for v in valores], numerica=tipo in (int, float))
+
+
+def _columnas_datos(df: pd.DataFrame) -> List[_Columna]:
+    valores = df.to_numpy()
+    if valores.dtype.kind in "iufb":
+        return [_columna_numerica(valores[:, j]) for j in range(valores.shape[1])]
+    return [_columna_generica(list(valores[:, j])) for j in range(valores.shape[1])]
+
+
+# --- API pública ---
+
+def tabla_markdown(df: pd.DataFrame, index: bool = True) -> str:
+    """
+    Renderiza un DataFrame como tabla Markdown estilo GitHub.
+
+    El resultado es idéntico al de `df.to_markdown(index=index)`: números con
+    formato 'g' alineados por el punto decimal, textos alineados a la izquierda
+    y ancho mínimo de columna igual al encabezado más dos espacios.
+
+    Args:
+        df: DataFrame a renderizar
+        index: Si True, incluye el índice como primera columna
+
+    Returns:
+        str: Tabla en formato Markdown
+    """
+    encabezados = [str(c) for c in df.columns]
+    if index and df.index.name is not None:
+        encabezados.insert(0, str(df.index.name))
+
+    if len(df.columns) == 0:
+        return df.to_markdown(index=index)
+
+    columnas = _columnas_datos(df) if len(df) else []
+    if index and len(df):
+        columnas.insert(0, _columna_generica(list(df.index)))
+        if len(encabezados) < len(columnas):
+            encabezados.insert(0, "")
+
+    # Celdas multilínea o con códigos ANSI: se delega en tabulate
+    genericas = [t for c in columnas if not c.numerica for t in c.textos]
+    if _TEXTO_ESPECIAL.search("\t".join(encabezados + genericas)):
+        return df.to_markdown(index=index)
+
+    if not columnas:
+        anchos = [_ancho(h) + RELLENO_MINIMO for h in encabezados]
+        cabecera = "|" + "|".join(f" {_rellenar(h, a, True)} " for h, a in zip(encabezados, anchos)) + "|"
+        separador = "|" + "|".join("-" * (a + 2) for a in anchos) + "|"
+        return f"{cabecera}\n{separador}"
+
+    celdas = []
+    partes_cabecera = []
+    partes_separador = []
+    for columna, encabezado in zip(columnas, encabezados):
+        textos, ancho = columna.alinear(_ancho(encabezado) + RELLENO_MINIMO)
+        celdas.append(textos)
+        partes_cabecera.append(f" {_rellenar(encabezado, ancho, izquierda=not columna.numerica)} ")
+        if columna.numerica:
+            partes_separador.append("-" * (ancho + 1) + ":")
+        else:
+            partes_separador.append(":" + "-" * (ancho + 1))
+
+    lineas = [
+        "|" + "|".join(partes_cabecera) + "|",
+        "|" + "|".join(partes_separador) + "|",
+    ]
+    lineas.extend("| " + " | ".join(fila) + " |" for fila in zip(*celdas))
+    return "\n".join(lineas)
+
+
+# --- Benchmark ---
+
+def tablas_de_ejemplo(filas_intradia: int = 100, dias: int = 30) -> List[Tuple[pd.DataFrame, bool]]:
+    """
+    Construye tablas con la forma de las de un informe por ticker: tres estados
+    financieros, precios diarios, precios intradía y noticias.
+
+    Returns:
+        Lista de (DataFrame, index) en el orden en que aparecen en el informe
+    """
+    rng = np.random.default_rng(0)
+    periodos = pd.to_datetime(["2025-09-30", "2024-09-30", "2023-09-30", "2022-09-30"])
+
+    def estado(filas: int) -> pd.DataFrame:
+        datos = rng.normal(5e10, 3e10, size=(filas, len(periodos))).round(0)
+        datos[rng.random(datos.shape) < 0.1] = np.nan
+        return pd.DataFrame(datos, index=[f"Partida {i}" for i in range(filas)], columns=periodos)
+
+    def precios(indice: pd.DatetimeIndex) -> pd.DataFrame:
+        cierre = 150 + rng.normal(0, 2, len(indice)).cumsum()
+        df = pd.DataFrame({
+            "Open": cierre + rng.normal(0, 1, len(indice)),
+            "High": cierre + 2,
+            "Low": cierre - 2,
+            "Close": cierre,
+            "Volume": rng.integers(1_000_000, 90_000_000, len(indice)),
+        }, index=indice)
+        df.index.name = "Date"
+        return df
+
+    diarios = precios(pd.bdate_range("2025-01-02", periods=dias))
+    intradia = precios(pd.date_range("2025-03-03 09:30", periods=filas_intradia, freq="h", tz="America/New_York"))
+    intradia.index.name = "Datetime"
+    noticias = pd.DataFrame({
+        "providerPublishTime": pd.date_range("2025-03-01", periods=10, freq="7h"),
+        "title": [f"Titular de ejemplo número {i} sobre resultados trimestrales" for i in range(10)],
+        "publisher": ["Reuters", "Bloomberg", "Yahoo Finance", "Barron's", "CNBC"] * 2,
+        "link": [f"https://finance.example.com/noticia/{i}" for i in range(10)],
+    })
+    return [
+        (estado(8), True),
+        (estado(7), True),
+        (estado(6), True),
+        (diarios, True),
+        (diarios, True),
+        (intradia, True),
+        (noticias, False),
+    ]
+
+
+def comparar_con_tabulate(
+    tablas: Sequence[Tuple[pd.DataFrame, bool]],
+    repeticiones: int = 20,
+) -> Dict[str, Any]:
+    """
+    Mide `tabla_markdown` frente a `DataFrame.to_markdown` (tabulate) y comprueba
+    que ambos producen el mismo texto.
+
+    Args:
+        tablas: Lista de (DataFrame, index) a renderizar en cada repetición
+        repeticiones: Veces que se renderiza el conjunto completo
+
+    Returns:
+        Dict con segundos_tabulate, segundos_nativo, aceleracion y diferencias
+        (índices de las tablas cuyo resultado no coincide)
+    """
+    diferencias = [
+        i for i, (df, index) in enumerate(tablas)
+        if tabla_markdown(df, index=index) != df.to_markdown(index=index)
+    ]
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for df, index in tablas:
+            df.to_markdown(index=index)
+    segundos_tabulate = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for df, index in tablas:
+            tabla_markdown(df, index=index)
+    segundos_nativo = time.perf_counter() - inicio
+
+    return {
+        "segundos_tabulate": segundos_tabulate,
+        "segundos_nativo": segundos_nativo,
+        "aceleracion": segundos_tabulate / segundos_nativo if segundos_nativo > 0 else float("inf"),
+        "diferencias": diferencias,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Uso: python markdown_table.py [tickers]
+    # Simula el render de las tablas de un universo de N tickers (por defecto 50)
+    tickers = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    resultado = comparar_con_tabulate(tablas_de_ejemplo(), repeticiones=tickers)
+
+    print(f"\n📊 Render de tablas para {tickers} tickers (7 tablas por informe)")
+    print(f"   tabulate: {resultado['segundos_tabulate']:.3f}s")
+    print(f"   nativo:   {resultado['segundos_nativo']:.3f}s")
+    print(f"   ⚡ Aceleración: {resultado['aceleracion']:.1f}x")
+    if resultado["diferencias"]:
+        print(f"   ❌ Tablas con diferencias: {resultado['diferencias']}")
+    else:
+        print("   ✅ Salida idéntica a DataFrame.to_markdown()")
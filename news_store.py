@@ -0,0 +1,195 @@
+"""
+Módulo de almacenamiento incremental de noticias.
+Guarda cada noticia una sola vez por su id, la comparte entre todos los tickers
+relacionados y solo procesa las noticias posteriores a la última ya vista.
+"""
+
+import datetime
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from config import NEWS_STORE_PATH, NEWS_REFRESCO_MINUTOS
+
+logger = logging.getLogger(__name__)
+
+# Máximo de noticias indexadas por ticker (las que salen del índice se eliminan al guardar)
+MAX_NOTICIAS_POR_TICKER = 50
+
+
+def _normalizar_noticia(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Convierte una noticia de yfinance a un registro plano.
+    Soporta el formato clásico (uuid, providerPublishTime) y el actual (id, content).
+    Si la noticia no trae fecha de publicación, providerPublishTime queda en None.
+    """
+    contenido = item.get("content") if isinstance(item.get("content"), dict) else item
+    noticia_id = item.get("uuid") or item.get("id") or contenido.get("id")
+    if not noticia_id:
+        return None
+
+    publicado = contenido.get("providerPublishTime")
+    if publicado is None and contenido.get("pubDate"):
+        fecha = pd.to_datetime(contenido["pubDate"], errors="coerce", utc=True)
+        publicado = int(fecha.timestamp()) if not pd.isna(fecha) else None
+
+    proveedor = contenido.get("provider") or {}
+    url = contenido.get("canonicalUrl") or contenido.get("clickThroughUrl") or {}
+    return {
+        "id": str(noticia_id),
+        "providerPublishTime": int(publicado) if publicado is not None else None,
+        "title": contenido.get("title"),
+        "publisher": contenido.get("publisher") or proveedor.get("displayName"),
+        "link": contenido.get("link") or url.get("url"),
+        "relatedTickers": list(item.get("relatedTickers") or []),
+    }
+
+
+class NewsStore:
+    """
+    Almacén de noticias en un único archivo JSON:
+    {
+        "noticias": {id: {providerPublishTime, title, publisher, link}},
+        "tickers": {ticker: {"ids": [...], "ultima_publicacion": epoch, "ultima_consulta": iso}}
+    }
+    """
+
+    def __init__(self, ruta: str = NEWS_STORE_PATH):
+        """Inicializa el almacén; el archivo se carga la primera vez que se usa."""
+        self.ruta = ruta
+        self._noticias: Dict[str, Dict[str, Any]] = {}
+        self._tickers: Dict[str, Dict[str, Any]] = {}
+        self._cargado = False
+        self._lock = threading.RLock()
+
+    def _cargar(self) -> None:
+        if self._cargado:
+            return
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+            self._noticias = datos.get("noticias", {})
+            self._tickers = datos.get("tickers", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"No se pudo leer el almacén de noticias {self.ruta}: {e}")
+        self._cargado = True
+
+    def _podar(self) -> None:
+        """Elimina las noticias que ya no están indexadas por ningún ticker."""
+        referenciadas = {nid for estado in self._tickers.values() for nid in estado["ids"]}
+        self._noticias = {nid: n for nid, n in self._noticias.items() if nid in referenciadas}
+
+    def guardar(self) -> None:
+        """Persiste el almacén en disco."""
+        with self._lock:
+            self._podar()
+            datos = {"noticias": self._noticias, "tickers": self._tickers}
+            try:
+                os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+                temporal = f"{self.ruta}.tmp"
+                with open(temporal, "w", encoding="utf-8") as f:
+                    json.dump(datos, f, ensure_ascii=False)
+                os.replace(temporal, self.ruta)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar el almacén de noticias {self.ruta}: {e}")
+
+    def _indexar(self, ticker: str, noticia_id: str) -> None:
+        estado = self._tickers.setdefault(ticker, {"ids": [], "ultima_publicacion": 0, "ultima_consulta": None})
+        if noticia_id not in estado["ids"]:
+            estado["ids"].append(noticia_id)
+            estado["ids"] = sorted(
+                estado["ids"], key=lambda nid: self._noticias[nid]["providerPublishTime"], reverse=True
+            )[:MAX_NOTICIAS_POR_TICKER]
+
+    def actualizar(self, ticker: str, obtener_items: Callable[[], Optional[List[Dict[str, Any]]]]) -> int:
+        """
+        Incorpora las noticias nuevas de un ticker.
+
+        Si el ticker se consultó hace menos de NEWS_REFRESCO_MINUTOS no se hace la
+        petición. De la respuesta solo se procesan las noticias posteriores a la
+        última vista para ese ticker y que no estén ya almacenadas. Las noticias
+        sin fecha de publicación no se filtran por fecha (solo por id) y se
+        fechan con el momento de la consulta.
+
+        Args:
+            ticker: Símbolo normalizado
+            obtener_items: Función que descarga la lista de noticias en bruto
+
+        Returns:
+            int: Número de noticias nuevas almacenadas
+        """
+        with self._lock:
+            self._cargar()
+            estado = self._tickers.get(ticker, {})
+            ultima_consulta = estado.get("ultima_consulta")
+            if ultima_consulta:
+                antiguedad = datetime.datetime.now() - datetime.datetime.fromisoformat(ultima_consulta)
+                if antiguedad < datetime.timedelta(minutes=NEWS_REFRESCO_MINUTOS):
+                    logger.debug(f"Noticias de {ticker} consultadas hace {antiguedad}; se reutiliza el almacén")
+                    return 0
+            ultima_publicacion = estado.get("ultima_publicacion", 0)
+
+        items = obtener_items() or []
+        consultado = int(datetime.datetime.now().timestamp())
+
+        nuevas = 0
+        with self._lock:
+            mas_reciente = ultima_publicacion
+            for item in items:
+                noticia = _normalizar_noticia(item)
+                if noticia is None:
+                    continue
+                if noticia["providerPublishTime"] is None:
+                    # Sin fecha no se puede comparar con la última vista ni mover la marca
+                    noticia["providerPublishTime"] = consultado
+                elif noticia["providerPublishTime"] <= ultima_publicacion:
+                    continue
+                else:
+                    mas_reciente = max(mas_reciente, noticia["providerPublishTime"])
+                relacionados = noticia.pop("relatedTickers")
+                if noticia["id"] not in self._noticias:
+                    self._noticias[noticia["id"]] = noticia
+                    nuevas += 1
+                # La misma noticia queda disponible para todos los tickers que menciona
+                for relacionado in {ticker, *relacionados}:
+                    self._indexar(relacionado, noticia["id"])
+
+            estado = self._tickers.setdefault(ticker, {"ids": [], "ultima_publicacion": 0, "ultima_consulta": None})
+            estado["ultima_consulta"] = datetime.datetime.now().isoformat()
+            estado["ultima_publicacion"] = mas_reciente
+
+        if nuevas:
+            logger.info(f"📰 {nuevas} noticias nuevas para {ticker}")
+        return nuevas
+
+    def noticias(self, ticker: str, limite: int = 10) -> Optional[pd.DataFrame]:
+        """
+        Retorna las noticias más recientes de un ticker.
+
+        Args:
+            ticker: Símbolo normalizado
+            limite: Número máximo de noticias
+
+        Returns:
+            DataFrame con providerPublishTime, title, publisher y link, o None si no hay noticias
+        """
+        with self._lock:
+            self._cargar()
+            ids = self._tickers.get(ticker, {}).get("ids", [])[:limite]
+            filas = [self._noticias[nid] for nid in ids if nid in self._noticias]
+
+        if not filas:
+            return None
+        df = pd.DataFrame(filas, columns=["providerPublishTime", "title", "publisher", "link"])
+        df["providerPublishTime"] = pd.to_datetime(df["providerPublishTime"], unit="s", errors="coerce")
+        return df
+
+
+# Instancia global del almacén de noticias
+news_store = NewsStore()
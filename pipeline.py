@@ -0,0 +1,167 @@
+"""
+Módulo de pipeline por etapas con colas acotadas.
+Cada etapa tiene su propio pool de hilos y se conecta con la siguiente mediante
+una cola de capacidad limitada, de modo que una etapa lenta frena a las
+anteriores (backpressure) y la memoria se mantiene estable.
+"""
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Marca de fin de flujo que se propaga de etapa en etapa
+_FIN = object()
+
+
+@dataclass
+class Etapa:
+    """
+    Etapa del pipeline.
+
+    - `funcion` recibe un elemento y devuelve el elemento para la siguiente etapa
+      (None lo descarta).
+    - `hilos` es el número de workers de la etapa.
+    """
+    nombre: str
+    funcion: Callable[[Any], Any]
+    hilos: int = 1
+
+
+class _EstadoEtapa:
+    def __init__(self, etapa: Etapa):
+        self.etapa = etapa
+        self.procesados = 0
+        self.errores = 0
+        self.segundos_ocupados = 0.0
+        self.inicio: Optional[float] = None
+        self.fin: Optional[float] = None
+        self.workers_activos = etapa.hilos
+        self.lock = threading.Lock()
+
+
+class Pipeline:
+    """
+    Pipeline de etapas conectadas por colas acotadas.
+
+    Uso:
+        pipeline = Pipeline([Etapa("descarga", f1, 2), Etapa("render", f2), Etapa("subida", f3, 4)])
+        resultados = pipeline.ejecutar(elementos)
+        pipeline.estadisticas()
+    """
+
+    def __init__(self, etapas: List[Etapa], capacidad_cola: int = 2):
+        if not etapas:
+            raise ValueError("El pipeline necesita al menos una etapa")
+        self.etapas = etapas
+        self.capacidad_cola = max(1, capacidad_cola)
+        self._estados = [_EstadoEtapa(etapa) for etapa in etapas]
+
+    def _worker(self, indice: int, entrada: "queue.Queue[Any]", salida: "queue.Queue[Any]") -> None:
+        estado = self._estados[indice]
+        etapa = estado.etapa
+        while True:
+            elemento = entrada.get()
+            if elemento is _FIN:
+                # Devolver la marca para los demás workers; el último la pasa a la siguiente etapa
+                entrada.put(_FIN)
+                with estado.lock:
+                    estado.workers_activos -= 1
+                    ultimo = estado.workers_activos == 0
+                    if ultimo:
+                        estado.fin = time.monotonic()
+                if ultimo:
+                    salida.put(_FIN)
+                return
+
+            inicio = time.monotonic()
+            with estado.lock:
+                if estado.inicio is None:
+                    estado.inicio = inicio
+            try:
+                resultado = etapa.funcion(elemento)
+                error = False
+            except Exception as e:
+                logger.error(f"Error en la etapa '{etapa.nombre}': {e}", exc_info=True)
+                resultado = None
+                error = True
+
+            with estado.lock:
+                estado.segundos_ocupados += time.monotonic() - inicio
+                if error:
+                    estado.errores += 1
+                else:
+                    estado.procesados += 1
+
+            if resultado is not None:
+                salida.put(resultado)
+
+    def ejecutar(self, elementos: Iterable[Any]) -> List[Any]:
+        """
+        Procesa los elementos a través de todas las etapas.
+
+        Args:
+            elementos: Entradas de la primera etapa (se consumen de forma perezosa)
+
+        Returns:
+            Lista con las salidas de la última etapa
+        """
+        colas: List["queue.Queue[Any]"] = [
+            queue.Queue(maxsize=self.capacidad_cola) for _ in range(len(self.etapas) + 1)
+        ]
+        # La última cola solo recoge resultados: no se limita para no bloquear a la última etapa
+        colas[-1] = queue.Queue()
+
+        hilos: List[threading.Thread] = []
+        for indice, etapa in enumerate(self.etapas):
+            for n in range(max(1, etapa.hilos)):
+                hilo = threading.Thread(
+                    target=self._worker,
+                    args=(indice, colas[indice], colas[indice + 1]),
+                    name=f"pipeline-{etapa.nombre}-{n}",
+                    daemon=True,
+                )
+                hilo.start()
+                hilos.append(hilo)
+
+        # Alimentar la primera etapa; put() bloquea cuando la cola está llena
+        try:
+            for elemento in elementos:
+                colas[0].put(elemento)
+        finally:
+            colas[0].put(_FIN)
+
+        resultados = []
+        while True:
+            resultado = colas[-1].get()
+            if resultado is _FIN:
+                break
+            resultados.append(resultado)
+
+        for hilo in hilos:
+            hilo.join()
+        return resultados
+
+    def estadisticas(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retorna por etapa: elementos procesados, errores, tiempo activo y throughput.
+
+        Returns:
+            Dict etapa -> {procesados, errores, segundos, segundos_ocupados, por_segundo}
+        """
+        resumen: Dict[str, Dict[str, Any]] = {}
+        for estado in self._estados:
+            with estado.lock:
+                segundos = (estado.fin or time.monotonic()) - estado.inicio if estado.inicio else 0.0
+                resumen[estado.etapa.nombre] = {
+                    "procesados": estado.procesados,
+                    "errores": estado.errores,
+                    "segundos": segundos,
+                    "segundos_ocupados": estado.segundos_ocupados,
+                    "por_segundo": estado.procesados / segundos if segundos > 0 else 0.0,
+                }
+        return resumen
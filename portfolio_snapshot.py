@@ -0,0 +1,245 @@
+"""
+Módulo de snapshot local del grafo clientes → portfolios → assets.
+Guarda en disco las filas de las tablas users, portfolios y assets (JSON por
+líneas comprimido con gzip: una cabecera y después una línea por cliente con
+sus portfolios y assets anidados, sin repetir los nombres de columna) junto
+con la sonda de cambios con la que se tomaron. Mientras la sonda no cambie y
+no venza el TTL, el grafo se reconstruye desde el snapshot sin leer las tablas
+completas de Supabase. Tanto la lectura como la escritura van cliente a
+cliente, así que la memoria no depende del número de clientes.
+
+Las escrituras en portfolios y assets invalidan el snapshot con una marca en
+disco (también entre procesos, p. ej. bulk_import.py): la siguiente carga
+relee Supabase, pero el snapshot anterior se conserva como referencia de ids
+para detectar bajas en `database.get_cambios_desde`.
+"""
+
+import datetime
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import PORTFOLIO_SNAPSHOT_PATH, PORTFOLIO_SNAPSHOT_TTL_MINUTOS
+
+logger = logging.getLogger(__name__)
+
+# Se incrementa si cambia el formato o las columnas guardadas
+VERSION_SNAPSHOT = 2
+
+
+class EscrituraSnapshot:
+    """
+    Escritura incremental de un snapshot: los clientes se añaden a un archivo
+    temporal a medida que se leen y el snapshot solo se publica con `confirmar`
+    (un recorrido interrumpido se descarta y no deja un snapshot incompleto).
+    """
+
+    def __init__(self, snapshot: "SnapshotPortfolios", cabecera: Dict[str, Any]):
+        self._snapshot = snapshot
+        self._cabecera = cabecera
+        self._inicio = time.time()
+        self._temporal = f"{snapshot.ruta}.{threading.get_ident()}.tmp"
+        self._archivo: Any = None
+        self.clientes = 0
+        try:
+            directorio = os.path.dirname(snapshot.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            self._archivo = gzip.open(self._temporal, "wt", encoding="utf-8", compresslevel=6)
+            self._escribir(cabecera)
+        except Exception as e:
+            logger.warning(f"No se pudo crear el snapshot de portfolios: {e}")
+            self.descartar()
+
+    def _escribir(self, valor: Any) -> None:
+        self._archivo.write(json.dumps(valor, ensure_ascii=False, separators=(",", ":"), default=str))
+        self._archivo.write("\n")
+
+    def agregar(self, fila_cliente: List[Any]) -> None:
+        """
+        Añade un cliente: [fila_usuario, [[fila_portfolio, [fila_asset, ...]], ...]]
+        con las filas en el orden de columnas de la cabecera.
+        """
+        if self._archivo is None:
+            return
+        try:
+            self._escribir(fila_cliente)
+            self.clientes += 1
+        except Exception as e:
+            logger.warning(f"No se pudo escribir el snapshot de portfolios: {e}")
+            self.descartar()
+
+    def confirmar(self) -> None:
+        """Publica el snapshot escrito reemplazando al anterior."""
+        if self._archivo is None:
+            return
+        try:
+            self._archivo.close()
+            self._archivo = None
+            self._snapshot._publicar(self._temporal, self._cabecera, self._inicio)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el snapshot de portfolios: {e}")
+            self.descartar()
+            return
+        tamano = os.path.getsize(self._snapshot.ruta) / 1024
+        logger.info(f"💾 Snapshot de portfolios guardado ({self.clientes} clientes, {tamano:.1f} KiB)")
+
+    def descartar(self) -> None:
+        """Abandona la escritura sin tocar el snapshot publicado."""
+        if self._archivo is not None:
+            try:
+                self._archivo.close()
+            except Exception:
+                pass
+            self._archivo = None
+        try:
+            os.remove(self._temporal)
+        except FileNotFoundError:
+            pass
+
+
+class SnapshotPortfolios:
+    """
+    Snapshot en disco del grafo de clientes.
+
+    Formato (una línea JSON por fila del archivo gzip):
+        {"version": 2, "guardado": "2024-01-01T08:00:00", "sonda": {...},
+         "columnas": {"users": [...], "portfolios": [...], "assets": [...]}}
+        [fila_usuario, [[fila_portfolio, [fila_asset, ...]], ...]]
+        ...
+    """
+
+    def __init__(
+        self,
+        ruta: str = PORTFOLIO_SNAPSHOT_PATH,
+        ttl: datetime.timedelta = datetime.timedelta(minutes=PORTFOLIO_SNAPSHOT_TTL_MINUTOS),
+    ):
+        self.ruta = ruta
+        self.ruta_invalidado = f"{ruta}.invalidado"
+        self.ttl = ttl
+        self._cabecera: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _leer_cabecera(self) -> Optional[Dict[str, Any]]:
+        if self._cabecera is not None:
+            return self._cabecera
+        try:
+            with gzip.open(self.ruta, "rt", encoding="utf-8") as f:
+                cabecera = json.loads(f.readline())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Snapshot de portfolios ilegible ({self.ruta}): {e}")
+            return None
+        if not isinstance(cabecera, dict) or cabecera.get("version") != VERSION_SNAPSHOT:
+            return None
+        self._cabecera = cabecera
+        return cabecera
+
+    def ultimo(self) -> Optional[Dict[str, Any]]:
+        """Retorna la cabecera del último snapshot guardado (sin comprobar frescura) o None."""
+        with self._lock:
+            return self._leer_cabecera()
+
+    def cargar(self, sonda: Dict[str, List[Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Retorna la cabecera del snapshot si sigue vigente para la sonda indicada;
+        los clientes se leen después con `iter_clientes`.
+
+        Args:
+            sonda: Resultado actual de la sonda de cambios
+
+        Returns:
+            Dict con "sonda" y "columnas", o None si no existe, cambió la sonda o venció el TTL
+        """
+        with self._lock:
+            cabecera = self._leer_cabecera()
+        if cabecera is None:
+            logger.info("📦 Sin snapshot local de portfolios")
+            return None
+        if os.path.exists(self.ruta_invalidado):
+            logger.info("📦 Snapshot de portfolios invalidado por escrituras en Supabase: se recarga")
+            return None
+
+        edad = datetime.datetime.now() - datetime.datetime.fromisoformat(cabecera["guardado"])
+        if edad > self.ttl:
+            logger.info(f"📦 Snapshot de portfolios vencido ({edad.total_seconds() / 3600:.1f} h)")
+            return None
+        if cabecera["sonda"] != sonda:
+            logger.info("📦 Cambios detectados en Supabase: se recarga el snapshot de portfolios")
+            return None
+
+        logger.info(f"📦 Snapshot de portfolios vigente (guardado hace {edad.total_seconds() / 60:.0f} min)")
+        return cabecera
+
+    def iter_clientes(self) -> Iterator[List[Any]]:
+        """
+        Recorre los clientes del snapshot publicado, leyendo el archivo línea a línea.
+
+        Yields:
+            [fila_usuario, [[fila_portfolio, [fila_asset, ...]], ...]]
+        """
+        with gzip.open(self.ruta, "rt", encoding="utf-8") as f:
+            f.readline()  # cabecera
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea)
+
+    def escritura(self, sonda: Dict[str, List[Any]], columnas: Dict[str, List[str]]) -> EscrituraSnapshot:
+        """
+        Inicia un snapshot nuevo con la sonda tomada antes de la carga.
+
+        Args:
+            sonda: Sonda de cambios tomada antes de la carga
+            columnas: Nombres de columna por tabla
+
+        Returns:
+            EscrituraSnapshot a la que añadir los clientes y confirmar al terminar
+        """
+        cabecera = {
+            "version": VERSION_SNAPSHOT,
+            "guardado": datetime.datetime.now().isoformat(),
+            "sonda": sonda,
+            "columnas": columnas,
+        }
+        return EscrituraSnapshot(self, cabecera)
+
+    def _publicar(self, temporal: str, cabecera: Dict[str, Any], inicio: float) -> None:
+        with self._lock:
+            os.replace(temporal, self.ruta)
+            self._cabecera = cabecera
+            # Una invalidación posterior al inicio de la lectura puede no estar reflejada
+            try:
+                if os.path.getmtime(self.ruta_invalidado) < inicio:
+                    os.remove(self.ruta_invalidado)
+            except FileNotFoundError:
+                pass
+
+    def invalidar(self) -> None:
+        """
+        Marca el snapshot como no vigente tras escribir en portfolios o assets.
+        El archivo se conserva como referencia para detectar bajas.
+        """
+        with self._lock:
+            try:
+                directorio = os.path.dirname(self.ruta_invalidado)
+                if directorio:
+                    os.makedirs(directorio, exist_ok=True)
+                with open(self.ruta_invalidado, "w", encoding="utf-8") as f:
+                    f.write(datetime.datetime.now().isoformat())
+            except OSError as e:
+                # Sin marca, borrar el snapshot es la única forma de no servirlo obsoleto
+                logger.warning(f"No se pudo marcar el snapshot como invalidado ({e}); se elimina")
+                self._cabecera = None
+                try:
+                    os.remove(self.ruta)
+                except FileNotFoundError:
+                    pass
+
+
+# Instancia global del snapshot de portfolios
+portfolio_snapshot = SnapshotPortfolios()
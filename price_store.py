@@ -0,0 +1,207 @@
+"""
+Módulo de almacenamiento local incremental de precios OHLCV.
+Guarda un archivo columnar por ticker e intervalo y solo descarga las barras
+posteriores a la última que ya tiene almacenada.
+"""
+
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # type: ignore[import]  # noqa: F401
+    PARQUET_AVAILABLE = True
+except Exception:  # noqa: BLE001 - sin pyarrow se usa el formato pickle de pandas
+    PARQUET_AVAILABLE = False
+
+from config import PRICE_STORE_DIR, PRICE_STORE_RETENCION_INTRADIA_DIAS
+
+logger = logging.getLogger(__name__)
+
+# Función de descarga: recibe los tickers y la fecha inicial, devuelve un DataFrame por ticker
+Descargador = Callable[[List[str], datetime.date], Dict[str, pd.DataFrame]]
+
+
+class PriceStore:
+    """
+    Almacén local de precios por ticker e intervalo.
+
+    Estructura en disco:
+    {directorio}/
+    ├── 1d/
+    │   ├── _meta.json          # fecha desde la que cada ticker está cubierto
+    │   ├── AAPL.parquet
+    │   └── BTC-USD.parquet
+    └── 1h/
+        └── ...
+    """
+
+    def __init__(self, directorio: str = PRICE_STORE_DIR):
+        """Inicializa el almacén en el directorio indicado (se crea al escribir)."""
+        self.directorio = directorio
+        self.extension = ".parquet" if PARQUET_AVAILABLE else ".pkl"
+        self._lock = threading.RLock()
+
+    def _ruta(self, ticker: str, intervalo: str) -> str:
+        seguro = re.sub(r"[^A-Za-z0-9._-]", "_", ticker)
+        return os.path.join(self.directorio, intervalo, f"{seguro}{self.extension}")
+
+    def _ruta_meta(self, intervalo: str) -> str:
+        return os.path.join(self.directorio, intervalo, "_meta.json")
+
+    def _leer_meta(self, intervalo: str) -> Dict[str, str]:
+        try:
+            with open(self._ruta_meta(intervalo), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Metadatos del almacén de precios ilegibles ({intervalo}): {e}")
+            return {}
+
+    def _escribir_meta(self, intervalo: str, meta: Dict[str, str]) -> None:
+        ruta = self._ruta_meta(intervalo)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=0, sort_keys=True)
+        os.replace(temporal, ruta)
+
+    def leer(self, ticker: str, intervalo: str, desde: Optional[datetime.date] = None) -> Optional[pd.DataFrame]:
+        """
+        Lee las barras almacenadas de un ticker.
+
+        Args:
+            ticker: Símbolo normalizado
+            intervalo: Intervalo de las barras (ej: "1d", "1h")
+            desde: Si se indica, solo devuelve barras a partir de esa fecha
+
+        Returns:
+            DataFrame ordenado por fecha o None si no hay datos
+        """
+        ruta = self._ruta(ticker, intervalo)
+        if not os.path.exists(ruta):
+            return None
+        try:
+            df = pd.read_parquet(ruta) if PARQUET_AVAILABLE else pd.read_pickle(ruta)
+        except Exception as e:
+            logger.warning(f"No se pudo leer {ruta} del almacén de precios: {e}")
+            return None
+
+        if desde is not None and not df.empty:
+            df = df[df.index.date >= desde]
+        return df if not df.empty else None
+
+    def ultima_barra(self, ticker: str, intervalo: str) -> Optional[pd.Timestamp]:
+        """Retorna la fecha de la última barra almacenada o None si no hay datos."""
+        df = self.leer(ticker, intervalo)
+        return df.index.max() if df is not None else None
+
+    def guardar(self, ticker: str, intervalo: str, nuevos: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """
+        Fusiona barras nuevas con las almacenadas y persiste el resultado.
+        Las barras con la misma fecha se sobrescriben con la versión más reciente.
+
+        Args:
+            ticker: Símbolo normalizado
+            intervalo: Intervalo de las barras
+            nuevos: Barras descargadas
+
+        Returns:
+            DataFrame completo almacenado tras la fusión
+        """
+        with self._lock:
+            existente = self.leer(ticker, intervalo)
+            combinado = nuevos if existente is None else pd.concat([existente, nuevos])
+            combinado = combinado[~combinado.index.duplicated(keep="last")].sort_index()
+
+            if intervalo != "1d" and not combinado.empty:
+                limite = combinado.index.max() - pd.Timedelta(days=PRICE_STORE_RETENCION_INTRADIA_DIAS)
+                combinado = combinado[combinado.index >= limite]
+
+            ruta = self._ruta(ticker, intervalo)
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            temporal = f"{ruta}.tmp"
+            if PARQUET_AVAILABLE:
+                combinado.to_parquet(temporal)
+            else:
+                combinado.to_pickle(temporal)
+            os.replace(temporal, ruta)
+            return combinado
+
+    def actualizar(
+        self,
+        tickers: Iterable[str],
+        intervalo: str,
+        descargar: Descargador,
+        desde: datetime.date,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Completa el almacén descargando solo las barras que faltan y devuelve los datos.
+
+        Para cada ticker se pide desde el día de su última barra (que se vuelve a
+        descargar por si estaba incompleta) o desde `desde` si no hay histórico que
+        cubra esa fecha. Los tickers con la misma fecha inicial se descargan juntos.
+
+        Args:
+            tickers: Símbolos normalizados
+            intervalo: Intervalo de las barras
+            descargar: Función que descarga un lote de tickers desde una fecha
+            desde: Primera fecha que debe cubrir el almacén
+
+        Returns:
+            Dict ticker -> barras almacenadas a partir de `desde`
+        """
+        unicos = list(dict.fromkeys(tickers))
+        with self._lock:
+            meta = self._leer_meta(intervalo)
+
+        grupos: Dict[datetime.date, List[str]] = {}
+        for ticker in unicos:
+            cubierto_desde = meta.get(ticker)
+            ultima = self.ultima_barra(ticker, intervalo)
+            if ultima is None or cubierto_desde is None or datetime.date.fromisoformat(cubierto_desde) > desde:
+                inicio = desde
+            else:
+                inicio = ultima.date()
+            grupos.setdefault(inicio, []).append(ticker)
+
+        # Solo los tickers que esta llamada ha cubierto desde `desde`
+        cubiertos: List[str] = []
+        for inicio, grupo in sorted(grupos.items()):
+            logger.info(f"📥 Almacén {intervalo}: descargando {len(grupo)} tickers desde {inicio}")
+            descargados = descargar(grupo, inicio)
+            for ticker, df in descargados.items():
+                if df is None or df.empty:
+                    continue
+                self.guardar(ticker, intervalo, df)
+                if inicio == desde:
+                    cubiertos.append(ticker)
+
+        # Lectura-modificación-escritura de los metadatos en una sola sección
+        # crítica: otras llamadas pueden haberlos actualizado durante la descarga
+        if cubiertos:
+            with self._lock:
+                meta = self._leer_meta(intervalo)
+                for ticker in cubiertos:
+                    previo = meta.get(ticker)
+                    if previo is None or desde < datetime.date.fromisoformat(previo):
+                        meta[ticker] = desde.isoformat()
+                self._escribir_meta(intervalo, meta)
+
+        resultado: Dict[str, pd.DataFrame] = {}
+        for ticker in unicos:
+            df = self.leer(ticker, intervalo, desde=desde)
+            if df is not None:
+                resultado[ticker] = df
+        return resultado
+
+
+# Instancia global del almacén de precios
+price_store = PriceStore()
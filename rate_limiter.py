@@ -0,0 +1,204 @@
+"""
+Módulo de control de tasa de peticiones por proveedor.
+Implementa un token bucket adaptativo: reduce la tasa a la mitad y espera cuando
+el proveedor responde con 429 u otro error de cuota, y la recupera gradualmente
+a medida que las peticiones vuelven a tener éxito.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from config import RATE_LIMITS, RATE_LIMIT_REINTENTOS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Fragmentos que identifican errores de límite de tasa o cuota en los distintos SDKs
+MARCADORES_LIMITE = (
+    "429",
+    "too many requests",
+    "rate limit",
+    "ratelimit",
+    "resource_exhausted",
+    "resource exhausted",
+    "ratelimitexceeded",
+    "userratelimitexceeded",
+)
+
+
+def _codigo_http(err: Exception) -> Optional[int]:
+    """Extrae el código HTTP de las excepciones de requests, httpx, postgrest y googleapiclient."""
+    for candidato in (
+        getattr(err, "status_code", None),
+        getattr(err, "code", None),
+        getattr(getattr(err, "resp", None), "status", None),
+        getattr(getattr(err, "response", None), "status_code", None),
+    ):
+        try:
+            if candidato is not None:
+                return int(candidato)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def es_error_limite(err: Exception) -> bool:
+    """Indica si la excepción corresponde a un límite de tasa o cuota del proveedor."""
+    if _codigo_http(err) == 429:
+        return True
+    texto = f"{type(err).__name__} {err}".lower()
+    return any(marcador in texto for marcador in MARCADORES_LIMITE)
+
+
+def _retry_after(err: Exception) -> Optional[float]:
+    """Retorna los segundos indicados en la cabecera Retry-After, si existe."""
+    response = getattr(err, "response", None) or getattr(err, "resp", None)
+    headers = getattr(response, "headers", None) or (response if isinstance(response, dict) else None)
+    if not headers:
+        return None
+    try:
+        valor = headers.get("Retry-After") or headers.get("retry-after")
+        return float(valor) if valor is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Token bucket adaptativo para un proveedor.
+
+    - `tasa_maxima` peticiones por segundo en régimen normal, con ráfagas de hasta `capacidad`.
+    - Ante un error de límite: la tasa se divide a la mitad (sin bajar de `tasa_minima`)
+      y se pausa el proveedor con backoff exponencial (o lo que indique Retry-After).
+    - Cada éxito recupera un 10% de la tasa máxima hasta volver al valor configurado.
+    - Una `tasa_maxima` de 0 (o negativa) desactiva el límite: solo se aplican
+      las pausas tras un error de límite.
+    """
+
+    def __init__(
+        self,
+        nombre: str,
+        tasa_maxima: float,
+        capacidad: Optional[float] = None,
+        tasa_minima: Optional[float] = None,
+        backoff_inicial: float = 2.0,
+        backoff_maximo: float = 120.0,
+    ):
+        self.nombre = nombre
+        self.ilimitado = tasa_maxima <= 0
+        self.tasa_maxima = tasa_maxima
+        self.capacidad = capacidad if capacidad is not None else max(1.0, tasa_maxima)
+        self.tasa_minima = tasa_minima if tasa_minima is not None else tasa_maxima / 16
+        self.backoff_inicial = backoff_inicial
+        self.backoff_maximo = backoff_maximo
+
+        self._tasa = tasa_maxima
+        self._tokens = self.capacidad
+        self._ultima_reposicion = time.monotonic()
+        self._pausa_hasta = 0.0
+        self._limites_consecutivos = 0
+        self._lock = threading.Lock()
+
+    @property
+    def tasa_actual(self) -> float:
+        """Tasa vigente en peticiones por segundo."""
+        return self._tasa
+
+    def _reponer(self, ahora: float) -> None:
+        transcurrido = ahora - self._ultima_reposicion
+        self._tokens = min(self.capacidad, self._tokens + transcurrido * self._tasa)
+        self._ultima_reposicion = ahora
+
+    def adquirir(self) -> None:
+        """Bloquea hasta que haya un token disponible para hacer una petición."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._reponer(ahora)
+                espera = self._pausa_hasta - ahora
+                if espera <= 0:
+                    if self.ilimitado:
+                        return
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    espera = (1 - self._tokens) / self._tasa
+            time.sleep(espera)
+
+    def reportar_exito(self) -> None:
+        """Recupera gradualmente la tasa tras una petición correcta."""
+        with self._lock:
+            self._limites_consecutivos = 0
+            if self._tasa < self.tasa_maxima:
+                self._tasa = min(self.tasa_maxima, self._tasa + self.tasa_maxima * 0.1)
+
+    def reportar_limite(self, espera: Optional[float] = None) -> float:
+        """
+        Registra un error de límite: reduce la tasa y pausa el proveedor.
+
+        Args:
+            espera: Segundos de pausa indicados por el proveedor (Retry-After)
+
+        Returns:
+            float: Segundos de pausa aplicados
+        """
+        with self._lock:
+            self._limites_consecutivos += 1
+            if espera is None:
+                espera = min(
+                    self.backoff_maximo,
+                    self.backoff_inicial * 2 ** (self._limites_consecutivos - 1),
+                )
+            ahora = time.monotonic()
+            if not self.ilimitado:
+                self._reponer(ahora)
+                self._tasa = max(self.tasa_minima, self._tasa / 2)
+                self._tokens = 0
+            self._pausa_hasta = max(self._pausa_hasta, ahora + espera)
+        tasa = "sin límite" if self.ilimitado else f"{self._tasa:.3f} req/s"
+        logger.warning(f"⏳ Límite de tasa en {self.nombre}: pausa de {espera:.1f}s, nueva tasa {tasa}")
+        return espera
+
+    def ejecutar(self, funcion: Callable[..., T], *args: Any, reintentos: int = RATE_LIMIT_REINTENTOS, **kwargs: Any) -> T:
+        """
+        Ejecuta una petición respetando el límite y reintentando ante errores de cuota.
+        Cualquier otro error se propaga sin reintentar.
+
+        Args:
+            funcion: Función que realiza la petición
+            reintentos: Reintentos máximos tras un error de límite
+
+        Returns:
+            El resultado de la función
+        """
+        intento = 0
+        while True:
+            self.adquirir()
+            try:
+                resultado = funcion(*args, **kwargs)
+            except Exception as err:
+                if not es_error_limite(err) or intento >= reintentos:
+                    raise
+                intento += 1
+                self.reportar_limite(_retry_after(err))
+                continue
+            self.reportar_exito()
+            return resultado
+
+
+_limitadores: Dict[str, RateLimiter] = {}
+_limitadores_lock = threading.Lock()
+
+
+def get_rate_limiter(proveedor: str) -> RateLimiter:
+    """
+    Retorna el limitador compartido del proveedor (yfinance, pandas_datareader,
+    supabase, youtube, gemini), creándolo con la tasa configurada en RATE_LIMITS.
+    """
+    with _limitadores_lock:
+        if proveedor not in _limitadores:
+            _limitadores[proveedor] = RateLimiter(proveedor, RATE_LIMITS.get(proveedor, 1.0))
+        return _limitadores[proveedor]
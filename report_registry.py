@@ -0,0 +1,113 @@
+"""
+Módulo de registro de informes generados.
+Guarda, por cliente, la marca de datos de mercado (última barra diaria) de cada
+ticker y la huella de sus posiciones con las que se generaron sus informes, y
+el watermark de cambios de portfolios de la última ejecución, para regenerar
+solo los informes de los clientes cuyas posiciones o datos de mercado cambiaron.
+
+Las marcas y la huella solo se registran cuando los informes del cliente se
+generaron y subieron sin errores, así que un cliente que falla se vuelve a
+considerar cambiado en la siguiente ejecución aunque el watermark avance.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from config import INFORMES_REGISTRO_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class RegistroInformes:
+    """
+    Registro en un único archivo JSON:
+    {
+        "watermark": "2024-01-01T08:00:00+00:00",
+        "clientes": {user_id: {ticker: marca_datos}},
+        "posiciones": {user_id: huella_posiciones}
+    }
+    """
+
+    def __init__(self, ruta: str = INFORMES_REGISTRO_PATH):
+        """Inicializa el registro; el archivo se carga la primera vez que se usa."""
+        self.ruta = ruta
+        self._watermark: Optional[str] = None
+        self._clientes: Dict[str, Dict[str, Optional[str]]] = {}
+        self._posiciones: Dict[str, str] = {}
+        self._cargado = False
+        self._lock = threading.RLock()
+
+    def _cargar(self) -> None:
+        if self._cargado:
+            return
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+            self._watermark = datos.get("watermark")
+            self._clientes = datos.get("clientes", {})
+            self._posiciones = datos.get("posiciones", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"No se pudo leer el registro de informes {self.ruta}: {e}")
+        self._cargado = True
+
+    @property
+    def watermark(self) -> Optional[str]:
+        """Watermark de cambios de portfolios de la última ejecución."""
+        with self._lock:
+            self._cargar()
+            return self._watermark
+
+    def actualizar_watermark(self, watermark: Optional[str]) -> None:
+        """Registra el watermark hasta el que se han procesado los cambios."""
+        with self._lock:
+            self._cargar()
+            if watermark:
+                self._watermark = watermark
+
+    def marcas(self, user_id: str) -> Optional[Dict[str, Optional[str]]]:
+        """Retorna las marcas de datos con las que se generaron los informes del cliente."""
+        with self._lock:
+            self._cargar()
+            marcas = self._clientes.get(user_id)
+            return dict(marcas) if marcas is not None else None
+
+    def posiciones(self, user_id: str) -> Optional[str]:
+        """Retorna la huella de las posiciones con las que se generaron los informes del cliente."""
+        with self._lock:
+            self._cargar()
+            return self._posiciones.get(user_id)
+
+    def registrar(self, user_id: str, marcas: Dict[str, Optional[str]], posiciones: Optional[str] = None) -> None:
+        """Registra que los informes del cliente se generaron con estas marcas de datos y posiciones."""
+        with self._lock:
+            self._cargar()
+            self._clientes[user_id] = dict(marcas)
+            if posiciones is not None:
+                self._posiciones[user_id] = posiciones
+
+    def guardar(self) -> None:
+        """Persiste el registro en disco."""
+        with self._lock:
+            self._cargar()
+            datos: Dict[str, Any] = {
+                "watermark": self._watermark,
+                "clientes": self._clientes,
+                "posiciones": self._posiciones,
+            }
+            try:
+                os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+                temporal = f"{self.ruta}.tmp"
+                with open(temporal, "w", encoding="utf-8") as f:
+                    json.dump(datos, f, ensure_ascii=False)
+                os.replace(temporal, self.ruta)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar el registro de informes {self.ruta}: {e}")
+
+
+# Instancia global del registro de informes
+registro_informes = RegistroInformes()
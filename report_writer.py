@@ -0,0 +1,82 @@
+"""
+Módulo de escritura de informes por secciones.
+Los informes se emiten directamente sobre un destino (buffer en memoria o
+archivo local que luego se sube a Storage en streaming) en lugar de construirse
+concatenando cadenas, de modo que la memoria no crece con el tamaño del informe.
+"""
+
+import io
+import logging
+import shutil
+from typing import Optional, TextIO
+
+import pandas as pd
+
+from markdown_table import tabla_markdown
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de bloque al copiar un informe dentro de otro (p. ej. en el consolidado)
+TAMANO_BLOQUE = 64 * 1024
+
+
+class EscritorInforme:
+    """
+    Escritor de informes Markdown sobre un destino de texto.
+
+    Uso:
+        with escritor_archivo(ruta) as escritor:
+            escritor.escribir("# Análisis Financiero de AAPL\\n\\n")
+            escritor.tabla(df)
+    """
+
+    def __init__(self, destino: TextIO, ruta: Optional[str] = None):
+        """
+        Args:
+            destino: Objeto de texto con `write()` (StringIO, archivo abierto...)
+            ruta: Ruta local del destino si es un archivo en disco
+        """
+        self.destino = destino
+        self.ruta = ruta
+
+    def escribir(self, texto: str) -> None:
+        """Escribe un fragmento de texto tal cual."""
+        self.destino.write(texto)
+
+    def tabla(self, df: pd.DataFrame, index: bool = True) -> None:
+        """Escribe un DataFrame como tabla Markdown seguida de una línea en blanco."""
+        self.destino.write(tabla_markdown(df, index=index))
+        self.destino.write("\n\n")
+
+    def copiar_archivo(self, ruta_origen: str) -> None:
+        """Copia el contenido de otro informe en disco por bloques, sin cargarlo entero."""
+        with open(ruta_origen, "r", encoding="utf-8", newline="") as origen:
+            shutil.copyfileobj(origen, self.destino, TAMANO_BLOQUE)
+
+    def contenido(self) -> str:
+        """Retorna el texto escrito (solo para destinos en memoria)."""
+        if isinstance(self.destino, io.StringIO):
+            return self.destino.getvalue()
+        raise TypeError("contenido() solo está disponible para escritores en memoria")
+
+    def cerrar(self) -> None:
+        """Cierra el destino si es un archivo; los buffers en memoria se conservan."""
+        if self.ruta is not None and not self.destino.closed:
+            self.destino.close()
+
+    def __enter__(self) -> "EscritorInforme":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+
+def escritor_memoria() -> EscritorInforme:
+    """Crea un escritor sobre un buffer en memoria."""
+    return EscritorInforme(io.StringIO())
+
+
+def escritor_archivo(ruta: str) -> EscritorInforme:
+    """Crea un escritor sobre un archivo local (se sobrescribe si existe)."""
+    return EscritorInforme(open(ruta, "w", encoding="utf-8", newline=""), ruta=ruta)
+
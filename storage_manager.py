@@ -3,20 +3,105 @@ Módulo de gestión de almacenamiento en Supabase Storage.
 Maneja la subida, descarga y gestión de archivos por cliente.
 """
 
-import os
-import tempfile
-from typing import Optional, List
-from supabase import create_client, Client
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from io import BufferedReader, FileIO
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Set, Tuple, Union
+from supabase import Client
 from config import (
-    SUPABASE_URL, 
-    SUPABASE_ANON_KEY, 
-    SUPABASE_SERVICE_ROLE, 
-    SUPABASE_BUCKET_NAME
+    SUPABASE_BUCKET_NAME,
+    STORAGE_CONTENIDO_COMPARTIDO,
+    STORAGE_FORZAR_SUBIDAS,
+    STORAGE_LOTE_HILOS,
+    STORAGE_LOTE_REINTENTOS,
 )
+from rate_limiter import get_rate_limiter
+from storage_manifest import NOMBRE_MANIFEST, ManifestCliente, huella_contenido, ruta_blob
+from supabase_pool import get_supabase_client
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Espera antes del primer reintento de una subida del lote (se duplica en cada intento)
+ESPERA_REINTENTO_SEGUNDOS = 0.5
+
+
+@dataclass
+class ElementoSubida:
+    """
+    Archivo a subir con `subir_lote`: texto o bytes en memoria (`contenido`) o
+    un archivo en disco (`ruta_local`). Sin `content_type`, el texto y los
+    archivos en disco se suben como markdown y los bytes como binario.
+    """
+    cliente_id: str
+    nombre_archivo: str
+    contenido: Union[str, bytes, None] = None
+    ruta_local: Optional[str] = None
+    content_type: Optional[str] = None
+
+    def carga(self) -> Tuple[Union[str, bytes], str]:
+        """Retorna lo que se envía a Storage (ruta o bytes) y su tipo MIME."""
+        if self.ruta_local is not None:
+            return self.ruta_local, self.content_type or "text/markdown; charset=utf-8"
+        if isinstance(self.contenido, str):
+            return self.contenido.encode("utf-8"), self.content_type or "text/markdown; charset=utf-8"
+        if isinstance(self.contenido, (bytes, bytearray, memoryview)):
+            return bytes(self.contenido), self.content_type or "application/octet-stream"
+        raise ValueError(f"Elemento sin contenido ni ruta local: {self.cliente_id}/{self.nombre_archivo}")
+
+
+@dataclass
+class ResultadoSubida:
+    """Resultado de un elemento de `subir_lote`."""
+    cliente_id: str
+    nombre_archivo: str
+    estado: str  # "creado", "actualizado", "reutilizado" (blob ya existente), "omitido" o "fallido"
+    intentos: int
+    tamano: int = 0
+    error: Optional[str] = None
+
+    @property
+    def exito(self) -> bool:
+        return self.estado != "fallido"
+
+
+@dataclass
+class ResultadoLoteSubida:
+    """Resultados por elemento (en el orden de entrada) y rendimiento agregado de un lote."""
+    resultados: List[ResultadoSubida] = field(default_factory=list)
+    segundos: float = 0.0
+
+    @property
+    def exitosos(self) -> int:
+        return sum(1 for r in self.resultados if r.exito)
+
+    @property
+    def omitidos(self) -> int:
+        return sum(1 for r in self.resultados if r.estado == "omitido")
+
+    @property
+    def reutilizados(self) -> int:
+        return sum(1 for r in self.resultados if r.estado == "reutilizado")
+
+    @property
+    def fallidos(self) -> List[ResultadoSubida]:
+        return [r for r in self.resultados if not r.exito]
+
+    @property
+    def bytes_subidos(self) -> int:
+        return sum(r.tamano for r in self.resultados if r.estado in ("creado", "actualizado"))
+
+    @property
+    def archivos_por_segundo(self) -> float:
+        return len(self.resultados) / self.segundos if self.segundos else 0.0
+
+    @property
+    def bytes_por_segundo(self) -> float:
+        return self.bytes_subidos / self.segundos if self.segundos else 0.0
+
 
 class StorageManager:
     """
@@ -25,25 +110,63 @@ class StorageManager:
     Estructura de carpetas:
     portfolio-files/
     ├── {cliente_id_1}/
+    │   ├── manifest.json
     │   ├── AAPL_analisis_financiero.md
     │   ├── MSFT_analisis_financiero.md
     │   └── informe_consolidado.md
     ├── {cliente_id_2}/
     │   └── ...
     └── shared/
+        ├── blobs/
+        │   └── {sha256}
         └── templates/
+
+    El `manifest.json` de cada carpeta (ver `storage_manifest`) se carga una
+    vez por cliente y ejecución y se mantiene en memoria; se escribe con
+    `guardar_manifest` / `guardar_manifests` al terminar las subidas.
+    Las subidas cuyo hash SHA-256 coincide con el del manifiesto se omiten
+    salvo que se fuercen (`forzar=True` o `forzar_subidas`).
+
+    Con `contenido_compartido` cada contenido distinto se sube una única vez a
+    `shared/blobs/{sha256}` y la carpeta del cliente solo guarda la entrada del
+    manifiesto que apunta al blob; `resolver_ruta` devuelve la ruta real de un
+    archivo para leerlo. Los blobs que dejan de estar referenciados no se borran.
     """
 
-    def __init__(self):
-        """Inicializa el gestor de almacenamiento."""
+    def __init__(
+        self,
+        forzar_subidas: bool = STORAGE_FORZAR_SUBIDAS,
+        contenido_compartido: bool = STORAGE_CONTENIDO_COMPARTIDO,
+    ):
+        """
+        Inicializa el gestor de almacenamiento.
+        
+        Args:
+            forzar_subidas: Si True, se suben también los archivos sin cambios
+            contenido_compartido: Si True, el contenido se guarda en blobs compartidos por hash
+        """
         self._client: Optional[Client] = None
+        self._limitador = get_rate_limiter("supabase")
+        self._manifests: Dict[str, ManifestCliente] = {}
+        self._lock_manifests = threading.Lock()
+        self.forzar_subidas = forzar_subidas
+        self.contenido_compartido = contenido_compartido
+        self._blobs_conocidos: Set[str] = set()
+        self._estadisticas: Dict[str, int] = dict.fromkeys(
+            (
+                "subidos", "omitidos", "fallidos", "bytes_subidos", "bytes_omitidos",
+                "blobs_reutilizados", "bytes_reutilizados",
+            ),
+            0,
+        )
+        self._lock_estadisticas = threading.Lock()
+        self._pool_subidas: Optional[ThreadPoolExecutor] = None
 
     @property
     def client(self) -> Client:
-        """Lazy initialization del cliente Supabase."""
+        """Cliente Supabase compartido del proceso (pool HTTP con keep-alive)."""
         if self._client is None:
-            key = SUPABASE_SERVICE_ROLE or SUPABASE_ANON_KEY
-            self._client = create_client(SUPABASE_URL, key)
+            self._client = get_supabase_client()
         return self._client
 
     def _get_ruta_cliente(self, cliente_id: str, nombre_archivo: str) -> str:
@@ -59,9 +182,165 @@ class StorageManager:
         """
         return f"{cliente_id}/{nombre_archivo}"
 
+    def _cargar_manifest(self, cliente_id: str) -> ManifestCliente:
+        """
+        Descarga el manifiesto del cliente. Si la carpeta aún no tiene (o no se
+        puede leer), lo reconstruye con un único listado de la carpeta.
+        """
+        bucket = self.client.storage.from_(SUPABASE_BUCKET_NAME)
+        try:
+            contenido = self._limitador.ejecutar(
+                bucket.download, self._get_ruta_cliente(cliente_id, NOMBRE_MANIFEST)
+            )
+            return ManifestCliente.desde_json(cliente_id, contenido)
+        except Exception as e:
+            logger.debug(f"Sin manifiesto legible para cliente {cliente_id} ({e}): se lista la carpeta")
+
+        items = self._limitador.ejecutar(bucket.list, path=cliente_id)
+        manifest = ManifestCliente.desde_listado(cliente_id, items)
+        logger.info(f"📒 Manifiesto de {cliente_id} reconstruido desde el listado ({len(manifest.archivos)} archivos)")
+        return manifest
+
+    def _get_manifest(self, cliente_id: str) -> ManifestCliente:
+        """Retorna el manifiesto del cliente, cargándolo la primera vez en la ejecución."""
+        manifest = self._manifests.get(cliente_id)
+        if manifest is not None:
+            return manifest
+        manifest = self._cargar_manifest(cliente_id)
+        with self._lock_manifests:
+            # Otro hilo pudo cargarlo mientras tanto; se conserva el primero
+            return self._manifests.setdefault(cliente_id, manifest)
+
+    def get_manifest(self, cliente_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Retorna los archivos de la carpeta del cliente según su manifiesto.
+        
+        Args:
+            cliente_id: ID del cliente
+            
+        Returns:
+            Dict: nombre → {size, sha256, content_type, updated_at}
+        """
+        try:
+            manifest = self._get_manifest(cliente_id)
+            return {nombre: manifest.entrada(nombre) for nombre in list(manifest.archivos)}
+        except Exception as e:
+            logger.error(f"Error al obtener el manifiesto del cliente {cliente_id}: {e}")
+            return {}
+
+    def guardar_manifest(self, cliente_id: str) -> bool:
+        """
+        Escribe en Storage el manifiesto del cliente si tiene cambios pendientes.
+        
+        Args:
+            cliente_id: ID del cliente
+            
+        Returns:
+            bool: True si está guardado (o no había cambios)
+        """
+        manifest = self._manifests.get(cliente_id)
+        if manifest is None or not manifest.pendiente:
+            return True
+        contenido = manifest.a_json()
+        try:
+            self._limitador.ejecutar(
+                self.client.storage.from_(SUPABASE_BUCKET_NAME).upload,
+                path=self._get_ruta_cliente(cliente_id, NOMBRE_MANIFEST),
+                file=contenido,
+                file_options={
+                    "cacheControl": "no-cache",
+                    "upsert": "true",
+                    "contentType": "application/json; charset=utf-8",
+                },
+            )
+            logger.info(f"📒 Manifiesto guardado: {cliente_id}/{NOMBRE_MANIFEST} ({len(manifest.archivos)} archivos)")
+            return True
+        except Exception as e:
+            manifest.pendiente = True
+            logger.error(f"Error al guardar el manifiesto del cliente {cliente_id}: {e}")
+            return False
+
+    def guardar_manifests(self) -> int:
+        """
+        Escribe todos los manifiestos con cambios pendientes.
+        
+        Returns:
+            int: Número de manifiestos que no se pudieron guardar
+        """
+        return sum(1 for cliente_id in list(self._manifests) if not self.guardar_manifest(cliente_id))
+
+    def _contar(self, **incrementos: int) -> None:
+        with self._lock_estadisticas:
+            for clave, valor in incrementos.items():
+                self._estadisticas[clave] += valor
+
+    def estadisticas(self) -> Dict[str, int]:
+        """
+        Retorna los contadores de subidas de la ejecución.
+        
+        Returns:
+            Dict con subidos, omitidos (sin cambios), fallidos, bytes_subidos,
+            bytes_omitidos, blobs_reutilizados y bytes_reutilizados (archivos que
+            apuntan a un blob compartido ya existente: no se suben ni cuentan
+            como subidos)
+        """
+        with self._lock_estadisticas:
+            return dict(self._estadisticas)
+
+    def reiniciar_estadisticas(self) -> None:
+        """Pone a cero los contadores de subidas."""
+        with self._lock_estadisticas:
+            for clave in self._estadisticas:
+                self._estadisticas[clave] = 0
+
+    def resolver_ruta(self, cliente_id: str, nombre_archivo: str) -> str:
+        """
+        Retorna la ruta del bucket donde está el contenido del archivo: el blob
+        compartido si la entrada del manifiesto apunta a uno o, si no, la ruta
+        en la carpeta del cliente.
+        
+        Args:
+            cliente_id: ID del cliente
+            nombre_archivo: Nombre del archivo
+            
+        Returns:
+            str: Ruta en el bucket (ej: "shared/blobs/ab12…" o "cliente_123/informe.md")
+        """
+        try:
+            entrada = self._get_manifest(cliente_id).entrada(nombre_archivo)
+        except Exception as e:
+            logger.warning(f"No se pudo leer el manifiesto del cliente {cliente_id}: {e}")
+            entrada = None
+        if entrada and entrada.get("blob"):
+            return entrada["blob"]
+        return self._get_ruta_cliente(cliente_id, nombre_archivo)
+
+    def _subir_blob(self, sha256: str, content_type: str, subir_objeto: Any) -> bool:
+        """
+        Sube el blob del contenido si aún no existe.
+        
+        Returns:
+            bool: True si se subió, False si ya existía
+        """
+        ruta = ruta_blob(sha256)
+        if sha256 in self._blobs_conocidos:
+            return False
+        try:
+            # Sin upsert: el blob de un hash es inmutable y un conflicto indica que ya existe
+            subir_objeto(ruta, {"cacheControl": "31536000", "upsert": "false", "contentType": content_type})
+            subido = True
+        except Exception as e:
+            if not _es_conflicto(e):
+                raise
+            subido = False
+        with self._lock_manifests:
+            self._blobs_conocidos.add(sha256)
+        return subido
+
     def existe_archivo(self, cliente_id: str, nombre_archivo: str) -> bool:
         """
         Verifica si un archivo existe en el storage del cliente.
+        Se resuelve con el manifiesto en memoria, sin listar la carpeta.
         
         Args:
             cliente_id: ID del cliente
@@ -71,82 +350,295 @@ class StorageManager:
             bool: True si el archivo existe
         """
         try:
-            items = self.client.storage.from_(SUPABASE_BUCKET_NAME).list(path=cliente_id)
-            if not items:
-                return False
-            return any(
-                getattr(it, "name", None) == nombre_archivo or 
-                (isinstance(it, dict) and it.get("name") == nombre_archivo) 
-                for it in items
-            )
+            return self._get_manifest(cliente_id).existe(nombre_archivo)
         except Exception as e:
             logger.error(f"Error al verificar existencia de archivo {nombre_archivo} para cliente {cliente_id}: {e}")
             return False
 
+    def _subir_contenido(
+        self,
+        archivo: Union[str, bytes, BufferedReader, FileIO],
+        nombre_archivo: str,
+        cliente_id: str,
+        content_type: str,
+        forzar: bool = False,
+    ) -> Tuple[str, int]:
+        """
+        Sube al storage del cliente una ruta local (se envía en streaming desde
+        disco), bytes o un archivo binario abierto. Si el manifiesto ya tiene el
+        archivo con el mismo hash y tipo de contenido, no se vuelve a subir.
+
+        Returns:
+            (estado, bytes): estado "creado", "actualizado", "reutilizado" u
+            "omitido" y bytes del contenido; lanza la excepción si la subida falla
+        """
+        ruta_remota = self._get_ruta_cliente(cliente_id, nombre_archivo)
+
+        # Verificar si ya existe
+        try:
+            manifest = self._get_manifest(cliente_id)
+        except Exception as e:
+            # Sin manifiesto se sube igualmente; el registro no se conserva
+            logger.warning(f"No se pudo cargar el manifiesto del cliente {cliente_id}: {e}")
+            manifest = ManifestCliente(cliente_id)
+        entrada = manifest.entrada(nombre_archivo)
+        tamano, sha256 = huella_contenido(archivo)
+
+        if (
+            entrada is not None
+            and not (forzar or self.forzar_subidas)
+            and entrada.get("sha256") == sha256
+            and entrada.get("content_type") == content_type
+        ):
+            self._contar(omitidos=1, bytes_omitidos=tamano)
+            logger.info(f"⏭️  Archivo sin cambios, se omite la subida: {ruta_remota}")
+            return "omitido", tamano
+
+        # Un archivo abierto se rebobina antes de cada intento por si el
+        # limitador reintenta la subida tras un error de cuota
+        posicion = archivo.tell() if isinstance(archivo, (BufferedReader, FileIO)) else None
+
+        def subir_objeto(ruta: str, opciones: Dict[str, str]) -> Any:
+            def subir() -> Any:
+                if posicion is not None:
+                    archivo.seek(posicion)
+                return self.client.storage.from_(SUPABASE_BUCKET_NAME).upload(
+                    path=ruta, file=archivo, file_options=opciones
+                )
+            return self._limitador.ejecutar(subir)
+
+        if self.contenido_compartido:
+            blob = ruta_blob(sha256)
+            subido = self._subir_blob(sha256, content_type, subir_objeto)
+            if entrada is not None and not entrada.get("blob"):
+                # La copia directa anterior quedaría obsoleta frente al blob
+                try:
+                    self._limitador.ejecutar(
+                        self.client.storage.from_(SUPABASE_BUCKET_NAME).remove, [ruta_remota]
+                    )
+                except Exception as e:
+                    logger.warning(f"No se pudo eliminar la copia anterior de {ruta_remota}: {e}")
+            manifest.registrar(nombre_archivo, tamano, sha256, content_type, blob=blob)
+            ruta_remota = f"{ruta_remota} → {blob}"
+            if not subido:
+                self._contar(blobs_reutilizados=1, bytes_reutilizados=tamano)
+                logger.info(f"♻️  Blob compartido reutilizado: bucket='{SUPABASE_BUCKET_NAME}', path='{ruta_remota}'")
+                return "reutilizado", tamano
+            self._contar(subidos=1, bytes_subidos=tamano)
+        else:
+            subir_objeto(ruta_remota, {"cacheControl": "3600", "upsert": "true", "contentType": content_type})
+            manifest.registrar(nombre_archivo, tamano, sha256, content_type)
+            self._contar(subidos=1, bytes_subidos=tamano)
+
+        accion = "actualizado" if entrada is not None else "creado"
+        logger.info(f"✅ Archivo {accion}: bucket='{SUPABASE_BUCKET_NAME}', path='{ruta_remota}'")
+        return accion, tamano
+
+    def _subir(
+        self,
+        archivo: Union[str, bytes, BufferedReader, FileIO],
+        nombre_archivo: str,
+        cliente_id: str,
+        content_type: str,
+        forzar: bool = False,
+    ) -> bool:
+        """Sube un archivo individual mostrando el resultado; retorna True si está en Storage."""
+        ruta_remota = self._get_ruta_cliente(cliente_id, nombre_archivo)
+        try:
+            estado, _ = self._subir_contenido(archivo, nombre_archivo, cliente_id, content_type, forzar)
+        except Exception as e:
+            self._contar(fallidos=1)
+            logger.error(f"Error al subir archivo {nombre_archivo} para cliente {cliente_id}: {e}")
+            print(f"❌ Error al subir archivo {nombre_archivo}: {e}")
+            return False
+        if estado == "omitido":
+            print(f"⏭️  Sin cambios en Supabase: {ruta_remota}")
+        else:
+            print(f"✅ Archivo {estado} en Supabase: {ruta_remota}")
+        return True
+
+    def subir_archivo(
+        self,
+        ruta_local: str,
+        nombre_archivo: str,
+        cliente_id: str,
+        content_type: str = "text/markdown; charset=utf-8",
+        forzar: bool = False
+    ) -> bool:
+        """
+        Sube un archivo local al storage del cliente.
+        El contenido se envía en streaming desde disco, sin cargarlo en memoria.
+        
+        Args:
+            ruta_local: Ruta del archivo local a subir
+            nombre_archivo: Nombre del archivo en el storage
+            cliente_id: ID del cliente
+            content_type: Tipo de contenido MIME
+            forzar: Si True, se sube aunque el contenido no haya cambiado
+            
+        Returns:
+            bool: True si se subió exitosamente (o no había cambios)
+        """
+        return self._subir(ruta_local, nombre_archivo, cliente_id, content_type, forzar)
+
+    def subir_bytes(
+        self,
+        contenido: bytes,
+        nombre_archivo: str,
+        cliente_id: str,
+        content_type: str = "application/octet-stream",
+        forzar: bool = False
+    ) -> bool:
+        """
+        Sube contenido binario desde memoria, sin pasar por disco.
+        
+        Args:
+            contenido: Bytes del archivo
+            nombre_archivo: Nombre del archivo
+            cliente_id: ID del cliente
+            content_type: Tipo de contenido MIME
+            forzar: Si True, se sube aunque el contenido no haya cambiado
+            
+        Returns:
+            bool: True si se subió exitosamente (o no había cambios)
+        """
+        return self._subir(bytes(contenido), nombre_archivo, cliente_id, content_type, forzar)
+
+    def subir_buffer(
+        self,
+        buffer: BinaryIO,
+        nombre_archivo: str,
+        cliente_id: str,
+        content_type: str = "application/octet-stream",
+        forzar: bool = False
+    ) -> bool:
+        """
+        Sube el contenido de un objeto binario con `read()` (BytesIO, archivo
+        abierto en modo "rb"...). Los archivos en disco se envían en streaming;
+        el resto de buffers se envían desde memoria.
+        
+        Args:
+            buffer: Objeto binario posicionado al inicio del contenido
+            nombre_archivo: Nombre del archivo
+            cliente_id: ID del cliente
+            content_type: Tipo de contenido MIME
+            forzar: Si True, se sube aunque el contenido no haya cambiado
+            
+        Returns:
+            bool: True si se subió exitosamente (o no había cambios)
+        """
+        if isinstance(buffer, (BufferedReader, FileIO)):
+            return self._subir(buffer, nombre_archivo, cliente_id, content_type, forzar)
+        if isinstance(buffer, io.BytesIO):
+            contenido = buffer.getbuffer()[buffer.tell():].tobytes()
+        else:
+            contenido = buffer.read()
+        return self._subir(contenido, nombre_archivo, cliente_id, content_type, forzar)
+
     def subir_texto(
         self, 
         contenido_texto: str, 
         nombre_archivo: str, 
         cliente_id: str,
-        content_type: str = "text/markdown; charset=utf-8"
+        content_type: str = "text/markdown; charset=utf-8",
+        forzar: bool = False
     ) -> bool:
         """
         Sube un archivo de texto al storage del cliente.
+        El texto se codifica en UTF-8 y se envía desde memoria, sin archivo temporal.
         
         Args:
             contenido_texto: Contenido del archivo
             nombre_archivo: Nombre del archivo
             cliente_id: ID del cliente
             content_type: Tipo de contenido MIME
+            forzar: Si True, se sube aunque el contenido no haya cambiado
             
         Returns:
-            bool: True si se subió exitosamente
+            bool: True si se subió exitosamente (o no había cambios)
         """
-        try:
-            ruta_remota = self._get_ruta_cliente(cliente_id, nombre_archivo)
-            temp_path = None
-            
-            try:
-                # Crear archivo temporal
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".md", mode="w", encoding="utf-8") as tmp:
-                    tmp.write(contenido_texto)
-                    temp_path = tmp.name
-
-                # Verificar si ya existe
-                ya_existia = self.existe_archivo(cliente_id, nombre_archivo)
-
-                # Subir a Supabase
-                self.client.storage.from_(SUPABASE_BUCKET_NAME).upload(
-                    path=ruta_remota,
-                    file=temp_path,
-                    file_options={
-                        "cacheControl": "3600",
-                        "upsert": "true",
-                        "contentType": content_type,
-                    },
+        return self._subir(contenido_texto.encode("utf-8"), nombre_archivo, cliente_id, content_type, forzar)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        """Pool de hilos compartido por todos los lotes (acota la concurrencia total de subidas)."""
+        with self._lock_manifests:
+            if self._pool_subidas is None:
+                self._pool_subidas = ThreadPoolExecutor(
+                    max_workers=max(1, STORAGE_LOTE_HILOS), thread_name_prefix="subida-storage"
                 )
+            return self._pool_subidas
 
-                accion = "actualizado" if ya_existia else "creado"
-                logger.info(f"✅ Archivo {accion}: bucket='{SUPABASE_BUCKET_NAME}', path='{ruta_remota}'")
-                print(f"✅ Archivo {accion} en Supabase: {ruta_remota}")
-                return True
-                
-            finally:
-                # Limpiar archivo temporal
-                if temp_path:
-                    try:
-                        os.unlink(temp_path)
-                    except Exception:
-                        pass
-                        
+    def _subir_elemento(self, elemento: ElementoSubida, forzar: bool, reintentos: int) -> ResultadoSubida:
+        """Sube un elemento del lote reintentando con backoff exponencial si falla."""
+        error: Optional[Exception] = None
+        intento = 0
+        try:
+            archivo, content_type = elemento.carga()
+            for intento in range(1, reintentos + 2):
+                try:
+                    estado, tamano = self._subir_contenido(
+                        archivo, elemento.nombre_archivo, elemento.cliente_id, content_type, forzar
+                    )
+                    return ResultadoSubida(elemento.cliente_id, elemento.nombre_archivo, estado, intento, tamano)
+                except Exception as e:
+                    error = e
+                    if intento <= reintentos:
+                        logger.warning(
+                            f"Reintentando subida de {elemento.cliente_id}/{elemento.nombre_archivo} "
+                            f"(intento {intento}): {e}"
+                        )
+                        time.sleep(ESPERA_REINTENTO_SEGUNDOS * 2 ** (intento - 1))
         except Exception as e:
-            logger.error(f"Error al subir archivo {nombre_archivo} para cliente {cliente_id}: {e}")
-            print(f"❌ Error al subir archivo {nombre_archivo}: {e}")
-            return False
+            error = e
+        self._contar(fallidos=1)
+        logger.error(f"Error al subir archivo {elemento.nombre_archivo} para cliente {elemento.cliente_id}: {error}")
+        return ResultadoSubida(elemento.cliente_id, elemento.nombre_archivo, "fallido", intento, error=str(error))
+
+    def subir_lote(
+        self,
+        elementos: Iterable[Union[ElementoSubida, Tuple[str, str, Union[str, bytes]]]],
+        forzar: bool = False,
+        reintentos: int = STORAGE_LOTE_REINTENTOS,
+        escribir_manifests: bool = True,
+    ) -> ResultadoLoteSubida:
+        """
+        Sube muchos archivos en paralelo con concurrencia acotada
+        (STORAGE_LOTE_HILOS hilos compartidos sobre el pool HTTP del cliente).
+        
+        Args:
+            elementos: ElementoSubida o tuplas (cliente_id, nombre_archivo, contenido)
+            forzar: Si True, se suben aunque el contenido no haya cambiado
+            reintentos: Reintentos por elemento tras un error (los errores de
+                cuota ya los reintenta el limitador)
+            escribir_manifests: Si True, al terminar se escriben los manifiestos
+                de los clientes del lote
+            
+        Returns:
+            ResultadoLoteSubida: Resultado por elemento y rendimiento del lote
+        """
+        lote = [e if isinstance(e, ElementoSubida) else ElementoSubida(*e) for e in elementos]
+        inicio = time.monotonic()
+        pool = self._pool()
+        futuros = [pool.submit(self._subir_elemento, elemento, forzar, reintentos) for elemento in lote]
+        resultado = ResultadoLoteSubida(resultados=[futuro.result() for futuro in futuros])
+
+        if escribir_manifests:
+            clientes = list(dict.fromkeys(elemento.cliente_id for elemento in lote))
+            list(pool.map(self.guardar_manifest, clientes))
+
+        resultado.segundos = time.monotonic() - inicio
+        logger.info(
+            f"📦 Lote de {len(lote)} archivos: {resultado.exitosos} correctos "
+            f"({resultado.omitidos} sin cambios, {resultado.reutilizados} blobs reutilizados), "
+            f"{len(resultado.fallidos)} fallidos en "
+            f"{resultado.segundos:.1f}s ({resultado.archivos_por_segundo:.1f} archivos/s, "
+            f"{resultado.bytes_por_segundo / 1024:.1f} KiB/s)"
+        )
+        return resultado
 
     def descargar_archivo(self, cliente_id: str, nombre_archivo: str) -> Optional[bytes]:
         """
-        Descarga un archivo del storage del cliente.
+        Descarga un archivo del storage del cliente (siguiendo el blob compartido si lo hay).
         
         Args:
             cliente_id: ID del cliente
@@ -156,8 +648,10 @@ class StorageManager:
             bytes: Contenido del archivo o None si falla
         """
         try:
-            ruta_remota = self._get_ruta_cliente(cliente_id, nombre_archivo)
-            response = self.client.storage.from_(SUPABASE_BUCKET_NAME).download(ruta_remota)
+            ruta_remota = self.resolver_ruta(cliente_id, nombre_archivo)
+            response = self._limitador.ejecutar(
+                self.client.storage.from_(SUPABASE_BUCKET_NAME).download, ruta_remota
+            )
             logger.info(f"✅ Archivo descargado: {ruta_remota}")
             return response
         except Exception as e:
@@ -175,7 +669,9 @@ class StorageManager:
             List[dict]: Lista de metadatos de archivos
         """
         try:
-            items = self.client.storage.from_(SUPABASE_BUCKET_NAME).list(path=cliente_id)
+            items = self._limitador.ejecutar(
+                self.client.storage.from_(SUPABASE_BUCKET_NAME).list, path=cliente_id
+            )
             logger.info(f"✅ Listados {len(items)} archivos para cliente {cliente_id}")
             return items
         except Exception as e:
@@ -195,7 +691,12 @@ class StorageManager:
         """
         try:
             ruta_remota = self._get_ruta_cliente(cliente_id, nombre_archivo)
-            self.client.storage.from_(SUPABASE_BUCKET_NAME).remove([ruta_remota])
+            self._limitador.ejecutar(
+                self.client.storage.from_(SUPABASE_BUCKET_NAME).remove, [ruta_remota]
+            )
+            manifest = self._manifests.get(cliente_id)
+            if manifest is not None:
+                manifest.eliminar(nombre_archivo)
             logger.info(f"✅ Archivo eliminado: {ruta_remota}")
             return True
         except Exception as e:
@@ -206,7 +707,8 @@ class StorageManager:
         """
         Crea la carpeta para un nuevo cliente (si es necesario).
         En Supabase, las carpetas se crean implícitamente al subir archivos.
-        Esta función crea un archivo .gitkeep para forzar la creación de la carpeta.
+        Esta función crea un archivo .gitkeep para forzar la creación de la carpeta
+        (solo si el manifiesto indica que aún no existe).
         
         Args:
             cliente_id: ID del cliente
@@ -215,6 +717,8 @@ class StorageManager:
             bool: True si se creó exitosamente
         """
         try:
+            if self.existe_archivo(cliente_id, ".gitkeep"):
+                return True
             return self.subir_texto(
                 contenido_texto="# Portfolio files directory\nThis folder contains financial reports for this client.\n",
                 nombre_archivo=".gitkeep",
@@ -255,7 +759,7 @@ class StorageManager:
             archivos_a_eliminar = archivos_ordenados[:len(archivos) - max_archivos]
             for archivo in archivos_a_eliminar:
                 nombre = archivo.get('name') or archivo.get('filename', '')
-                if nombre and nombre != '.gitkeep':
+                if nombre and nombre not in ('.gitkeep', NOMBRE_MANIFEST):
                     self.eliminar_archivo(cliente_id, nombre)
             
             logger.info(f"✅ Limpiados {len(archivos_a_eliminar)} archivos antiguos para cliente {cliente_id}")
@@ -277,7 +781,7 @@ class StorageManager:
             str: URL pública o None si falla
         """
         try:
-            ruta_remota = self._get_ruta_cliente(cliente_id, nombre_archivo)
+            ruta_remota = self.resolver_ruta(cliente_id, nombre_archivo)
             url = self.client.storage.from_(SUPABASE_BUCKET_NAME).get_public_url(ruta_remota)
             return url
         except Exception as e:
@@ -285,6 +789,15 @@ class StorageManager:
             return None
 
 
+def _es_conflicto(error: Exception) -> bool:
+    """Indica si el error de Storage es porque el objeto ya existe (409 / Duplicate)."""
+    estado = getattr(error, "status", None) or getattr(error, "statusCode", None)
+    if str(estado) == "409":
+        return True
+    texto = str(error).lower()
+    return "409" in texto or "duplicate" in texto or "already exists" in texto
+
+
 # Instancia global del gestor de almacenamiento
 storage_manager = StorageManager()
 
@@ -295,6 +808,39 @@ def subir_informe_cliente(contenido: str, nombre_archivo: str, cliente_id: str)
     return storage_manager.subir_texto(contenido, nombre_archivo, cliente_id)
 
 
+def subir_archivo_cliente(ruta_local: str, nombre_archivo: str, cliente_id: str) -> bool:
+    """Sube un informe ya escrito en disco al storage del cliente."""
+    return storage_manager.subir_archivo(ruta_local, nombre_archivo, cliente_id)
+
+
+def subir_bytes_cliente(
+    contenido: bytes,
+    nombre_archivo: str,
+    cliente_id: str,
+    content_type: str = "application/octet-stream",
+) -> bool:
+    """Sube un artefacto binario en memoria al storage del cliente."""
+    return storage_manager.subir_bytes(contenido, nombre_archivo, cliente_id, content_type)
+
+
+def guardar_manifest_cliente(cliente_id: str) -> bool:
+    """Escribe el manifiesto del cliente si tiene cambios pendientes."""
+    return storage_manager.guardar_manifest(cliente_id)
+
+
+def subir_lote(
+    elementos: Iterable[Union[ElementoSubida, Tuple[str, str, Union[str, bytes]]]],
+    forzar: bool = False,
+) -> ResultadoLoteSubida:
+    """Sube en paralelo muchos archivos (cliente_id, nombre_archivo, contenido)."""
+    return storage_manager.subir_lote(elementos, forzar=forzar)
+
+
+def resolver_ruta_informe(cliente_id: str, nombre_archivo: str) -> str:
+    """Retorna la ruta del bucket con el contenido del informe (blob compartido o carpeta del cliente)."""
+    return storage_manager.resolver_ruta(cliente_id, nombre_archivo)
+
+
 def listar_informes_cliente(cliente_id: str) -> List[dict]:
     """Lista todos los informes de un cliente."""
     return storage_manager.listar_archivos_cliente(cliente_id)
@@ -0,0 +1,194 @@
+"""
+Módulo de manifiesto por carpeta de cliente en Supabase Storage.
+Cada carpeta guarda un `manifest.json` con el nombre, tamaño, hash SHA-256 y
+fecha de actualización de sus archivos. El gestor de almacenamiento lo carga
+una vez por cliente y ejecución, lo actualiza en memoria a medida que se
+suben archivos y lo vuelve a escribir al terminar con el cliente; así las
+comprobaciones de existencia no necesitan listar la carpeta y los front-ends
+pueden leer un único archivo en lugar de listar el bucket.
+
+Con el almacenamiento por contenido activado, el contenido se guarda una sola
+vez en `shared/blobs/{sha256}` y la entrada del manifiesto apunta a él con la
+clave "blob" en lugar de existir una copia en la carpeta del cliente.
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import threading
+from io import BufferedReader, FileIO
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Nombre del manifiesto dentro de la carpeta de cada cliente
+NOMBRE_MANIFEST = "manifest.json"
+
+# Se incrementa si cambia el formato del manifiesto
+VERSION_MANIFEST = 1
+
+# Carpeta de blobs direccionados por contenido (compartidos entre clientes)
+PREFIJO_BLOBS = "shared/blobs"
+
+# Tamaño de bloque al calcular el hash de archivos en disco
+_BLOQUE_HASH = 1024 * 1024
+
+
+def ruta_blob(sha256: str) -> str:
+    """Ruta en el bucket del blob con el hash indicado."""
+    return f"{PREFIJO_BLOBS}/{sha256}"
+
+
+def huella_contenido(archivo: Union[str, bytes, BufferedReader, FileIO]) -> Tuple[int, str]:
+    """
+    Calcula el tamaño y el hash SHA-256 de lo que se va a subir.
+
+    Args:
+        archivo: Bytes, ruta local o archivo binario abierto (se lee desde la
+            posición actual y se deja en ella)
+
+    Returns:
+        (tamaño en bytes, hash SHA-256 en hexadecimal)
+    """
+    if isinstance(archivo, (bytes, bytearray, memoryview)):
+        return len(archivo), hashlib.sha256(archivo).hexdigest()
+
+    sha = hashlib.sha256()
+    tamano = 0
+    if isinstance(archivo, (BufferedReader, FileIO)):
+        posicion = archivo.tell()
+        try:
+            for bloque in iter(lambda: archivo.read(_BLOQUE_HASH), b""):
+                sha.update(bloque)
+                tamano += len(bloque)
+        finally:
+            archivo.seek(posicion)
+    else:
+        with open(archivo, "rb") as f:
+            for bloque in iter(lambda: f.read(_BLOQUE_HASH), b""):
+                sha.update(bloque)
+                tamano += len(bloque)
+    return tamano, sha.hexdigest()
+
+
+class ManifestCliente:
+    """
+    Índice de los archivos de la carpeta de un cliente.
+
+    Formato de `manifest.json`:
+    {
+        "version": 1,
+        "cliente_id": "...",
+        "updated_at": "2024-01-01T08:00:00+00:00",
+        "files": {
+            "AAPL_analisis_financiero.md": {
+                "size": 1234,
+                "sha256": "…",
+                "content_type": "text/markdown; charset=utf-8",
+                "updated_at": "2024-01-01T08:00:00+00:00"
+            },
+            "informe_video_premercado.md": {
+                "size": 5678,
+                "sha256": "ab12…",
+                "content_type": "text/markdown; charset=utf-8",
+                "updated_at": "2024-01-01T08:00:00+00:00",
+                "blob": "shared/blobs/ab12…"
+            }
+        }
+    }
+
+    Las entradas con "blob" no tienen copia en la carpeta del cliente: el
+    contenido se lee de esa ruta del bucket. Las entradas creadas a partir de
+    un listado del bucket (carpetas sin manifiesto previo) no tienen hash.
+    """
+
+    def __init__(self, cliente_id: str, archivos: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.cliente_id = cliente_id
+        self.archivos: Dict[str, Dict[str, Any]] = archivos or {}
+        # True si hay cambios en memoria pendientes de escribir en Storage
+        self.pendiente = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_json(cls, cliente_id: str, contenido: bytes) -> "ManifestCliente":
+        """Crea el manifiesto a partir del `manifest.json` descargado."""
+        datos = json.loads(contenido)
+        if datos.get("version") != VERSION_MANIFEST:
+            raise ValueError(f"versión de manifiesto no soportada: {datos.get('version')}")
+        return cls(cliente_id, dict(datos.get("files", {})))
+
+    @classmethod
+    def desde_listado(cls, cliente_id: str, items: Iterable[Any]) -> "ManifestCliente":
+        """
+        Crea el manifiesto a partir del listado de la carpeta (primera ejecución
+        sobre una carpeta sin manifiesto). Queda pendiente de guardar.
+        """
+        archivos: Dict[str, Dict[str, Any]] = {}
+        for item in items or []:
+            if not isinstance(item, dict):
+                item = getattr(item, "__dict__", {})
+            nombre = item.get("name")
+            if not nombre or nombre == NOMBRE_MANIFEST:
+                continue
+            metadata = item.get("metadata") or {}
+            archivos[nombre] = {
+                "size": metadata.get("size"),
+                "sha256": None,
+                "content_type": metadata.get("mimetype"),
+                "updated_at": item.get("updated_at") or item.get("created_at"),
+            }
+        manifest = cls(cliente_id, archivos)
+        manifest.pendiente = True
+        return manifest
+
+    def existe(self, nombre_archivo: str) -> bool:
+        """Indica si el archivo está en la carpeta del cliente."""
+        return nombre_archivo in self.archivos
+
+    def entrada(self, nombre_archivo: str) -> Optional[Dict[str, Any]]:
+        """Retorna los metadatos del archivo o None si no existe."""
+        entrada = self.archivos.get(nombre_archivo)
+        return dict(entrada) if entrada is not None else None
+
+    def registrar(
+        self,
+        nombre_archivo: str,
+        tamano: int,
+        sha256: str,
+        content_type: str,
+        blob: Optional[str] = None,
+    ) -> None:
+        """Registra un archivo recién subido (con la ruta de su blob si es compartido)."""
+        entrada: Dict[str, Any] = {
+            "size": tamano,
+            "sha256": sha256,
+            "content_type": content_type,
+            "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        if blob:
+            entrada["blob"] = blob
+        with self._lock:
+            self.archivos[nombre_archivo] = entrada
+            self.pendiente = True
+
+    def eliminar(self, nombre_archivo: str) -> None:
+        """Quita un archivo eliminado del manifiesto."""
+        with self._lock:
+            if self.archivos.pop(nombre_archivo, None) is not None:
+                self.pendiente = True
+
+    def a_json(self) -> bytes:
+        """
+        Serializa el manifiesto para subirlo como `manifest.json` y lo marca
+        como guardado; si la subida falla hay que volver a marcarlo pendiente.
+        """
+        with self._lock:
+            self.pendiente = False
+            datos = {
+                "version": VERSION_MANIFEST,
+                "cliente_id": self.cliente_id,
+                "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "files": {nombre: dict(entrada) for nombre, entrada in sorted(self.archivos.items())},
+            }
+        return json.dumps(datos, ensure_ascii=False, indent=1).encode("utf-8")
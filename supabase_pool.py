@@ -0,0 +1,145 @@
+"""
+Módulo proveedor de clientes Supabase compartidos.
+Todo el proceso usa un único cliente (base de datos y Storage) sobre un pool
+HTTP con keep-alive, de modo que las conexiones TLS se reutilizan entre
+consultas y subidas en lugar de abrir una por cliente creado. La creación es
+segura desde varios hilos y existe una variante asíncrona por event loop.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+from supabase import Client, create_client
+
+try:
+    from supabase import ClientOptions
+except ImportError:  # versiones antiguas de supabase-py
+    from supabase.lib.client_options import ClientOptions  # type: ignore[no-redef]
+
+try:
+    from supabase import AsyncClient, AsyncClientOptions, acreate_client  # type: ignore[attr-defined]
+    SUPABASE_ASYNC_AVAILABLE = True
+except ImportError:  # supabase-py sin cliente asíncrono
+    AsyncClient = None  # type: ignore[assignment,misc]
+    AsyncClientOptions = None  # type: ignore[assignment,misc]
+    acreate_client = None  # type: ignore[assignment]
+    SUPABASE_ASYNC_AVAILABLE = False
+
+from config import (
+    SUPABASE_URL,
+    SUPABASE_ANON_KEY,
+    SUPABASE_SERVICE_ROLE,
+    SUPABASE_POOL_CONEXIONES,
+    SUPABASE_POOL_KEEPALIVE,
+    SUPABASE_POOL_KEEPALIVE_SEGUNDOS,
+    SUPABASE_TIMEOUT_SEGUNDOS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _opciones(clase_opciones: Any, http_client: Any) -> Any:
+    """Crea las opciones del cliente con el pool HTTP si la versión de supabase-py lo admite."""
+    try:
+        return clase_opciones(httpx_client=http_client)
+    except TypeError:
+        logger.warning("supabase-py no admite httpx_client: se usa el pool HTTP interno del cliente")
+        return clase_opciones()
+
+
+class ProveedorSupabase:
+    """
+    Proveedor de un cliente Supabase por proceso (y uno asíncrono por event loop).
+
+    - El cliente se crea la primera vez que se pide, con doble comprobación
+      bajo un lock para que varios hilos no creen clientes distintos.
+    - Todas las peticiones (PostgREST y Storage) comparten un `httpx.Client`
+      con `max_conexiones` conexiones y `max_keepalive` conexiones inactivas
+      reutilizables durante `keepalive_segundos`.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = SUPABASE_URL,
+        key: Optional[str] = None,
+        max_conexiones: int = SUPABASE_POOL_CONEXIONES,
+        max_keepalive: int = SUPABASE_POOL_KEEPALIVE,
+        keepalive_segundos: float = SUPABASE_POOL_KEEPALIVE_SEGUNDOS,
+        timeout: float = SUPABASE_TIMEOUT_SEGUNDOS,
+    ):
+        self.url = url
+        self.key = key or SUPABASE_SERVICE_ROLE or SUPABASE_ANON_KEY
+        self.limites = httpx.Limits(
+            max_connections=max(1, max_conexiones),
+            max_keepalive_connections=max(0, min(max_keepalive, max_conexiones)),
+            keepalive_expiry=keepalive_segundos,
+        )
+        self.timeout = httpx.Timeout(timeout)
+        self._cliente: Optional[Client] = None
+        self._http: Optional[httpx.Client] = None
+        self._clientes_async: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+
+    def cliente(self) -> Client:
+        """Retorna el cliente Supabase compartido, creándolo la primera vez."""
+        cliente = self._cliente
+        if cliente is not None:
+            return cliente
+        with self._lock:
+            if self._cliente is None:
+                self._http = httpx.Client(limits=self.limites, timeout=self.timeout, follow_redirects=True)
+                cliente = create_client(self.url, self.key, options=_opciones(ClientOptions, self._http))
+                # Inicializar ya los subclientes perezosos para no crearlos en paralelo desde varios hilos
+                cliente.postgrest
+                cliente.storage
+                self._cliente = cliente
+                logger.info(
+                    f"✅ Cliente Supabase compartido creado (pool de {self.limites.max_connections} "
+                    f"conexiones, {self.limites.max_keepalive_connections} keep-alive)"
+                )
+            return self._cliente
+
+    async def cliente_async(self) -> Any:
+        """
+        Retorna el cliente Supabase asíncrono del event loop actual. Los clientes
+        asíncronos no pueden compartirse entre loops, así que se crea uno por loop.
+        """
+        if not SUPABASE_ASYNC_AVAILABLE:
+            raise RuntimeError("La versión instalada de supabase-py no incluye cliente asíncrono")
+        loop = id(asyncio.get_running_loop())
+        cliente = self._clientes_async.get(loop)
+        if cliente is not None:
+            return cliente
+        http = httpx.AsyncClient(limits=self.limites, timeout=self.timeout, follow_redirects=True)
+        cliente = await acreate_client(self.url, self.key, options=_opciones(AsyncClientOptions, http))
+        with self._lock:
+            # Otra tarea del mismo loop pudo crearlo mientras se esperaba
+            existente = self._clientes_async.setdefault(loop, cliente)
+        if existente is not cliente:
+            await http.aclose()
+        return existente
+
+    def cerrar(self) -> None:
+        """Cierra el pool HTTP síncrono; el siguiente `cliente()` crea uno nuevo."""
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+            self._http = None
+            self._cliente = None
+
+
+# Instancia global del proveedor de clientes Supabase
+proveedor_supabase = ProveedorSupabase()
+
+
+def get_supabase_client() -> Client:
+    """Obtiene el cliente Supabase compartido del proceso."""
+    return proveedor_supabase.cliente()
+
+
+async def get_supabase_client_async() -> Any:
+    """Obtiene el cliente Supabase asíncrono del event loop actual."""
+    return await proveedor_supabase.cliente_async()
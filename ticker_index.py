@@ -0,0 +1,255 @@
+"""
+Módulo de índice invertido ticker → titulares.
+Permite responder "qué clientes tienen NVDA" sin recorrer los portfolios de
+todos los clientes. Los titulares se guardan en arrays compactos agrupados por
+ticker (formato CSR: un array de desplazamientos por ticker y arrays columnares
+con las posiciones), de modo que el índice ocupa unos pocos bytes por posición.
+"""
+
+import logging
+import math
+from array import array
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from tickers import normalizar_ticker
+
+if TYPE_CHECKING:
+    from database import Cliente
+
+logger = logging.getLogger(__name__)
+
+
+class Titular(NamedTuple):
+    """Posición de un cliente en un ticker."""
+    user_id: str
+    portfolio_id: int
+    cantidad: Optional[float]
+    precio_compra: Optional[float]
+
+
+def _opcional(valor: float) -> Optional[float]:
+    return None if math.isnan(valor) else valor
+
+
+def _ordenar_por_conteo(claves: array, total_claves: int, orden: Iterable[int]) -> Tuple[array, array]:
+    """
+    Ordenación por conteo estable de los índices `orden` según `claves[k]`.
+
+    Returns:
+        (desplazamientos por clave, índices reordenados)
+    """
+    desplazamientos = array("l", [0]) * (total_claves + 1)
+    for clave in claves:
+        desplazamientos[clave + 1] += 1
+    for i in range(total_claves):
+        desplazamientos[i + 1] += desplazamientos[i]
+    siguiente = array("l", desplazamientos[:-1])
+    resultado = array("l", [0]) * len(claves)
+    for k in orden:
+        clave = claves[k]
+        resultado[siguiente[clave]] = k
+        siguiente[clave] += 1
+    return desplazamientos, resultado
+
+
+class IndiceTickers:
+    """
+    Índice invertido de solo lectura: ticker normalizado → titulares.
+
+    Las posiciones del ticker `tickers[i]` ocupan el rango
+    `desplazamientos[i]:desplazamientos[i + 1]` de los arrays columnares.
+    Se construye con `ConstructorIndiceTickers` o `IndiceTickers.desde_clientes`.
+    """
+
+    def __init__(
+        self,
+        tickers: List[str],
+        desplazamientos: array,
+        user_ids: List[str],
+        usuarios: array,
+        portfolio_ids: array,
+        cantidades: array,
+        precios: array,
+        clientes_por_ticker: array,
+    ):
+        self.tickers = tickers
+        self.desplazamientos = desplazamientos
+        self.user_ids = user_ids
+        self.usuarios = usuarios
+        self.portfolio_ids = portfolio_ids
+        self.cantidades = cantidades
+        self.precios = precios
+        self.clientes_por_ticker = clientes_por_ticker
+        self._posicion: Dict[str, int] = {ticker: i for i, ticker in enumerate(tickers)}
+
+    @classmethod
+    def desde_clientes(cls, clientes: Iterable["Cliente"]) -> "IndiceTickers":
+        """Construye el índice a partir de clientes con sus portfolios cargados."""
+        constructor = ConstructorIndiceTickers()
+        for cliente in clientes:
+            constructor.agregar_cliente(cliente)
+        return constructor.construir()
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __contains__(self, ticker: str) -> bool:
+        return normalizar_ticker(ticker) in self._posicion
+
+    def _rango(self, ticker: str) -> range:
+        i = self._posicion.get(normalizar_ticker(ticker))
+        if i is None:
+            return range(0)
+        return range(self.desplazamientos[i], self.desplazamientos[i + 1])
+
+    def titulares(self, ticker: str) -> List[Titular]:
+        """
+        Retorna las posiciones de todos los clientes en el ticker.
+
+        Args:
+            ticker: Ticker tal como viene de la BD o ya normalizado
+
+        Returns:
+            List[Titular]: Posiciones agrupadas por cliente (vacía si nadie lo tiene)
+        """
+        return [
+            Titular(
+                self.user_ids[self.usuarios[k]],
+                self.portfolio_ids[k],
+                _opcional(self.cantidades[k]),
+                _opcional(self.precios[k]),
+            )
+            for k in self._rango(ticker)
+        ]
+
+    def clientes(self, ticker: str) -> List[str]:
+        """Retorna los user_id distintos que tienen el ticker, en orden de carga."""
+        clientes: List[str] = []
+        anterior = -1
+        for k in self._rango(ticker):
+            if self.usuarios[k] != anterior:
+                anterior = self.usuarios[k]
+                clientes.append(self.user_ids[anterior])
+        return clientes
+
+    def clientes_afectados(self, tickers: Iterable[str]) -> List[str]:
+        """
+        Fan-out: retorna los user_id distintos que tienen alguno de los tickers,
+        p. ej. para regenerar solo los informes de los clientes afectados por
+        un ticker actualizado.
+        """
+        afectados: Dict[str, None] = {}
+        for ticker in tickers:
+            for k in self._rango(ticker):
+                afectados[self.user_ids[self.usuarios[k]]] = None
+        return list(afectados)
+
+    def popularidad(self, ticker: str) -> int:
+        """Retorna cuántos clientes distintos tienen el ticker."""
+        i = self._posicion.get(normalizar_ticker(ticker))
+        return 0 if i is None else self.clientes_por_ticker[i]
+
+    def mas_populares(self, limite: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Retorna los tickers ordenados por número de clientes que los tienen
+        (de más a menos), útil para priorizar las descargas de datos.
+
+        Args:
+            limite: Número máximo de tickers a devolver (None = todos)
+        """
+        orden = sorted(
+            range(len(self.tickers)),
+            key=lambda i: (-self.clientes_por_ticker[i], self.tickers[i]),
+        )
+        if limite is not None:
+            orden = orden[:limite]
+        return [(self.tickers[i], self.clientes_por_ticker[i]) for i in orden]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.tickers)
+
+
+class ConstructorIndiceTickers:
+    """
+    Acumula posiciones mientras se cargan los clientes y genera el índice.
+
+    Uso:
+        constructor = ConstructorIndiceTickers()
+        for cliente in iter_clientes():
+            constructor.agregar_cliente(cliente)
+        indice = constructor.construir()
+    """
+
+    def __init__(self):
+        self._tickers: Dict[str, int] = {}
+        self._user_ids: Dict[str, int] = {}
+        self._codigos = array("l")
+        self._usuarios = array("l")
+        self._portfolio_ids = array("q")
+        self._cantidades = array("d")
+        self._precios = array("d")
+
+    def agregar(
+        self,
+        ticker: str,
+        user_id: str,
+        portfolio_id: int,
+        cantidad: Optional[float] = None,
+        precio_compra: Optional[float] = None,
+    ) -> None:
+        """Registra una posición. Los tickers vacíos se ignoran."""
+        normalizado = normalizar_ticker(ticker)
+        if not normalizado:
+            return
+        self._codigos.append(self._tickers.setdefault(normalizado, len(self._tickers)))
+        self._usuarios.append(self._user_ids.setdefault(user_id, len(self._user_ids)))
+        self._portfolio_ids.append(portfolio_id)
+        self._cantidades.append(math.nan if cantidad is None else float(cantidad))
+        self._precios.append(math.nan if precio_compra is None else float(precio_compra))
+
+    def agregar_cliente(self, cliente: "Cliente") -> None:
+        """Registra todas las posiciones de un cliente con sus portfolios cargados."""
+        for portfolio in cliente.portfolios:
+            for asset in portfolio.assets:
+                self.agregar(asset.ticker, cliente.user_id, portfolio.portfolio_id, asset.cantidad, asset.precio_compra)
+
+    def construir(self) -> IndiceTickers:
+        """
+        Agrupa las posiciones por ticker y, dentro de cada ticker, por cliente
+        (dos ordenaciones por conteo estables) y crea el índice.
+        """
+        total_tickers = len(self._tickers)
+        total = len(self._codigos)
+        _, por_usuario = _ordenar_por_conteo(self._usuarios, len(self._user_ids), range(total))
+        desplazamientos, orden = _ordenar_por_conteo(self._codigos, total_tickers, por_usuario)
+
+        usuarios = array("l", [0]) * total
+        portfolio_ids = array("q", [0]) * total
+        cantidades = array("d", [0.0]) * total
+        precios = array("d", [0.0]) * total
+        clientes_por_ticker = array("l", [0]) * total_tickers
+        ultimo_usuario = array("l", [-1]) * total_tickers
+        for destino, k in enumerate(orden):
+            codigo = self._codigos[k]
+            usuario = self._usuarios[k]
+            usuarios[destino] = usuario
+            portfolio_ids[destino] = self._portfolio_ids[k]
+            cantidades[destino] = self._cantidades[k]
+            precios[destino] = self._precios[k]
+            # Las posiciones de un cliente quedan seguidas dentro del ticker
+            if ultimo_usuario[codigo] != usuario:
+                ultimo_usuario[codigo] = usuario
+                clientes_por_ticker[codigo] += 1
+
+        indice = IndiceTickers(
+            tickers=list(self._tickers),
+            desplazamientos=desplazamientos,
+            user_ids=list(self._user_ids),
+            usuarios=usuarios,
+            portfolio_ids=portfolio_ids,
+            cantidades=cantidades,
+            precios=precios,
+            clientes_por_ticker=clientes_por_ticker,
+        )
+        logger.info(f"✅ Índice de tickers: {total_tickers} tickers y {total} posiciones de {len(self._user_ids)} clientes")
+        return indice
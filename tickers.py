@@ -0,0 +1,121 @@
+"""
+Módulo de normalización de tickers.
+Convierte los símbolos guardados en la base de datos al formato que esperan las
+APIs de mercado (yfinance, pandas-datareader).
+"""
+
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4096)
+def normalizar_ticker(ticker: str) -> str:
+    """
+    Normaliza el formato de los tickers para asegurar compatibilidad con las APIs.
+    
+    Reglas de normalización:
+    1. Criptomonedas: BTCUSD -> BTC-USD, ETHUSD -> ETH-USD, etc.
+    2. Metales preciosos: PAXGUSD -> PAXG-USD, GOLDUSD -> GOLD-USD, etc.
+    3. Sufijos de mercado: NVD.F -> NVDA, AAPL.DE -> AAPL, etc.
+    4. Espacios y caracteres especiales se limpian
+    
+    Args:
+        ticker: Ticker original desde la base de datos
+        
+    Returns:
+        str: Ticker normalizado para las APIs
+    """
+    if not ticker:
+        return ticker
+    
+    ticker_original = ticker
+    ticker = ticker.strip().upper()
+    
+    # 1. Mapeo de criptomonedas comunes (formato XXX-USD)
+    crypto_map = {
+        'BTCUSD': 'BTC-USD',
+        'ETHUSD': 'ETH-USD',
+        'ADAUSD': 'ADA-USD',
+        'SOLUSD': 'SOL-USD',
+        'DOTUSD': 'DOT-USD',
+        'DOGEUSD': 'DOGE-USD',
+        'MATICUSD': 'MATIC-USD',
+        'XRPUSD': 'XRP-USD',
+        'LINKUSD': 'LINK-USD',
+        'LTCUSD': 'LTC-USD',
+        'UNIUSD': 'UNI-USD',
+        'XLMUSD': 'XLM-USD',
+    }
+    
+    # 2. Mapeo de metales preciosos y commodities
+    commodity_map = {
+        'PAXGUSD': 'PAXG-USD',  # Paxos Gold
+        'GOLDUSD': 'GOLD-USD',
+        'SILVERUSD': 'SILVER-USD',
+        'XAUUSD': 'GLD',  # Gold ETF
+        'XAGUSD': 'SLV',  # Silver ETF
+    }
+    
+    # 3. Mapeo de sufijos de mercados internacionales
+    market_suffixes = {
+        '.F': '',      # Frankfurt (ej: NVD.F -> NVDA)
+        '.DE': '',     # Deutsche Börse
+        '.L': '',      # London Stock Exchange
+        '.PA': '',     # Euronext Paris
+        '.AS': '',     # Amsterdam
+        '.MI': '',     # Milan
+        '.MC': '',     # Madrid
+        '.SW': '',     # Swiss Exchange
+        '.TO': '',     # Toronto
+        '.AX': '',     # Australian Stock Exchange
+        '.HK': '',     # Hong Kong
+        '.T': '',      # Tokyo
+    }
+    
+    # 4. Mapeo específico de tickers conocidos que requieren corrección
+    specific_map = {
+        'NVD.F': 'NVDA',
+        'NVDA.F': 'NVDA',
+        'GOOGL.F': 'GOOGL',
+        'GOOG.F': 'GOOGL',
+        'AAPL.F': 'AAPL',
+        'MSFT.F': 'MSFT',
+        'AMZN.F': 'AMZN',
+        'TSLA.F': 'TSLA',
+        'META.F': 'META',
+        'NFLX.F': 'NFLX',
+        '^SPX': '^GSPC',
+    }
+    
+    # Aplicar normalización en orden de prioridad
+    
+    # 1º - Mapeo específico (máxima prioridad)
+    if ticker in specific_map:
+        ticker_normalizado = specific_map[ticker]
+        logger.info(f"🔄 Ticker normalizado (específico): {ticker_original} -> {ticker_normalizado}")
+        return ticker_normalizado
+    
+    # 2º - Mapeo de criptomonedas
+    if ticker in crypto_map:
+        ticker_normalizado = crypto_map[ticker]
+        logger.info(f"🔄 Ticker normalizado (crypto): {ticker_original} -> {ticker_normalizado}")
+        return ticker_normalizado
+    
+    # 3º - Mapeo de commodities
+    if ticker in commodity_map:
+        ticker_normalizado = commodity_map[ticker]
+        logger.info(f"🔄 Ticker normalizado (commodity): {ticker_original} -> {ticker_normalizado}")
+        return ticker_normalizado
+    
+    # 4º - Remover sufijos de mercados internacionales
+    for suffix, replacement in market_suffixes.items():
+        if ticker.endswith(suffix):
+            ticker_normalizado = ticker.replace(suffix, replacement)
+            logger.info(f"🔄 Ticker normalizado (sufijo): {ticker_original} -> {ticker_normalizado}")
+            return ticker_normalizado
+    
+    # 5º - Si no hay cambios, retornar el ticker limpio
+    logger.debug(f"✓ Ticker sin cambios: {ticker_original}")
+    return ticker